@@ -1,22 +1,32 @@
-from chains.information_extractor import Information_Extractor
-from chains.summarizer import Summarizer 
 import streamlit as st
-import os
-from dotenv import load_dotenv, find_dotenv
-from chains.tagger import Tagger
+import uuid
+from chains.pipeline import TravelPipeline
+from utils.session_store import get_session_store
 from utils.logger import logger
-
-_ = load_dotenv(find_dotenv())  # read local .env file (load enviornmental vars)
+from utils.tools import get_destination_store
+from utils.tracing import span
 
 st.title("Travel Destination Assistant - AI Agent") #sets up srtreamlit app title
 logger.propagate = False
 
-# Initialize chat history
-if "messages" not in st.session_state:
-    st.session_state.messages = [] #allows prev chats to be displayed on reruns
+# Opens the shared on-disk destination cache (if configured) and warms this
+# worker's in-memory cache from it; later reruns reuse the open store
+get_destination_store()
+
+# Conversation state lives in the session store under this ID; the chains themselves are shared
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
+session_id = st.session_state.session_id
+sessions = get_session_store()
+
+
+def add_message(role: str, content: str) -> None:
+    with sessions.session(session_id) as session:
+        session.messages.append({"role": role, "content": content})
+
 
 # Display chat messages from history on app rerun
-for message in st.session_state.messages:
+for message in sessions.load(session_id).messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
@@ -25,26 +35,31 @@ if prompt := st.chat_input(
     "Ask me anything about travel destinations!"
 ):
     try:
-        summarizer = Summarizer(os.getenv("OPENAI_API_KEY"))  
+        pipeline = TravelPipeline()
 
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        add_message("user", prompt)
         with st.chat_message("assistant"):
             st.markdown("Let me check that for you...")
         
         
-        user_intent = Tagger(os.getenv("OPENAI_API_KEY")).extract_information(prompt)
-        information = Information_Extractor(os.getenv("OPENAI_API_KEY")).get_information(user_intent)
-        summary = summarizer.summarize(information, prompt)
-        
+        # Each question is one trace; the pipeline adds a span per stage
+        with span("request", session_id=session_id):
+            user_intents, information = pipeline.retrieve(prompt, session_id)
 
-        with st.chat_message("assistant"):
-            st.markdown(summary)
-        st.session_state.messages.append({"role": "assistant", "content": summary})
+            # Render tokens as they arrive so the user sees the answer start early
+            with st.chat_message("assistant"):
+                placeholder = st.empty()
+                summary = ""
+                for token in pipeline.summarize_stream(prompt, user_intents, information):
+                    summary += token
+                    placeholder.markdown(summary + "▌")
+                placeholder.markdown(summary)
+        add_message("assistant", summary)
     except Exception as e:
         logger.debug(f"Error: {e}")
         message = "I was not able to process the request. Please try again."
         st.markdown(message)
-        st.session_state.messages.append({"role": "assistant", "content": message})
+        add_message("assistant", message)
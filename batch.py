@@ -0,0 +1,285 @@
+"""
+Pre-generates answers for a list of questions without going through the chat UI.
+
+Each input line is a JSON object with either a ``question`` or a ``destination`` and
+``intent``, and optionally an ``id``, which defaults to a hash of the normalized question:
+
+    {"id": "paris-attractions", "destination": "Paris", "intent": "attractions"}
+    {"question": "Where should I eat in Rome?"}
+
+Identical questions are answered once, and each of their lines gets its own record.
+Every answer is appended to the output file as
+soon as its chunk finishes, and the output file doubles as the checkpoint: rerunning
+the same command skips the questions already answered and retries the ones that failed.
+
+    python batch.py questions.jsonl answers.jsonl --concurrency 16
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from chains.pipeline import TravelPipeline
+from utils.cache import normalize_name
+from utils.llm_usage import usage_summary
+from utils.logger import logger
+from utils.tools import get_destination_store
+
+QUESTION_TEMPLATE = "What can you tell me about {intent} in {destination}?"
+
+STAGES = ("tagger", "information_extractor", "summarizer")
+
+
+@dataclass
+class Item:
+    """
+    One question to answer and the (id, question) of each input line that asked it.
+    """
+
+    question: str
+    asked: List[Tuple[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class Report:
+    """
+    Throughput, per-stage latency and model token usage of a batch run.
+
+    The Tagger and Summarizer answer a whole chunk in one batch, so every stage's
+    latency is the time it took for a chunk, not for one question.
+    """
+
+    questions: int = 0
+    answered: int = 0
+    failed: int = 0
+    skipped: int = 0
+    duplicates: int = 0
+    elapsed: float = 0.0
+    stage_latencies: Dict[str, List[float]] = field(default_factory=lambda: {stage: [] for stage in STAGES})
+
+    def as_dict(self) -> dict:
+        stages = {}
+        for stage, latencies in self.stage_latencies.items():
+            ordered = sorted(latencies)
+            stages[stage] = {
+                "chunks": len(ordered),
+                "mean_s": sum(ordered) / len(ordered) if ordered else 0.0,
+                "p50_s": _percentile(ordered, 0.50),
+                "p95_s": _percentile(ordered, 0.95),
+            }
+        return {
+            "questions": self.questions,
+            "answered": self.answered,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "duplicates": self.duplicates,
+            "elapsed_s": self.elapsed,
+            "questions_per_s": (self.answered + self.failed) / self.elapsed if self.elapsed else 0.0,
+            "stages": stages,
+            "llm_usage": usage_summary(),
+        }
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def question_id(question: str) -> str:
+    """
+    Returns the id of a line without one, which stays the same when lines are added,
+    removed or reordered.
+    """
+    return hashlib.sha1(normalize_name(question).encode("utf-8")).hexdigest()[:16]
+
+
+def read_questions(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yields the (id, question) pairs in the input file, skipping malformed lines.
+    """
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                question = record.get("question") or QUESTION_TEMPLATE.format(
+                    intent=record["intent"], destination=record["destination"]
+                )
+            except (ValueError, KeyError, AttributeError) as e:
+                logger.warning(f"Skipping line {number} of {path}: {e}")
+                continue
+            question = str(question).strip()
+            id = record.get("id")
+            yield question_id(question) if id is None else str(id), question
+
+
+def read_checkpoint(path: str) -> set:
+    """
+    Returns the ids already answered without error in the output file.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash; the question is answered again
+                continue
+            if not record.get("error"):
+                done.add(record["id"])
+    return done
+
+
+def end_last_line(path: str) -> None:
+    """
+    Ends a last line a crash cut short, so the next record starts on a line of its own.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def plan(input_path: str, output_path: str, report: Report) -> List[Item]:
+    """
+    Groups the unanswered input lines by normalized question.
+    """
+    done = read_checkpoint(output_path)
+    items: Dict[str, Item] = {}
+    for id, question in read_questions(input_path):
+        report.questions += 1
+        if id in done:
+            report.skipped += 1
+            continue
+        key = normalize_name(question)
+        if key in items:
+            report.duplicates += 1
+        else:
+            items[key] = Item(question)
+        items[key].asked.append((id, question))
+    return list(items.values())
+
+
+async def run_chunk(pipeline: TravelPipeline, items: List[Item], concurrency: int, report: Report) -> List[dict]:
+    """
+    Answers one chunk of questions, running each stage over the whole chunk and recording
+    how long it took.
+
+    The Tagger and Summarizer send the chunk to the model with ``abatch``; retrieval
+    runs at most ``concurrency`` questions at a time. A failure only affects its question.
+    """
+    chains = pipeline.chains
+    questions = [item.question for item in items]
+    errors: List[Optional[str]] = [None] * len(items)
+
+    start = time.perf_counter()
+    intents = await chains.tagger.abatch_extract_intents(questions, max_concurrency=concurrency)
+    report.stage_latencies["tagger"].append(time.perf_counter() - start)
+    for i, intent in enumerate(intents):
+        if isinstance(intent, Exception):
+            errors[i] = f"tagger: {intent}"
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def retrieve(i: int) -> str:
+        if errors[i] is not None:
+            return ""
+        async with slots:
+            try:
+                return await chains.information_extractor.aget_information_many(
+                    intents[i], speculate=pipeline.speculate, question=questions[i]
+                )
+            except Exception as e:
+                errors[i] = f"information_extractor: {e}"
+                return ""
+
+    start = time.perf_counter()
+    information = await asyncio.gather(*(retrieve(i) for i in range(len(items))))
+    report.stage_latencies["information_extractor"].append(time.perf_counter() - start)
+
+    pending = [i for i in range(len(items)) if errors[i] is None]
+    answers: Dict[int, str] = {}
+    if pending:
+        start = time.perf_counter()
+        results = await chains.summarizer.abatch_summarize(
+            [information[i] for i in pending], [questions[i] for i in pending], max_concurrency=concurrency
+        )
+        report.stage_latencies["summarizer"].append(time.perf_counter() - start)
+        for i, result in zip(pending, results):
+            if isinstance(result, Exception):
+                errors[i] = f"summarizer: {result}"
+            else:
+                answers[i] = result
+
+    records = []
+    for i, item in enumerate(items):
+        for id, question in item.asked:
+            record = {"id": id, "question": question}
+            if errors[i] is None:
+                record.update(
+                    destination=intents[i][0].name,
+                    intent=intents[i][0].intent,
+                    intents=[{"destination": intent.name, "intent": intent.intent} for intent in intents[i]],
+                    answer=answers[i],
+                )
+            else:
+                record["error"] = errors[i]
+            records.append(record)
+    return records
+
+
+async def run(input_path: str, output_path: str, concurrency: int, chunk_size: int) -> Report:
+    """
+    Answers every unanswered question in the input file, appending results to the output file.
+    """
+    report = Report()
+    items = plan(input_path, output_path, report)
+    pipeline = TravelPipeline()
+    get_destination_store()
+
+    start = time.perf_counter()
+    end_last_line(output_path)
+    with open(output_path, "a", encoding="utf-8") as out:
+        for offset in range(0, len(items), chunk_size):
+            records = await run_chunk(pipeline, items[offset:offset + chunk_size], concurrency, report)
+            for record in records:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if "error" in record:
+                    report.failed += 1
+                else:
+                    report.answered += 1
+            # Flushed per chunk so a crash loses at most the chunk in progress
+            out.flush()
+            os.fsync(out.fileno())
+            logger.info(f"Answered {min(offset + chunk_size, len(items))}/{len(items)} unique questions")
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of questions")
+    parser.add_argument("output", help="JSONL file the answers are appended to")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum concurrent model and API calls")
+    parser.add_argument("--chunk-size", type=int, default=64, help="questions processed per checkpoint")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.input, args.output, args.concurrency, args.chunk_size))
+    json.dump(report.as_dict(), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
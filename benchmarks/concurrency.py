@@ -0,0 +1,57 @@
+"""
+Measures pipeline throughput against in-flight request count, using local stand-ins
+for the OpenAI and TripAdvisor APIs so no quota is spent.
+
+    python -m benchmarks.concurrency --latency 0.2 --levels 1 8 32 128
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from benchmarks.standin import StandinConfig, standin_settings, start_standin
+from chains.pipeline import TravelPipeline
+from chains.registry import get_chains
+from utils.config import reload_settings
+
+
+async def measure(pipeline: TravelPipeline, in_flight: int, requests: int) -> dict:
+    slots = asyncio.Semaphore(in_flight)
+    latencies = []
+
+    async def one() -> None:
+        async with slots:
+            start = time.perf_counter()
+            await pipeline.arun("What are the top attractions in Paris?", session_id=str(uuid.uuid4()))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "in_flight": in_flight,
+        "requests": requests,
+        "throughput_rps": requests / elapsed,
+        "mean_latency_s": sum(latencies) / len(latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="injected model latency in seconds")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+
+    port = start_standin(StandinConfig(latency=args.latency, api_latency=args.latency / 4))
+    reload_settings(standin_settings(port))
+    pipeline = TravelPipeline(get_chains())
+
+    async def run() -> list:
+        return [await measure(pipeline, level, max(4 * level, 16)) for level in args.levels]
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+A deterministic local stand-in for the OpenAI and TripAdvisor APIs.
+
+It speaks enough of both protocols to drive Tagger, Information_Extractor, Summarizer
+and TravelInfo unmodified: chat completions with function calls and SSE streaming,
+embeddings, ``/locations/search`` and the per-location resources. Latency, jitter,
+error rate and streaming token rate are configurable. Every random draw is seeded from
+the request itself, so the same requests get the same responses and delays on every run
+regardless of the order they arrive in.
+
+Point the pipeline at it by overriding the base URLs:
+
+    port = start_standin(StandinConfig(latency=0.2, jitter=0.05))
+    reload_settings(standin_settings(port))
+
+or serve it on its own:
+
+    python -m benchmarks.standin --port 8765 --latency 0.2 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from aiohttp import web
+
+from chains.intent_rules import INTENT_PATTERNS, RuleBasedTagger
+from utils.cache import normalize_name
+from utils.config import Settings
+
+# The tool the stand-in selects for each intent
+INTENT_TOOLS = {
+    "overview": "get_destination_info",
+    "attractions": "get_travel_guide",
+    "weather": "get_destination_info",
+    "activities": "get_local_events",
+}
+
+_FILLER = (
+    "is a popular destination known for its neighbourhoods, food, museums and parks. "
+    "Visitors usually spend a few days exploring the old town, trying local dishes and "
+    "taking day trips to the surrounding countryside."
+).split(" ")
+
+_QUERY = re.compile(r"name (?P<name>.+?) and want to talk about the (?P<intent>\w+)")
+
+
+@dataclass(frozen=True)
+class StandinConfig:
+    """
+    The behaviour of the stand-in.
+
+    Attributes:
+        latency (float): Seconds before a chat completion starts responding.
+        api_latency (float): Seconds before a TripAdvisor response.
+        jitter (float): The maximum seconds added to or removed from each delay.
+        error_rate (float): The fraction of requests answered with ``error_status``.
+        error_status (int): The HTTP status of injected errors.
+        tokens_per_second (float): The rate streamed answer tokens are sent at; 0 sends them at once.
+        answer_tokens (int): The number of tokens in each generated answer.
+        seed (int): Seeds every random draw.
+    """
+
+    latency: float = 0.2
+    api_latency: float = 0.05
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    tokens_per_second: float = 0.0
+    answer_tokens: int = 40
+    seed: int = 0
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, (len(text) + 3) // 4)
+
+
+def _completion(model: str, message: dict, prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "id": "chatcmpl-standin",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _chunk(model: str, delta: dict, finish_reason: Optional[str] = None) -> bytes:
+    chunk = {
+        "id": "chatcmpl-standin",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n".encode()
+
+
+def location_id(name: str) -> str:
+    """
+    Returns the stable location ID the stand-in assigns to a destination name.
+    """
+    return str(zlib.crc32(normalize_name(name).encode("utf-8")))
+
+
+class Standin:
+    """
+    The request handlers of the stand-in, with the state behind its deterministic draws.
+
+    Attributes:
+        config (StandinConfig): The configured latency, errors and token rate.
+        requests (Counter): The number of requests served per endpoint.
+    """
+
+    def __init__(self, config: StandinConfig = StandinConfig()) -> None:
+        self.config = config
+        self.requests: Counter = Counter()
+        self.tagger = RuleBasedTagger(threshold=0.0)
+        self._seen: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _rng(self, endpoint: str, payload: str) -> random.Random:
+        # Seeded by the request and how often it was seen, not by arrival order
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        with self._lock:
+            self.requests[endpoint] += 1
+            occurrence = self._seen[digest]
+            self._seen[digest] += 1
+        return random.Random(f"{self.config.seed}:{endpoint}:{digest}:{occurrence}")
+
+    async def _delay(self, rng: random.Random, base: float) -> None:
+        delay = base + rng.uniform(-self.config.jitter, self.config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _fail(self, rng: random.Random) -> Optional[web.Response]:
+        if rng.random() >= self.config.error_rate:
+            return None
+        return web.json_response(
+            {"error": {"message": "Injected stand-in error", "type": "server_error", "code": None}},
+            status=self.config.error_status,
+        )
+
+    def _answer(self, prompt: str) -> str:
+        destinations = self.tagger.find_destinations(prompt)
+        name = destinations[0] if destinations else "This destination"
+        words = [name] + _FILLER
+        return " ".join(words[i % len(words)] for i in range(self.config.answer_tokens))
+
+    def _tag(self, text: str) -> dict:
+        intent, _ = self.tagger.classify(text)
+        if intent is None:
+            destinations = self.tagger.find_destinations(text)
+            normalized = normalize_name(text)
+            intents = [name for name, pattern in INTENT_PATTERNS.items() if pattern.search(normalized)]
+            intent_name = next((i for i in intents if i != "overview"), "overview")
+            return {"name": destinations[0] if destinations else "Paris", "intent": intent_name}
+        return {"name": intent.name, "intent": intent.intent}
+
+    def _tag_all(self, text: str) -> list:
+        pairs, _ = self.tagger.classify_all(text)
+        if not pairs:
+            return [self._tag(text)]
+        return [{"name": pair.name, "intent": pair.intent} for pair in pairs]
+
+    def _select_tool(self, text: str, functions: list) -> dict:
+        match = _QUERY.search(text)
+        name, intent = (match.group("name"), match.group("intent")) if match else ("Paris", "overview")
+        tool = INTENT_TOOLS.get(intent, "get_destination_info")
+        if tool not in functions:
+            tool = functions[0]
+        return {"name": tool, "arguments": json.dumps({"name": name})}
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        rng = self._rng("chat", json.dumps(body, sort_keys=True))
+        model = body.get("model", "gpt-3.5-turbo-0125")
+        messages = body.get("messages", [])
+        prompt = " ".join(str(m.get("content") or "") for m in messages)
+        last = str(messages[-1].get("content") or "") if messages else ""
+        functions = [f["name"] for f in body.get("functions", [])]
+        prompt_tokens = _count_tokens(prompt) + _count_tokens(json.dumps(body.get("functions", [])))
+
+        await self._delay(rng, self.config.latency)
+        error = self._fail(rng)
+        if error is not None:
+            return error
+
+        if functions:
+            if "RoutedIntents" in functions:
+                intents = [{**pair, "tool": INTENT_TOOLS.get(pair["intent"], "get_destination_info")} for pair in self._tag_all(last)]
+                call = {"name": "RoutedIntents", "arguments": json.dumps({"intents": intents})}
+            elif "UserIntents" in functions:
+                call = {"name": "UserIntents", "arguments": json.dumps({"intents": self._tag_all(last)})}
+            elif "UserIntent" in functions:
+                call = {"name": "UserIntent", "arguments": json.dumps(self._tag(last))}
+            else:
+                call = self._select_tool(last, functions)
+            message = {"role": "assistant", "content": None, "function_call": call}
+            return web.json_response(_completion(model, message, prompt_tokens, _count_tokens(call["arguments"])))
+
+        answer = self._answer(last)
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": answer}
+            return web.json_response(_completion(model, message, prompt_tokens, self.config.answer_tokens))
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        interval = 1.0 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0.0
+        await response.write(_chunk(model, {"role": "assistant", "content": ""}))
+        for i, word in enumerate(answer.split(" ")):
+            if interval:
+                await asyncio.sleep(interval)
+            await response.write(_chunk(model, {"content": word if i == 0 else " " + word}))
+        await response.write(_chunk(model, {}, "stop"))
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        rng = self._rng("embeddings", json.dumps(body, sort_keys=True))
+        await self._delay(rng, self.config.api_latency)
+        error = self._fail(rng)
+        if error is not None:
+            return error
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = []
+        for i, text in enumerate(inputs):
+            seed = zlib.crc32(json.dumps(text).encode("utf-8"))
+            vector = np.random.default_rng(seed).standard_normal(body.get("dimensions", 1536))
+            data.append({"object": "embedding", "index": i, "embedding": (vector / np.linalg.norm(vector)).tolist()})
+        return web.json_response({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        })
+
+    async def search(self, request: web.Request) -> web.Response:
+        query = request.query.get("query", "")
+        rng = self._rng("search", query)
+        await self._delay(rng, self.config.api_latency)
+        error = self._fail(rng)
+        if error is not None:
+            return error
+        return web.json_response({"data": [{"location_id": location_id(query), "name": query}]})
+
+    async def resource(self, request: web.Request) -> web.Response:
+        location, resource = request.match_info["location_id"], request.match_info["resource"]
+        rng = self._rng("resource", f"{location}/{resource}?{request.query_string}")
+        await self._delay(rng, self.config.api_latency)
+        error = self._fail(rng)
+        if error is not None:
+            return error
+        if resource == "details":
+            return web.json_response({
+                "location_id": location,
+                "description": " ".join(_FILLER),
+                "rating": "4.5",
+            })
+        category = request.query.get("category", resource)
+        return web.json_response({
+            "data": [{"location_id": f"{location}{i}", "name": f"{category.title()} {i + 1}"} for i in range(5)]
+        })
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat)
+        app.router.add_post("/v1/embeddings", self.embeddings)
+        app.router.add_get("/locations/search", self.search)
+        app.router.add_get("/locations/{location_id}/{resource}", self.resource)
+        return app
+
+
+def start_standin(config: StandinConfig = StandinConfig(), port: int = 0) -> int:
+    """
+    Serves the stand-in from a background thread and returns its port.
+    """
+    ready = threading.Event()
+    ports = []
+
+    def serve() -> None:
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(Standin(config).app())
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", port)
+        loop.run_until_complete(site.start())
+        ports.append(site._server.sockets[0].getsockname()[1])
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, name="standin", daemon=True).start()
+    ready.wait()
+    return ports[0]
+
+
+def standin_settings(port: int, **overrides) -> Settings:
+    """
+    Returns settings pointing the pipeline at a stand-in on the given port, with the
+    caches and fast path off so every request reaches it.
+    """
+    values = dict(
+        openai_api_key="sk-standin",
+        openai_base_url=f"http://127.0.0.1:{port}/v1",
+        tripadvisor_api_token="standin",
+        tripadvisor_base_url=f"http://127.0.0.1:{port}",
+        llm_cache_backend="none",
+        tool_cache_enabled=False,
+        tagger_fast_path=False,
+    )
+    values.update(overrides)
+    return Settings(**values)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="chat completion latency in seconds")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="TripAdvisor latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum seconds added to or removed from each delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="streaming rate; 0 sends at once")
+    parser.add_argument("--answer-tokens", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        latency=args.latency,
+        api_latency=args.api_latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+        seed=args.seed,
+    )
+    web.run_app(Standin(config).app(), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
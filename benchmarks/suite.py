@@ -0,0 +1,270 @@
+"""
+Measures the cost of each pipeline stage and end-to-end latency and throughput against
+the local stand-in, and writes the results as JSON for comparing commits.
+
+    python -m benchmarks.suite --output bench.json --samples 50 --levels 1 8 32
+    python -m benchmarks.suite --baseline bench.json
+    python -m benchmarks.suite --pipeline-mode fused --baseline bench.json
+
+Stages measured:
+    construction: building Tagger, Information_Extractor and Summarizer.
+    tagger: one model call extracting the intent.
+    destination_lookup: an uncached TripAdvisor location search.
+    tool_selection: the model call choosing a tool, offered the tools of the configured binding.
+    tool_call: running the chosen tool.
+    summarizer_ttft / summarizer_total: time to the first streamed token and to the last.
+    end_to_end: TravelPipeline.arun at each concurrency level, with throughput. Tools
+        are chosen as configured, so the routing table skips most tool-selection calls.
+
+Caches and the rule-based fast path are off, so every sample reaches the stand-in.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List
+
+from benchmarks.standin import StandinConfig, standin_settings, start_standin
+from chains.information_extractor import Information_Extractor
+from chains.intent_rules import DEFAULT_DESTINATIONS
+from chains.pipeline import TravelPipeline
+from chains.registry import Chains
+from chains.summarizer import Summarizer
+from chains.tagger import Tagger
+from chains.tool_routing import routing_summary
+from schema.schema import UserIntent
+from utils.config import reload_settings
+from utils.llm_usage import usage_summary
+from utils.memory import new_memory
+from utils.tools import destination_cache, get_destination_info
+
+INTENTS = ("overview", "attractions", "weather", "activities")
+QUESTIONS = {
+    "overview": "Tell me about {}.",
+    "attractions": "What are the top attractions in {}?",
+    "weather": "What is the weather like in {} in spring?",
+    "activities": "What are fun things to do in {}?",
+}
+
+
+def questions(count: int) -> List[tuple]:
+    """
+    Returns ``count`` (destination, intent, question) triples cycling through destinations and intents.
+    """
+    triples = []
+    for i in range(count):
+        destination = DEFAULT_DESTINATIONS[i % len(DEFAULT_DESTINATIONS)]
+        intent = INTENTS[i % len(INTENTS)]
+        triples.append((destination, intent, QUESTIONS[intent].format(destination)))
+    return triples
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """
+    Returns the count, mean and p50/p95/p99 of the latencies, in seconds.
+    """
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"count": 0}
+
+    def percentile(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "mean_s": sum(ordered) / len(ordered),
+        "min_s": ordered[0],
+        "p50_s": percentile(0.50),
+        "p95_s": percentile(0.95),
+        "p99_s": percentile(0.99),
+        "max_s": ordered[-1],
+    }
+
+
+def time_construction(samples: int) -> Dict[str, dict]:
+    results = {}
+    factories: Dict[str, Callable] = {
+        "tagger": Tagger,
+        "information_extractor": Information_Extractor,
+        "summarizer": Summarizer,
+    }
+    for name, factory in factories.items():
+        latencies = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            factory()
+            latencies.append(time.perf_counter() - start)
+        results[name] = summarize(latencies)
+    return results
+
+
+async def time_stages(chains: Chains, samples: int) -> Dict[str, dict]:
+    latencies: Dict[str, List[float]] = {
+        stage: []
+        for stage in ("tagger", "destination_lookup", "tool_selection", "tool_call", "summarizer_ttft", "summarizer_total")
+    }
+    extractor = chains.information_extractor
+    for destination, intent, question in questions(samples):
+        start = time.perf_counter()
+        await chains.tagger.aextract_information(question, memory=new_memory())
+        latencies["tagger"].append(time.perf_counter() - start)
+
+        destination_cache.clear()
+        start = time.perf_counter()
+        info = await get_destination_info.arun(destination)
+        latencies["destination_lookup"].append(time.perf_counter() - start)
+
+        user_intent = UserIntent(name=destination, intent=intent)
+        start = time.perf_counter()
+        selector, _ = extractor.selector_for(intent)
+        action = await selector.ainvoke({"input": extractor._build_query(user_intent, info)})
+        latencies["tool_selection"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        information = await extractor.aroute(action)
+        latencies["tool_call"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        first_token = None
+        async for _ in chains.summarizer.astream(str(information), question):
+            if first_token is None:
+                first_token = time.perf_counter()
+        end = time.perf_counter()
+        latencies["summarizer_ttft"].append((first_token or end) - start)
+        latencies["summarizer_total"].append(end - start)
+    return {stage: summarize(values) for stage, values in latencies.items()}
+
+
+async def time_end_to_end(pipeline: TravelPipeline, in_flight: int, requests: int) -> dict:
+    slots = asyncio.Semaphore(in_flight)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(question: str) -> None:
+        nonlocal errors
+        async with slots:
+            start = time.perf_counter()
+            try:
+                await pipeline.arun(question, session_id=str(uuid.uuid4()))
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(question) for _, _, question in questions(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "in_flight": in_flight,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+        "latency": summarize(latencies),
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(
+    config: StandinConfig,
+    samples: int,
+    levels: List[int],
+    requests_per_level: int,
+    pipeline_mode: str = "staged",
+) -> dict:
+    """
+    Runs every benchmark against a stand-in with the given configuration.
+    """
+    port = start_standin(config)
+    reload_settings(standin_settings(port, pipeline_mode=pipeline_mode))
+    chains = Chains(Tagger(), Information_Extractor(), Summarizer())
+    pipeline = TravelPipeline(chains)
+
+    async def measure() -> tuple:
+        stages = await time_stages(chains, samples)
+        end_to_end = [
+            await time_end_to_end(pipeline, level, max(requests_per_level, level)) for level in levels
+        ]
+        return stages, end_to_end
+
+    construction = time_construction(max(1, samples // 10))
+    stages, end_to_end = asyncio.run(measure())
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "standin": config.__dict__,
+        "pipeline_mode": pipeline_mode,
+        "construction": construction,
+        "stages": stages,
+        "end_to_end": end_to_end,
+        "function_tokens": chains.information_extractor.function_tokens,
+        "tool_routing": routing_summary(),
+        "llm_usage": usage_summary(),
+    }
+
+
+def compare(baseline: dict, results: dict) -> Dict[str, float]:
+    """
+    Returns the relative change in p50 latency of each stage against a baseline run.
+    """
+    changes = {}
+    for section in ("construction", "stages"):
+        for stage, current in results[section].items():
+            before = baseline.get(section, {}).get(stage, {}).get("p50_s")
+            if before:
+                changes[f"{section}.{stage}"] = current["p50_s"] / before - 1
+    for before, current in zip(baseline.get("end_to_end", []), results["end_to_end"]):
+        if before["in_flight"] == current["in_flight"] and before["latency"].get("p50_s"):
+            changes[f"end_to_end.{current['in_flight']}"] = current["latency"]["p50_s"] / before["latency"]["p50_s"] - 1
+    return changes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="file the JSON results are written to; defaults to stdout")
+    parser.add_argument("--samples", type=int, default=50, help="samples per stage")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="end-to-end requests per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.2, help="stand-in chat completion latency in seconds")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="stand-in TripAdvisor latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pipeline-mode", choices=["staged", "fused"], default="staged",
+                        help="whether tagging and tool selection are separate model calls or one")
+    parser.add_argument("--baseline", help="results of an earlier run to report p50 changes against")
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        latency=args.latency,
+        api_latency=args.api_latency,
+        jitter=args.jitter,
+        tokens_per_second=args.tokens_per_second,
+        seed=args.seed,
+    )
+    results = run(config, args.samples, args.levels, args.requests, args.pipeline_mode)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            results["p50_change"] = compare(json.load(f), results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
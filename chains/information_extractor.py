@@ -1,13 +1,60 @@
+import asyncio
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from langchain_community.chat_models import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
+from utils.config import get_settings
+from utils.llm_cache import with_cache
+from utils.llm_usage import openai_clients
 from langchain.utils.openai_functions import convert_pydantic_to_openai_function
 from langchain.output_parsers.openai_functions import PydanticOutputFunctionsParser
-from utils.tools import get_destination_info, get_travel_guide, get_local_events, get_restaurant_recommendations, get_accommodation_options, get_images
+from utils.tools import ToolError, get_destination_info, get_travel_guide, get_local_events, get_restaurant_recommendations, get_accommodation_options, get_images
 from schema.schema import UserIntent
+from chains.tool_routing import ToolRouter
 from langchain.agents.output_parsers import OpenAIFunctionsAgentOutputParser
-from langchain.schema.agent import AgentFinish
+from langchain.schema.agent import AgentAction, AgentFinish
 from langchain.memory import ConversationBufferWindowMemory
 from langchain.tools.render import format_tool_to_openai_function
+from utils.cache import normalize_name
+from utils.logger import logger
+from utils.memory import count_tokens
+from utils.metrics import metrics
+from utils.tool_cache import get_tool_cache
+from utils.tracing import span
+
+# The tools offered to the model, by name
+TOOLS = {
+    tool.name: tool
+    for tool in [get_destination_info, get_travel_guide, get_local_events, get_restaurant_recommendations, get_accommodation_options, get_images]
+}
+
+# Stands in for the information of a pair whose retrieval failed
+NO_INFORMATION = "No information is available."
+
+# How a tool chosen without the tool-selection call was chosen: by the Tagger in fused
+# mode or by the routing table. Also the values of tool_routing_total's route label.
+_ROUTED = ("fused", "table")
+
+# The tools relevant to each intent. With intent-scoped binding only these schemas are
+# sent with the tool-selection call; other intents are offered every tool.
+INTENT_TOOLS = {
+    "overview": ["get_destination_info", "get_travel_guide", "get_images"],
+    "attractions": ["get_travel_guide", "get_local_events", "get_images"],
+    "weather": ["get_destination_info", "get_travel_guide"],
+    "activities": ["get_local_events", "get_restaurant_recommendations", "get_accommodation_options"],
+}
+
+# The tool most likely to be chosen for each intent, started speculatively by
+# aget_information while the destination lookup and tool selection are in flight.
+SPECULATIVE_TOOLS = {
+    "overview": "get_destination_info",
+    "attractions": "get_travel_guide",
+    "weather": "get_destination_info",
+    "activities": "get_local_events",
+}
+
 
 class Information_Extractor:
     """
@@ -23,27 +70,48 @@ class Information_Extractor:
         A list of functions to format the tools to OpenAI functions.
     model : ChatOpenAI
         The OpenAI chat model.
+    selector : langchain.pipeline.Pipeline
+        The pipeline that picks a tool without running it, offered every tool.
+    selectors : dict
+        With intent-scoped binding, a selector per intent offered only INTENT_TOOLS[intent].
+    function_tokens : dict
+        The tokens the function schemas add to each selection call, per variant ("all" or an intent).
+    router : ToolRouter
+        Chooses the tool from the intent without a model call, or None if the model always chooses.
     chain : langchain.pipeline.Pipeline
         The pipeline to process the chat.
 
     Methods
     -------
+    selector_for(intent)
+        Returns the selector and variant name used for an intent.
     route(result)
         Routes the result based on its type.
-    get_information(user_intent)
+    get_information(user_intent, question)
         Gets the information about a travel destination based on the user's intent.
+    aroute(result)
+        Asynchronously routes the result based on its type.
+    aget_information(user_intent, speculate, question)
+        Asynchronously gets the information, optionally running the likely tool speculatively.
+    get_information_many(user_intents, max_concurrency, question)
+        Gets the information for several (destination, intent) pairs at once, merged into one context.
+    aget_information_many(user_intents, speculate, max_concurrency, question)
+        Asynchronously gets the information for several pairs at once, merged into one context.
     """
 
-    def __init__(self, api_key: str) -> None:
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None) -> None:
         """
         Constructs all the necessary attributes for the Information_Extractor object.
 
         Parameters
         ----------
-        api_key : str
-            The API key to access the OpenAI model.
+        api_key : str, optional
+            The API key to access the OpenAI model. Defaults to the configured key.
+        model : str, optional
+            The name of the OpenAI chat model to use. Defaults to the configured model.
         """
-        self.api_key = api_key
+        settings = get_settings()
+        self.api_key = api_key or settings.openai_api_key
         self.prompt = ChatPromptTemplate.from_messages([
             (
                 "system",
@@ -51,16 +119,93 @@ class Information_Extractor:
             ),
             ("user", "{input}"),
         ])
-        self.functions = [
-            format_tool_to_openai_function(f)
-            for f in [get_destination_info, get_travel_guide, get_local_events, get_restaurant_recommendations, get_accommodation_options, get_images]
-        ]
-        self.model = ChatOpenAI(
-            api_key=self.api_key, temperature=0.0, model="gpt-3.5-turbo-0125"
-        ).bind(functions=self.functions)
-        self.chain = (
-            self.prompt | self.model | OpenAIFunctionsAgentOutputParser() | self.route
+        self.functions = [format_tool_to_openai_function(f) for f in TOOLS.values()]
+        chat_model = ChatOpenAI(
+            api_key=self.api_key,
+            temperature=0.0,
+            model=model or settings.openai_model,
+            base_url=settings.openai_base_url,
+            timeout=settings.openai_timeout,
+            **openai_clients(self.api_key, settings.openai_base_url, settings.openai_timeout),
         )
+        self.model = chat_model.bind(functions=self.functions)
+        self.selector = self._selector(self.model)
+        self.function_tokens = {"all": self._count_function_tokens(self.functions)}
+        self.selectors = {}
+        if settings.tool_binding == "intent":
+            # One bound model per intent, built once and reused by every call
+            for intent, names in INTENT_TOOLS.items():
+                functions = [f for f in self.functions if f["name"] in names]
+                self.selectors[intent] = self._selector(chat_model.bind(functions=functions))
+                self.function_tokens[intent] = self._count_function_tokens(functions)
+        elif settings.tool_binding != "all":
+            raise ValueError(f"Unknown tool binding: {settings.tool_binding}")
+        self.chain = self.selector | self.route
+        self.router = None
+        if settings.tool_routing == "table":
+            self.router = ToolRouter.from_file(settings.tool_routes_path) if settings.tool_routes_path else ToolRouter()
+            unknown = self.router.tools() - set(TOOLS)
+            if unknown:
+                raise ValueError(f"Unknown tools in the routing table: {sorted(unknown)}")
+        elif settings.tool_routing != "llm":
+            raise ValueError(f"Unknown tool routing: {settings.tool_routing}")
+        self.max_concurrency = settings.retrieval_max_concurrency
+
+    def _selector(self, model):
+        return self.prompt | with_cache(model, "information_extractor") | OpenAIFunctionsAgentOutputParser()
+
+    @staticmethod
+    def _count_function_tokens(functions: list) -> int:
+        return count_tokens(json.dumps(functions))
+
+    def selector_for(self, intent: str):
+        """
+        Returns the selector used for an intent and the name of its variant.
+
+        Parameters
+        ----------
+        intent : str
+            The tagged intent.
+
+        Returns
+        -------
+        tuple
+            The selector and the variant name: the intent, or "all" when every tool is offered.
+        """
+        if intent in self.selectors:
+            return self.selectors[intent], intent
+        return self.selector, "all"
+
+    def _routed_action(self, user_intent: UserIntent, question: Optional[str]) -> Optional[AgentAction]:
+        # A tool chosen by the Tagger in fused mode comes first, then the routing table
+        tool = getattr(user_intent, "tool", None)
+        route = "fused"
+        if tool not in TOOLS:
+            tool = self.router.route(user_intent.intent, question) if self.router is not None else None
+            route = "table"
+        if tool is None:
+            return None
+        return AgentAction(tool=tool, tool_input={"name": user_intent.name}, log=route)
+
+    @staticmethod
+    def _count_route(user_intent: UserIntent, route: str) -> None:
+        metrics.counter("tool_routing_total", intent=user_intent.intent, route=route).inc()
+
+    def _select(self, user_intent: UserIntent, input_query: str):
+        selector, variant = self.selector_for(user_intent.intent)
+        metrics.counter("tool_selection_function_tokens_total", tools=variant).inc(self.function_tokens[variant])
+        with span("tool_selection", tools=variant) as current:
+            result = selector.invoke({"input": input_query})
+            current.set(tool=getattr(result, "tool", None))
+        return result
+
+    async def _aselect(self, user_intent: UserIntent, input_query: str):
+        selector, variant = self.selector_for(user_intent.intent)
+        metrics.counter("tool_selection_function_tokens_total", tools=variant).inc(self.function_tokens[variant])
+        with span("tool_selection", tools=variant) as current:
+            result = await selector.ainvoke({"input": input_query})
+            current.set(tool=getattr(result, "tool", None))
+        return result
 
     def route(self, result):
         """
@@ -75,36 +220,274 @@ class Information_Extractor:
         -------
         str
             The output if the result is an AgentFinish, otherwise runs the tool with the tool input.
+            Tool results are served from the tool cache while fresh, and identical concurrent
+            calls share one request.
         """
         if isinstance(result, AgentFinish):
             return result.return_values["output"]
         else:
-            tools = {
-                "get_destination_info": get_destination_info,
-                "get_travel_guide": get_travel_guide,
-                "get_local_events": get_local_events,
-                "get_restaurant_recommendations": get_restaurant_recommendations,
-                "get_accommodation_options": get_accommodation_options,
-                "get_images": get_images
-            }
-            return tools[result.tool].run(result.tool_input)
-
-    def get_information(self, user_intent: UserIntent) -> str:
+            tool = TOOLS[result.tool]
+            cache = get_tool_cache()
+            with span("tool", tool=result.tool, speculative=False, routed=result.log in _ROUTED):
+                if cache is None:
+                    return tool.run(result.tool_input)
+                return cache.run(result.tool, result.tool_input, lambda: tool.run(result.tool_input))
+
+    async def aroute(self, result):
+        """
+        Asynchronously routes the result based on its type, awaiting the tool's async implementation.
+
+        Parameters
+        ----------
+        result : AgentFinish or other
+            The result to route.
+
+        Returns
+        -------
+        str
+            The output if the result is an AgentFinish, otherwise runs the tool with the tool input.
+        """
+        if isinstance(result, AgentFinish):
+            return result.return_values["output"]
+        else:
+            tool = TOOLS[result.tool]
+            cache = get_tool_cache()
+            with span("tool", tool=result.tool, speculative=result.log == "speculative", routed=result.log in _ROUTED):
+                if cache is None:
+                    return await tool.arun(result.tool_input)
+                return await cache.arun(result.tool, result.tool_input, lambda: tool.arun(result.tool_input))
+
+    def get_information(self, user_intent: UserIntent, question: Optional[str] = None) -> str:
         """
         Gets the information about a travel destination based on the user's intent.
 
+        When the tool was chosen by the Tagger in fused mode or by the routing table and the
+        destination is found, the tool is run without asking the model; otherwise the model
+        selects it.
+
         Parameters
         ----------
         user_intent : UserIntent
             The user's intent.
+        question : str, optional
+            The user's question, whose keywords can route to a more specific tool.
 
         Returns
         -------
         str
             The information about the travel destination.
         """
+        routed = self._routed_action(user_intent, question)
         # Assuming user_intent provides details like destination name or ID
-        destination_info: str = get_destination_info(user_intent.name)
-        input_query = f"I want to know about the travel destination with id {destination_info['id']} or name {destination_info['name']} and want to talk about the {user_intent.intent}."
-        information: str = self.chain.invoke({"input": input_query})
+        destination_info = self._lookup(user_intent.name)
+        if routed is not None and destination_info:
+            self._count_route(user_intent, routed.log)
+            return self.route(routed)
+        self._count_route(user_intent, "llm")
+        input_query = self._build_query(user_intent, destination_info)
+        result = self._select(user_intent, input_query)
+        information: str = self.route(result)
         return information
+
+    async def aget_information(self, user_intent: UserIntent, speculate: bool = False, question: Optional[str] = None) -> str:
+        """
+        Asynchronously gets the information about a travel destination based on the user's intent.
+
+        When the tool was chosen by the Tagger in fused mode or by the routing table, it is
+        started alongside the destination lookup and its result used without asking the
+        model, unless the destination is not found.
+
+        Otherwise, with ``speculate`` enabled, the tool most likely to be chosen for the
+        intent is started alongside the destination lookup. If the model then selects the
+        same tool with the same input the speculative result is used, saving one round trip;
+        otherwise the speculative call is cancelled and the selected tool is run.
+
+        Parameters
+        ----------
+        user_intent : UserIntent
+            The user's intent.
+        speculate : bool, optional
+            Whether to run the most likely tool before the model has selected it.
+        question : str, optional
+            The user's question, whose keywords can route to a more specific tool.
+
+        Returns
+        -------
+        str
+            The information about the travel destination.
+        """
+        lookup = asyncio.create_task(self._alookup(user_intent.name))
+        speculative = None
+        speculative_action = self._routed_action(user_intent, question)
+        if speculative_action is None and speculate and user_intent.intent in SPECULATIVE_TOOLS:
+            speculative_action = AgentAction(
+                tool=SPECULATIVE_TOOLS[user_intent.intent],
+                tool_input={"name": user_intent.name},
+                log="speculative",
+            )
+        if speculative_action is not None:
+            speculative = asyncio.create_task(self.aroute(speculative_action))
+        try:
+            destination_info = await lookup
+            if speculative_action is not None and speculative_action.log in _ROUTED and destination_info:
+                self._count_route(user_intent, speculative_action.log)
+                return await speculative
+            self._count_route(user_intent, "llm")
+            input_query = self._build_query(user_intent, destination_info)
+            result = await self._aselect(user_intent, input_query)
+            if speculative is not None and self._same_action(result, speculative_action):
+                return await speculative
+            if speculative is not None:
+                self._discard(speculative)
+            return await self.aroute(result)
+        except BaseException:
+            lookup.cancel()
+            if speculative is not None:
+                self._discard(speculative)
+            raise
+
+    def get_information_many(
+        self,
+        user_intents: List[UserIntent],
+        max_concurrency: Optional[int] = None,
+        question: Optional[str] = None,
+    ) -> str:
+        """
+        Gets the information for several (destination, intent) pairs, retrieving them in parallel.
+
+        Parameters
+        ----------
+        user_intents : list of UserIntent
+            The pairs to retrieve. Duplicates are retrieved once.
+        max_concurrency : int, optional
+            The maximum number of pairs retrieved at once. Defaults to the configured limit.
+        question : str, optional
+            The user's question, whose keywords can route each pair to a more specific tool.
+
+        Returns
+        -------
+        str
+            The information for every pair, merged into one context.
+        """
+        user_intents = self._unique(user_intents)
+        if len(user_intents) == 1:
+            return self.get_information(user_intents[0], question)
+        with ThreadPoolExecutor(max_workers=max_concurrency or self.max_concurrency) as executor:
+            # Each branch runs in a copy of the caller's context so its spans stay in the trace
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._branch, user_intent, question)
+                for user_intent in user_intents
+            ]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+        return self._merge(user_intents, results)
+
+    async def aget_information_many(
+        self,
+        user_intents: List[UserIntent],
+        speculate: bool = False,
+        max_concurrency: Optional[int] = None,
+        question: Optional[str] = None,
+    ) -> str:
+        """
+        Asynchronously gets the information for several (destination, intent) pairs.
+
+        The pairs are retrieved concurrently, at most ``max_concurrency`` at a time, so a
+        compound question takes about as long as its slowest pair. A pair that fails is
+        reported in the merged context instead of failing the others.
+
+        Parameters
+        ----------
+        user_intents : list of UserIntent
+            The pairs to retrieve. Duplicates are retrieved once.
+        speculate : bool, optional
+            Whether to run the most likely tool of each pair before the model has selected it.
+        max_concurrency : int, optional
+            The maximum number of pairs retrieved at once. Defaults to the configured limit.
+        question : str, optional
+            The user's question, whose keywords can route each pair to a more specific tool.
+
+        Returns
+        -------
+        str
+            The information for every pair, merged into one context.
+        """
+        user_intents = self._unique(user_intents)
+        if len(user_intents) == 1:
+            return await self.aget_information(user_intents[0], speculate=speculate, question=question)
+        slots = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def branch(user_intent: UserIntent) -> str:
+            async with slots:
+                with span("branch", destination=user_intent.name, intent=user_intent.intent):
+                    return await self.aget_information(user_intent, speculate=speculate, question=question)
+
+        results = await asyncio.gather(*(branch(user_intent) for user_intent in user_intents), return_exceptions=True)
+        return self._merge(user_intents, results)
+
+    def _branch(self, user_intent: UserIntent, question: Optional[str]) -> str:
+        with span("branch", destination=user_intent.name, intent=user_intent.intent):
+            return self.get_information(user_intent, question)
+
+    @staticmethod
+    def _unique(user_intents: List[UserIntent]) -> List[UserIntent]:
+        unique = {}
+        for user_intent in user_intents:
+            unique.setdefault((normalize_name(user_intent.name), user_intent.intent), user_intent)
+        return list(unique.values())
+
+    @staticmethod
+    def _merge(user_intents: List[UserIntent], results: list) -> str:
+        sections = []
+        for user_intent, result in zip(user_intents, results):
+            if isinstance(result, BaseException):
+                if isinstance(result, asyncio.CancelledError):
+                    raise result
+                logger.error(f"Error retrieving {user_intent.intent} for {user_intent.name}: {result}")
+                result = NO_INFORMATION
+            sections.append(f"{user_intent.intent.capitalize()} in {user_intent.name}: {result}")
+        return "\n\n".join(sections)
+
+    @staticmethod
+    def _discard(task: asyncio.Task) -> None:
+        # A speculative call may already have failed; its error is not the request's
+        task.cancel()
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    @staticmethod
+    def _lookup(name: str) -> Optional[dict]:
+        # A failed lookup is treated as not found: the model then works from the name alone
+        with span("destination_lookup", destination=name):
+            try:
+                return get_destination_info.run(name)
+            except ToolError:
+                return None
+
+    @staticmethod
+    async def _alookup(name: str) -> Optional[dict]:
+        with span("destination_lookup", destination=name):
+            try:
+                return await get_destination_info.arun(name)
+            except ToolError:
+                return None
+
+    @staticmethod
+    def _build_query(user_intent: UserIntent, destination_info: Optional[dict]) -> str:
+        if not destination_info:
+            # The lookup found nothing; let the model work from the name alone
+            return f"I want to know about the travel destination with name {user_intent.name} and want to talk about the {user_intent.intent}."
+        location_id = destination_info.get('location_id', destination_info.get('id'))
+        return f"I want to know about the travel destination with id {location_id} or name {destination_info['name']} and want to talk about the {user_intent.intent}."
+
+    @staticmethod
+    def _same_action(result, action: AgentAction) -> bool:
+        if isinstance(result, AgentFinish) or result.tool != action.tool:
+            return False
+        tool_input = result.tool_input
+        if isinstance(tool_input, dict):
+            tool_input = tool_input.get("name", "")
+        return str(tool_input).strip().casefold() == action.tool_input["name"].strip().casefold()
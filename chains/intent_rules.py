@@ -0,0 +1,196 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from schema.schema import UserIntent
+from utils.cache import normalize_name
+from utils.gazetteer import Gazetteer
+
+# Keyword rules for the intents defined on UserIntent
+INTENT_PATTERNS: Dict[str, re.Pattern] = {
+    "overview": re.compile(
+        r"\b(overview|tell me about|what is [\w ]+ like|information about|info about|general info|about the city|worth visiting)\b"
+    ),
+    "attractions": re.compile(
+        r"\b(attractions?|sights?|sightseeing|landmarks?|places to (visit|see)|must see|museums?|monuments?|what to see)\b"
+    ),
+    "weather": re.compile(
+        r"\b(weather|climate|temperature|rain(y|fall)?|sunny|hot|cold|forecast|season|best time to (visit|go))\b"
+    ),
+    "activities": re.compile(
+        r"\b(activities|things to do|what to do|tours?|hiking|nightlife|shopping|food|restaurants?|eat|events?|adventure)\b"
+    ),
+}
+
+# Well-known destinations recognized without a model call
+DEFAULT_DESTINATIONS = (
+    "Amsterdam", "Athens", "Bali", "Bangkok", "Barcelona", "Beijing", "Berlin", "Boston",
+    "Budapest", "Buenos Aires", "Cairo", "Cancun", "Cape Town", "Chicago", "Copenhagen",
+    "Dubai", "Dublin", "Edinburgh", "Florence", "Hanoi", "Havana", "Hawaii", "Hong Kong",
+    "Iceland", "Istanbul", "Kyoto", "Las Vegas", "Lisbon", "London", "Los Angeles", "Madrid",
+    "Marrakech", "Melbourne", "Mexico City", "Miami", "Milan", "Montreal", "Munich",
+    "New Orleans", "New York", "Osaka", "Paris", "Porto", "Prague", "Reykjavik",
+    "Rio de Janeiro", "Rome", "San Francisco", "Santorini", "Seoul", "Seville", "Shanghai",
+    "Singapore", "Stockholm", "Sydney", "Tokyo", "Toronto", "Vancouver", "Venice", "Vienna",
+)
+
+_MAX_NAME_WORDS = 4
+
+# What may stand between two destinations listed together; commas are dropped with the
+# punctuation, so "Lisbon, Porto" leaves nothing between them
+_JOINERS = {"", "and", "or", "vs", "versus", "and or"}
+_COMPARISON = re.compile(r"\b(compare|comparing|comparison|difference between|differences between)\b")
+_COMPARE_JOINERS = _JOINERS | {"to", "with"}
+
+
+class RuleBasedTagger:
+    """
+    A deterministic intent classifier using keyword rules and a list of known destinations.
+
+    Attributes:
+        destinations (Dict[str, str]): Known destination names keyed by their normalized form.
+        gazetteer (Gazetteer): An offline index of destinations consulted after ``destinations``, or None.
+        threshold (float): The minimum confidence for a result to be returned.
+    """
+
+    def __init__(
+        self,
+        destinations: Iterable[str] = DEFAULT_DESTINATIONS,
+        threshold: float = 0.8,
+        gazetteer: Optional[Gazetteer] = None,
+    ) -> None:
+        """
+        Initializes the classifier.
+
+        Args:
+            destinations (Iterable[str]): The destination names to recognize.
+            threshold (float): The minimum confidence for a result to be returned.
+            gazetteer (Gazetteer, optional): An offline index of further destinations.
+        """
+        self.destinations = {normalize_name(name): name for name in destinations}
+        self.gazetteer = gazetteer
+        self.threshold = threshold
+
+    def _lookup(self, phrase: str) -> Optional[str]:
+        name = self.destinations.get(phrase)
+        if name is None and self.gazetteer is not None:
+            place = self.gazetteer.exact(phrase)
+            if place is not None:
+                name = place.name
+        return name
+
+    def _mentions(self, words: List[str]) -> List[Tuple[str, int, int]]:
+        # (name, first word, word after the last) of each destination mention, longest match first
+        mentions, i = [], 0
+        while i < len(words):
+            for size in range(min(_MAX_NAME_WORDS, len(words) - i), 0, -1):
+                name = self._lookup(" ".join(words[i:i + size]))
+                if name is not None:
+                    mentions.append((name, i, i + size))
+                    i += size
+                    break
+            else:
+                i += 1
+        return mentions
+
+    def find_destinations(self, text: str) -> List[str]:
+        """
+        Returns the known destinations mentioned in the text, preferring the longest match.
+        """
+        found = []
+        for name, _, _ in self._mentions(re.findall(r"[\w']+", normalize_name(text))):
+            if name not in found:
+                found.append(name)
+        return found
+
+    def _coordinated(self, text: str) -> bool:
+        # Whether the destinations are listed together, as in "Lisbon, Porto and Madrid",
+        # rather than playing different roles, as in "flying from London to Paris"
+        normalized = normalize_name(text)
+        words = re.findall(r"[\w']+", normalized)
+        mentions = self._mentions(words)
+        joiners = _COMPARE_JOINERS if _COMPARISON.search(normalized) else _JOINERS
+        return all(
+            " ".join(words[end:start]) in joiners
+            for (_, _, end), (_, start, _) in zip(mentions, mentions[1:])
+        )
+
+    def classify(self, text: str) -> Tuple[Optional[UserIntent], float]:
+        """
+        Classifies the text into a destination and intent.
+
+        Args:
+            text (str): The user's input string.
+
+        Returns:
+            Tuple[Optional[UserIntent], float]: The intent, or None if no single destination
+                was found, and the confidence of the classification.
+        """
+        destinations = self.find_destinations(text)
+        if len(destinations) != 1:
+            return None, 0.0
+        normalized = normalize_name(text)
+        intents = [intent for intent, pattern in INTENT_PATTERNS.items() if pattern.search(normalized)]
+        if len(intents) == 1:
+            intent, confidence = intents[0], 0.9
+        elif not intents:
+            # A bare destination mention most likely asks for general information
+            intent, confidence = "overview", 0.6
+        else:
+            specific = [i for i in intents if i != "overview"]
+            if len(specific) != 1:
+                return None, 0.3
+            intent, confidence = specific[0], 0.85
+        return UserIntent(name=destinations[0], intent=intent), confidence
+
+    def extract(self, text: str) -> Optional[UserIntent]:
+        """
+        Returns the intent if the classification is at least as confident as the threshold.
+        """
+        intent, confidence = self.classify(text)
+        if intent is None or confidence < self.threshold:
+            return None
+        return intent
+
+    def classify_all(self, text: str) -> Tuple[List[UserIntent], float]:
+        """
+        Classifies the text into every (destination, intent) pair it asks about.
+
+        Every destination mentioned is paired with every topic mentioned, so "weather and
+        food in Lisbon and Porto" yields four pairs. Several destinations that are not
+        listed together, as in "flying from London to Paris", are classified with low
+        confidence, since the question may be about only one of them.
+
+        Args:
+            text (str): The user's input string.
+
+        Returns:
+            Tuple[List[UserIntent], float]: The pairs, empty if no destination was found,
+                and the confidence of the classification.
+        """
+        destinations = self.find_destinations(text)
+        if not destinations:
+            return [], 0.0
+        normalized = normalize_name(text)
+        intents = [intent for intent, pattern in INTENT_PATTERNS.items() if pattern.search(normalized)]
+        specific = [intent for intent in intents if intent != "overview"]
+        if len(destinations) > 1 and not self._coordinated(text):
+            # Only one of the places may be asked about; leave it to the model
+            topics, confidence = specific or ["overview"], 0.5
+        elif not intents:
+            # A bare destination mention most likely asks for general information
+            topics, confidence = ["overview"], 0.6
+        elif len(destinations) == 1 and len(intents) == 1:
+            topics, confidence = intents, 0.9
+        else:
+            topics, confidence = specific or ["overview"], 0.85
+        pairs = [UserIntent(name=destination, intent=intent) for destination in destinations for intent in topics]
+        return pairs, confidence
+
+    def extract_all(self, text: str) -> Optional[List[UserIntent]]:
+        """
+        Returns every pair if the classification is at least as confident as the threshold.
+        """
+        pairs, confidence = self.classify_all(text)
+        if not pairs or confidence < self.threshold:
+            return None
+        return pairs
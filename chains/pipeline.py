@@ -0,0 +1,183 @@
+import asyncio
+import contextvars
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from chains.registry import Chains, get_chains
+from schema.schema import UserIntent
+from utils.tracing import span
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def run_async(coro):
+    """
+    Runs a coroutine on the process-wide background event loop and waits for its result.
+
+    Sharing one long-lived loop lets synchronous callers reuse the pooled async HTTP
+    clients, which are bound to the loop that created them. The caller's context
+    variables, such as the current tracing span, are carried over to the coroutine.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="pipeline-loop", daemon=True).start()
+    context = contextvars.copy_context()
+
+    async def in_context():
+        # Runs inside the loop's own copy of the context, so these sets do not leak
+        for var, value in context.items():
+            var.set(value)
+        return await coro
+
+    return asyncio.run_coroutine_threadsafe(in_context(), _loop).result()
+
+
+@dataclass(frozen=True)
+class Answer:
+    """
+    The result of running a question through the pipeline.
+    """
+
+    user_intents: List[UserIntent]
+    information: str
+    answer: str
+
+    @property
+    def user_intent(self) -> UserIntent:
+        """
+        The first (destination, intent) pair of the question.
+        """
+        return self.user_intents[0]
+
+
+def cache_intent(user_intents: List[UserIntent]) -> Optional[UserIntent]:
+    """
+    Returns the intent the Summarizer's semantic cache is keyed on, or None for a compound
+    question, whose answer must not be reused for a question about one of its parts.
+    """
+    return user_intents[0] if len(user_intents) == 1 else None
+
+
+class TravelPipeline:
+    """
+    Runs a question through Tagger, destination lookup, Information_Extractor and Summarizer.
+
+    A question may ask about several destinations and topics. The Tagger returns every
+    (destination, intent) pair, the pairs are retrieved concurrently and the Summarizer
+    answers once from the merged information.
+
+    run and arun trace each question as a "request" span with child spans for tagging,
+    retrieval and summarization. Callers streaming the answer open the request span
+    themselves.
+
+    Attributes:
+        chains (Chains): The shared chains used for every question.
+        speculate (bool): Whether the likely tool is started before the model selects it.
+    """
+
+    def __init__(self, chains: Optional[Chains] = None, speculate: bool = True) -> None:
+        """
+        Initializes the pipeline.
+
+        Args:
+            chains (Chains, optional): The chains to use. Defaults to the process-wide shared chains.
+            speculate (bool): Whether the likely tool is started before the model selects it.
+        """
+        self.chains = chains or get_chains()
+        self.speculate = speculate
+
+    def retrieve(self, question: str, session_id: Optional[str] = None) -> Tuple[List[UserIntent], str]:
+        """
+        Tags the question and fetches the information needed to answer it.
+
+        Args:
+            question (str): The user's question.
+            session_id (str, optional): The conversation the question belongs to.
+
+        Returns:
+            Tuple[List[UserIntent], str]: The extracted (destination, intent) pairs and the
+                retrieved information.
+        """
+        with span("retrieve", session_id=session_id) as current:
+            with span("tagger", fused=self.chains.tagger.fused):
+                user_intents = self.chains.tagger.extract_intents(question, session_id=session_id)
+            current.set(intents=[(user_intent.name, user_intent.intent) for user_intent in user_intents])
+            information = run_async(
+                self.chains.information_extractor.aget_information_many(
+                    user_intents, speculate=self.speculate, question=question
+                )
+            )
+        return user_intents, information
+
+    def summarize(self, question: str, user_intents: List[UserIntent], information: str) -> str:
+        """
+        Answers the question from the retrieved information.
+        """
+        with span("summarizer"):
+            return self.chains.summarizer.summarize(information, question, cache_intent(user_intents))
+
+    def summarize_stream(self, question: str, user_intents: List[UserIntent], information: str) -> Iterator[str]:
+        """
+        Answers the question from the retrieved information, yielding the answer token by token.
+        """
+        with span("summarizer"):
+            yield from self.chains.summarizer.stream(information, question, cache_intent(user_intents))
+
+    def run(self, question: str, session_id: Optional[str] = None) -> Answer:
+        """
+        Answers the question.
+        """
+        with span("request", session_id=session_id):
+            user_intents, information = self.retrieve(question, session_id)
+            answer = self.summarize(question, user_intents, information)
+        return Answer(user_intents, information, answer)
+
+    def stream(self, question: str, session_id: Optional[str] = None) -> Iterator[str]:
+        """
+        Answers the question, yielding the answer token by token.
+        """
+        user_intents, information = self.retrieve(question, session_id)
+        yield from self.summarize_stream(question, user_intents, information)
+
+    async def aretrieve(self, question: str, session_id: Optional[str] = None) -> Tuple[List[UserIntent], str]:
+        """
+        Asynchronously tags the question and fetches the information needed to answer it.
+        """
+        with span("retrieve", session_id=session_id) as current:
+            with span("tagger", fused=self.chains.tagger.fused):
+                user_intents = await self.chains.tagger.aextract_intents(question, session_id=session_id)
+            current.set(intents=[(user_intent.name, user_intent.intent) for user_intent in user_intents])
+            information = await self.chains.information_extractor.aget_information_many(
+                user_intents, speculate=self.speculate, question=question
+            )
+        return user_intents, information
+
+    async def asummarize(self, question: str, user_intents: List[UserIntent], information: str) -> str:
+        """
+        Asynchronously answers the question from the retrieved information.
+        """
+        with span("summarizer"):
+            return await self.chains.summarizer.asummarize(information, question, cache_intent(user_intents))
+
+    async def arun(self, question: str, session_id: Optional[str] = None) -> Answer:
+        """
+        Asynchronously answers the question.
+        """
+        with span("request", session_id=session_id):
+            user_intents, information = await self.aretrieve(question, session_id)
+            answer = await self.asummarize(question, user_intents, information)
+        return Answer(user_intents, information, answer)
+
+    async def astream(self, question: str, session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Asynchronously answers the question, yielding the answer token by token.
+        """
+        user_intents, information = await self.aretrieve(question, session_id)
+        with span("summarizer"):
+            async for token in self.chains.summarizer.astream(information, question, cache_intent(user_intents)):
+                yield token
@@ -0,0 +1,101 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from chains.information_extractor import Information_Extractor
+from chains.summarizer import Summarizer
+from chains.tagger import Tagger
+from utils.config import Settings, get_settings, on_reload
+
+
+@dataclass(frozen=True)
+class Chains:
+    """
+    The set of chains needed to answer one travel question.
+
+    The chains hold no per-session state and can be shared between sessions
+    and threads. Conversation memory is passed in by the caller on each call.
+    """
+
+    tagger: Tagger
+    information_extractor: Information_Extractor
+    summarizer: Summarizer
+
+
+class ChainRegistry:
+    """
+    A thread-safe, process-wide cache of chain sets keyed by model configuration.
+
+    Building the chains renders the tool schemas, compiles the prompt templates
+    and creates the OpenAI clients, so it is done once per configuration and the
+    resulting instances are reused for every message.
+
+    Methods
+    -------
+    get(api_key, model)
+        Returns the chains for the configuration, building them on first use.
+    clear()
+        Drops all cached chains.
+    """
+
+    def __init__(self) -> None:
+        self._chains: Dict[Tuple[str, str], Chains] = {}
+        self._lock = threading.Lock()
+
+    def get(self, api_key: Optional[str] = None, model: Optional[str] = None) -> Chains:
+        """
+        Returns the chains for the given configuration, building them on first use.
+
+        Parameters
+        ----------
+        api_key : str, optional
+            The API key to access the OpenAI model. Defaults to the configured key.
+        model : str, optional
+            The name of the OpenAI chat model to use. Defaults to the configured model.
+
+        Returns
+        -------
+        Chains
+            The shared chain instances.
+        """
+        settings = get_settings()
+        api_key = api_key or settings.openai_api_key
+        model = model or settings.openai_model
+        key = (api_key, model)
+        chains = self._chains.get(key)
+        if chains is not None:
+            return chains
+        with self._lock:
+            # Another thread may have built the chains while we waited.
+            chains = self._chains.get(key)
+            if chains is None:
+                chains = Chains(
+                    tagger=Tagger(api_key, model=model),
+                    information_extractor=Information_Extractor(api_key, model=model),
+                    summarizer=Summarizer(api_key, model=model),
+                )
+                self._chains[key] = chains
+            return chains
+
+    def clear(self) -> None:
+        """
+        Drops all cached chains so the next call to get() rebuilds them.
+        """
+        with self._lock:
+            self._chains.clear()
+
+
+registry = ChainRegistry()
+
+
+@on_reload
+def _clear_registry(settings: Settings) -> None:
+    # Chains capture base URLs and timeouts at construction time
+    registry.clear()
+
+
+def get_chains(api_key: Optional[str] = None, model: Optional[str] = None) -> Chains:
+    """
+    Returns the process-wide shared chains for the given configuration.
+    """
+    return registry.get(api_key, model)
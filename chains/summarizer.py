@@ -1,5 +1,16 @@
+import asyncio
+import time
+from typing import AsyncIterator, Iterator, List, Optional, Union
 from langchain_community.chat_models import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
+from chains.information_extractor import NO_INFORMATION
+from utils.config import get_settings
+from utils.llm_cache import with_cache
+from utils.llm_usage import openai_clients
+from utils.semantic_cache import get_semantic_cache
+from utils.metrics import metrics
+from utils.tracing import current_span, get_tracer
+from schema.schema import UserIntent
 from langchain.schema.output_parser import StrOutputParser
 from langchain.memory import ConversationBufferWindowMemory
 
@@ -19,23 +30,36 @@ class Summarizer:
         The parser to parse the output of the OpenAI model.
     chain : langchain.pipeline.Pipeline
         The pipeline to process the chat.
+    semantic_cache : SemanticCache or None
+        The cache answering questions similar to ones already answered, if enabled.
 
     Methods
     -------
-    summarize(context, question)
+    summarize(context, question, user_intent)
         Summarizes the context and answers the question.
+    asummarize(context, question, user_intent)
+        Asynchronously summarizes the context and answers the question.
+    abatch_summarize(contexts, questions, max_concurrency)
+        Asynchronously answers several questions in one batch.
+    stream(context, question, user_intent)
+        Yields the answer token by token as the model generates it.
+    astream(context, question, user_intent)
+        Asynchronously yields the answer token by token.
     """
 
-    def __init__(self, api_key: str) -> None:
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None) -> None:
         """
         Constructs all the necessary attributes for the Summarizer object.
 
         Parameters
         ----------
-        api_key : str
-            The API key to access the OpenAI model.
+        api_key : str, optional
+            The API key to access the OpenAI model. Defaults to the configured key.
+        model : str, optional
+            The name of the OpenAI chat model to use. Defaults to the configured model.
         """
-        self.api_key = api_key
+        settings = get_settings()
+        self.api_key = api_key or settings.openai_api_key
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", "You are a helpful AI that can answer user's questions based on the provided context."),
             ("user", "{input}"),
@@ -43,13 +67,17 @@ class Summarizer:
         self.model = ChatOpenAI(
             api_key=self.api_key,
             temperature=0.0,
-            model="gpt-3.5-turbo-0125",
+            model=model or settings.openai_model,
+            base_url=settings.openai_base_url,
+            timeout=settings.openai_timeout,
+            **openai_clients(self.api_key, settings.openai_base_url, settings.openai_timeout),
             streaming=True,
         )
         self.output_parser = StrOutputParser()
-        self.chain = self.prompt | self.model | self.output_parser
+        self.chain = self.prompt | with_cache(self.model, "summarizer") | self.output_parser
+        self.semantic_cache = get_semantic_cache()
 
-    def summarize(self, context: str, question: str) -> str:
+    def summarize(self, context: str, question: str, user_intent: Optional[UserIntent] = None) -> str:
         """
         Summarizes the context and answers the question.
 
@@ -59,16 +87,201 @@ class Summarizer:
             The context to summarize.
         question : str
             The question to answer.
+        user_intent : UserIntent, optional
+            The tagged intent of the question. When given, a near-identical earlier
+            question about the same destination and intent is answered from the
+            semantic cache. Answers are not cached when retrieval found nothing.
 
         Returns
         -------
         str
             The summary of the context and the answer to the question.
         """
+        use_cache = self.semantic_cache is not None and user_intent is not None
+        if use_cache:
+            cached = self.semantic_cache.lookup(user_intent.name, user_intent.intent, question)
+            current_span().set(semantic_cache_hit=cached is not None)
+            if cached is not None:
+                return cached
         try:
             response = self.chain.invoke({
                 "input": f"Context: {context} Question: {question}"
             })
-            return response
         except Exception as e:
             return f"Error: {str(e)}"
+        if use_cache and NO_INFORMATION not in context:
+            self.semantic_cache.insert(user_intent.name, user_intent.intent, question, response)
+        return response
+
+    async def asummarize(self, context: str, question: str, user_intent: Optional[UserIntent] = None) -> str:
+        """
+        Asynchronously summarizes the context and answers the question.
+
+        Parameters
+        ----------
+        context : str
+            The context to summarize.
+        question : str
+            The question to answer.
+        user_intent : UserIntent, optional
+            The tagged intent of the question, used for the semantic cache.
+
+        Returns
+        -------
+        str
+            The summary of the context and the answer to the question.
+        """
+        use_cache = self.semantic_cache is not None and user_intent is not None
+        if use_cache:
+            # Embedding the question may be a blocking network call
+            cached = await asyncio.to_thread(
+                self.semantic_cache.lookup, user_intent.name, user_intent.intent, question
+            )
+            current_span().set(semantic_cache_hit=cached is not None)
+            if cached is not None:
+                return cached
+        try:
+            response = await self.chain.ainvoke({
+                "input": f"Context: {context} Question: {question}"
+            })
+        except Exception as e:
+            return f"Error: {str(e)}"
+        if use_cache and NO_INFORMATION not in context:
+            await asyncio.to_thread(
+                self.semantic_cache.insert, user_intent.name, user_intent.intent, question, response
+            )
+        return response
+
+    async def abatch_summarize(
+        self, contexts: List[str], questions: List[str], max_concurrency: int = 8
+    ) -> List[Union[str, Exception]]:
+        """
+        Asynchronously answers several questions with one ``abatch`` call on the chain.
+
+        Parameters
+        ----------
+        contexts : list of str
+            The context for each question.
+        questions : list of str
+            The questions to answer.
+        max_concurrency : int, optional
+            The maximum number of concurrent model calls.
+
+        Returns
+        -------
+        list of str or Exception
+            The answer to each question, or the exception raised for the ones that failed.
+        """
+        return await self.chain.abatch(
+            [
+                {"input": f"Context: {context} Question: {question}"}
+                for context, question in zip(contexts, questions)
+            ],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
+
+    def stream(self, context: str, question: str, user_intent: Optional[UserIntent] = None) -> Iterator[str]:
+        """
+        Yields the answer token by token as the model generates it.
+
+        Time to first token and total time are recorded in the
+        ``summarizer_ttft_seconds`` and ``summarizer_total_seconds`` histograms.
+
+        Parameters
+        ----------
+        context : str
+            The context to summarize.
+        question : str
+            The question to answer.
+        user_intent : UserIntent, optional
+            The tagged intent of the question, used for the semantic cache.
+
+        Yields
+        ------
+        str
+            The next piece of the answer.
+        """
+        start = time.perf_counter()
+        use_cache = self.semantic_cache is not None and user_intent is not None
+        if use_cache:
+            cached = self.semantic_cache.lookup(user_intent.name, user_intent.intent, question)
+            if cached is not None:
+                self._record_timings("cache", start, start, time.perf_counter())
+                yield cached
+                return
+        first_token = None
+        tokens = []
+        try:
+            for token in self.chain.stream({
+                "input": f"Context: {context} Question: {question}"
+            }):
+                if first_token is None and token:
+                    first_token = time.perf_counter()
+                tokens.append(token)
+                yield token
+        except Exception as e:
+            yield f"Error: {str(e)}"
+            return
+        self._record_timings("model", start, first_token, time.perf_counter())
+        if use_cache and NO_INFORMATION not in context:
+            self.semantic_cache.insert(user_intent.name, user_intent.intent, question, "".join(tokens))
+
+    async def astream(self, context: str, question: str, user_intent: Optional[UserIntent] = None) -> AsyncIterator[str]:
+        """
+        Asynchronously yields the answer token by token as the model generates it.
+
+        Parameters
+        ----------
+        context : str
+            The context to summarize.
+        question : str
+            The question to answer.
+        user_intent : UserIntent, optional
+            The tagged intent of the question, used for the semantic cache.
+
+        Yields
+        ------
+        str
+            The next piece of the answer.
+        """
+        start = time.perf_counter()
+        use_cache = self.semantic_cache is not None and user_intent is not None
+        if use_cache:
+            cached = await asyncio.to_thread(
+                self.semantic_cache.lookup, user_intent.name, user_intent.intent, question
+            )
+            if cached is not None:
+                self._record_timings("cache", start, start, time.perf_counter())
+                yield cached
+                return
+        first_token = None
+        tokens = []
+        try:
+            async for token in self.chain.astream({
+                "input": f"Context: {context} Question: {question}"
+            }):
+                if first_token is None and token:
+                    first_token = time.perf_counter()
+                tokens.append(token)
+                yield token
+        except Exception as e:
+            yield f"Error: {str(e)}"
+            return
+        self._record_timings("model", start, first_token, time.perf_counter())
+        if use_cache and NO_INFORMATION not in context:
+            await asyncio.to_thread(
+                self.semantic_cache.insert, user_intent.name, user_intent.intent, question, "".join(tokens)
+            )
+
+    @staticmethod
+    def _record_timings(source: str, start: float, first_token: Optional[float], end: float) -> None:
+        if first_token is not None:
+            metrics.histogram("summarizer_ttft_seconds", source=source).observe(first_token - start)
+        metrics.histogram("summarizer_total_seconds", source=source).observe(end - start)
+        get_tracer().record(
+            "summarizer",
+            end - start,
+            source=source,
+            ttft=None if first_token is None else first_token - start,
+        )
@@ -1,10 +1,21 @@
 from operator import itemgetter
+from typing import List, Optional, Union
 from langchain_community.chat_models import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.utils.openai_functions import convert_pydantic_to_openai_function
 from langchain.output_parsers.openai_functions import PydanticOutputFunctionsParser
-from schema.schema import TravelIntent  # Assuming TravelIntent schema for travel-related queries
-from langchain.memory import ConversationBufferMemory
+from utils.config import get_settings
+from utils.llm_cache import with_cache
+from utils.llm_usage import openai_clients
+from utils.metrics import metrics
+from utils.logger import logger
+from utils.tracing import current_span
+from schema.schema import RoutedIntent, RoutedIntents, UserIntent, UserIntents
+from chains.intent_rules import RuleBasedTagger
+from chains.tool_routing import ToolRouter
+from utils.gazetteer import get_gazetteer
+from utils.memory import TokenBoundedMemory, new_memory
+from utils.session_store import SessionStore, get_session_store
 from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 
 
@@ -16,20 +27,40 @@ class Tagger:
         api_key (str): The API key used for authentication with the OpenAI API.
         prompt (ChatPromptTemplate): An instance of ChatPromptTemplate that defines the conversation prompt.
         functions (list): A list of functions converted to OpenAI format for use in the GPT-3 model.
+            The model reports every (destination, intent) pair of the input through UserIntents.
+        fused (bool): Whether the model also chooses the tool of each pair, through RoutedIntents,
+            so Information_Extractor can skip its own tool-selection call.
         model (ChatOpenAI): An instance of ChatOpenAI that handles the interaction with the GPT-3 model.
-        conversation_buffer (ConversationBufferMemory): A buffer for storing conversation history.
+        conversation_buffer (TokenBoundedMemory): A token-bounded buffer for storing conversation history.
         parser (PydanticOutputFunctionsParser): A parser for parsing the output from the GPT-3 model.
         chain (Chain): A chain of operations to perform on the user input.
+        fast_path (RuleBasedTagger): A rule-based classifier tried before the model, or None.
+        router (ToolRouter): In fused mode, chooses the tools of the fast path's pairs, so a question
+            answered by the fast path needs no tool-selection call either. None otherwise.
+        session_store (SessionStore): Where per-session conversation memory is kept.
     """
 
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        fast_path: Optional[RuleBasedTagger] = None,
+        session_store: Optional[SessionStore] = None,
+    ) -> None:
         """
         Initializes the Tagger with the given API key and sets up the necessary components for tagging and information extraction.
 
         Args:
-            api_key (str): The API key used for authentication with the OpenAI API.
+            api_key (str, optional): The API key used for authentication with the OpenAI API.
+                Defaults to the configured key.
+            model (str, optional): The name of the OpenAI chat model to use. Defaults to the configured model.
+            fast_path (RuleBasedTagger, optional): The rule-based classifier tried before the model.
+                Defaults to one using the configured threshold, unless the fast path is disabled.
+            session_store (SessionStore, optional): Where per-session memory is kept. Defaults to the
+                configured process-wide store.
         """
-        self.api_key = api_key
+        settings = get_settings()
+        self.api_key = api_key or settings.openai_api_key
         self.prompt = ChatPromptTemplate.from_messages(
             [
                 (
@@ -42,48 +73,229 @@ class Tagger:
             ]
         )
 
-        self.functions = [convert_pydantic_to_openai_function(TravelIntent)]
+        if settings.pipeline_mode not in ("staged", "fused"):
+            raise ValueError(f"Unknown pipeline mode: {settings.pipeline_mode}")
+        self.fused = settings.pipeline_mode == "fused"
+        schema = RoutedIntents if self.fused else UserIntents
+        self.functions = [convert_pydantic_to_openai_function(schema)]
 
         self.model = ChatOpenAI(
-            api_key=self.api_key, temperature=0.0, model="gpt-3.5-turbo-0125"
+            api_key=self.api_key,
+            temperature=0.0,
+            model=model or settings.openai_model,
+            base_url=settings.openai_base_url,
+            timeout=settings.openai_timeout,
+            **openai_clients(self.api_key, settings.openai_base_url, settings.openai_timeout),
         ).bind(functions=self.functions)
 
-        self.conversation_buffer = ConversationBufferMemory(return_messages=True)
+        self.conversation_buffer = new_memory()
         self.parser = PydanticOutputFunctionsParser(
-            pydantic_schema={"TravelIntent": TravelIntent}
+            pydantic_schema={schema.__name__: schema}
         )
+        self.max_intents = settings.max_intents
 
+        if fast_path is None and settings.tagger_fast_path:
+            fast_path = RuleBasedTagger(
+                threshold=settings.tagger_fast_path_threshold, gazetteer=get_gazetteer()
+            )
+        self.fast_path = fast_path
+        self.router = None
+        if self.fused:
+            self.router = ToolRouter.from_file(settings.tool_routes_path) if settings.tool_routes_path else ToolRouter()
+        self.session_store = session_store or get_session_store()
+
+        # History is read from the memory passed in with each call rather than
+        # from the instance, so one Tagger can be shared between sessions.
         self.chain = (
             RunnablePassthrough.assign(
-                history=RunnableLambda(self.conversation_buffer.load_memory_variables)
+                history=RunnableLambda(
+                    lambda inputs: inputs["memory"].load_memory_variables({})
+                )
                 | itemgetter("history")
             )
             | self.prompt
-            | self.model
+            | with_cache(self.model, "fused" if self.fused else "tagger")
             | self.parser
+            | RunnableLambda(self._limit)
         )
 
-    def extract_information(self, input: str) -> TravelIntent:
+    def extract_intents(
+        self,
+        input: str,
+        memory: Optional[TokenBoundedMemory] = None,
+        session_id: Optional[str] = None,
+    ) -> List[UserIntent]:
         """
-        Extracts the intent related to travel destinations from the user's input using the GPT-3 model.
+        Extracts every (destination, intent) pair the user's input asks about.
+
+        The rule-based fast path answers when it is confident enough; otherwise the
+        GPT-3 model is used. The ``tagger_requests_total`` counter records which path
+        served each call. At most ``max_intents`` pairs are returned.
 
         Args:
             input (str): The user's input string.
+            memory (TokenBoundedMemory, optional): The conversation memory of the
+                calling session. Defaults to the Tagger's own conversation buffer, which
+                must not be used when the Tagger is shared between sessions.
+            session_id (str, optional): The session whose memory is read from and written back
+                to the session store. Takes precedence over ``memory``.
 
         Returns:
-            TravelIntent: An object containing the extracted intent related to travel destinations.
+            List[UserIntent]: The extracted pairs, in the order they were mentioned.
         """
-        self.conversation_buffer.load_memory_variables({})
-        intent: TravelIntent = self.chain.invoke(
-            {
-                "input": f"Extract the intent related to travel destinations from the user's input. {input}"
-            },
-        )
-        self.conversation_buffer.save_context(
-            {"input": input},
-            {
-                "output": f"User wants to know about {intent.intent} related to {intent.destination}."
-            },
-        )
-        print(intent)
-        return intent
+        if session_id is not None:
+            with self.session_store.session(session_id) as session:
+                return self._extract(input, session.memory)
+        return self._extract(input, memory or self.conversation_buffer)
+
+    async def aextract_intents(
+        self,
+        input: str,
+        memory: Optional[TokenBoundedMemory] = None,
+        session_id: Optional[str] = None,
+    ) -> List[UserIntent]:
+        """
+        Asynchronously extracts every (destination, intent) pair the user's input asks about.
+
+        Args:
+            input (str): The user's input string.
+            memory (TokenBoundedMemory, optional): The conversation memory of the calling session.
+            session_id (str, optional): The session whose memory is read from and written back
+                to the session store. Takes precedence over ``memory``.
+
+        Returns:
+            List[UserIntent]: The extracted pairs, in the order they were mentioned.
+        """
+        if session_id is not None:
+            async with self.session_store.asession(session_id) as session:
+                return await self._aextract(input, session.memory)
+        return await self._aextract(input, memory or self.conversation_buffer)
+
+    def extract_information(
+        self,
+        input: str,
+        memory: Optional[TokenBoundedMemory] = None,
+        session_id: Optional[str] = None,
+    ) -> UserIntent:
+        """
+        Extracts the intent related to travel destinations from the user's input.
+
+        Returns the first pair found by extract_intents, for callers answering one
+        destination and intent at a time.
+
+        Args:
+            input (str): The user's input string.
+            memory (TokenBoundedMemory, optional): The conversation memory of the calling session.
+            session_id (str, optional): The session whose memory is read from and written back
+                to the session store. Takes precedence over ``memory``.
+
+        Returns:
+            UserIntent: An object containing the extracted intent related to travel destinations.
+        """
+        return self.extract_intents(input, memory, session_id)[0]
+
+    async def aextract_information(
+        self,
+        input: str,
+        memory: Optional[TokenBoundedMemory] = None,
+        session_id: Optional[str] = None,
+    ) -> UserIntent:
+        """
+        Asynchronously extracts the intent related to travel destinations from the user's input.
+
+        Args:
+            input (str): The user's input string.
+            memory (TokenBoundedMemory, optional): The conversation memory of the calling session.
+            session_id (str, optional): The session whose memory is read from and written back
+                to the session store. Takes precedence over ``memory``.
+
+        Returns:
+            UserIntent: An object containing the extracted intent related to travel destinations.
+        """
+        return (await self.aextract_intents(input, memory, session_id))[0]
+
+    async def abatch_extract_intents(
+        self, inputs: List[str], max_concurrency: int = 8
+    ) -> List[Union[List[UserIntent], Exception]]:
+        """
+        Extracts the pairs of independent inputs, sending the ones the fast path cannot
+        answer to the model in one ``abatch`` call.
+
+        Each input gets its own empty memory, so no conversation history is shared.
+
+        Args:
+            inputs (List[str]): The user's input strings.
+            max_concurrency (int): The maximum number of concurrent model calls.
+
+        Returns:
+            List[Union[List[UserIntent], Exception]]: The pairs for each input, or the exception raised for it.
+        """
+        results: List[Union[List[UserIntent], Exception, None]] = [self._fast_extract(input) for input in inputs]
+        pending = [i for i, intents in enumerate(results) if intents is None]
+        if pending:
+            intents = await self.chain.abatch(
+                [self._chain_input(inputs[i], new_memory()) for i in pending],
+                config={"max_concurrency": max_concurrency},
+                return_exceptions=True,
+            )
+            for i, intent in zip(pending, intents):
+                results[i] = intent
+        return results
+
+    def _limit(self, result: Union[UserIntents, RoutedIntents]) -> List[UserIntent]:
+        if not result.intents:
+            raise ValueError("No travel destination found in the input")
+        seen = set()
+        unique = [
+            intent for intent in result.intents
+            if (key := (intent.name, intent.intent)) not in seen and not seen.add(key)
+        ]
+        return unique[:self.max_intents]
+
+    def _fast_extract(self, input: str) -> Optional[List[UserIntent]]:
+        intents = self.fast_path.extract_all(input) if self.fast_path is not None else None
+        if intents is not None and self.router is not None:
+            intents = self._route(input, intents)
+        metrics.counter("tagger_requests_total", path="fast" if intents is not None else "llm").inc()
+        current_span().set(fast_path=intents is not None)
+        if intents is None:
+            return None
+        return intents[:self.max_intents]
+
+    def _route(self, input: str, intents: List[UserIntent]) -> Optional[List[UserIntent]]:
+        # In fused mode every pair carries its tool; when the table cannot choose one,
+        # the fused model call tags the question instead
+        routed = []
+        for intent in intents:
+            tool = self.router.route(intent.intent, input)
+            if tool is None:
+                return None
+            routed.append(RoutedIntent(name=intent.name, intent=intent.intent, tool=tool))
+        return routed
+
+    def _chain_input(self, input: str, memory: TokenBoundedMemory) -> dict:
+        if self.fused:
+            instruction = "Extract the intents related to travel destinations from the user's input, one for each destination and topic asked about, and choose the tool that answers each."
+        else:
+            instruction = "Extract the intents related to travel destinations from the user's input, one for each destination and topic asked about."
+        return {
+            "input": f"{instruction} {input}",
+            "memory": memory,
+        }
+
+    def _remember(self, input: str, memory: TokenBoundedMemory, intents: List[UserIntent]) -> List[UserIntent]:
+        memory.save_intents(input, [(intent.name, intent.intent) for intent in intents])
+        logger.debug(f"Extracted intents: {intents}")
+        return intents
+
+    def _extract(self, input: str, memory: TokenBoundedMemory) -> List[UserIntent]:
+        intents = self._fast_extract(input)
+        if intents is None:
+            intents = self.chain.invoke(self._chain_input(input, memory))
+        return self._remember(input, memory, intents)
+
+    async def _aextract(self, input: str, memory: TokenBoundedMemory) -> List[UserIntent]:
+        intents = self._fast_extract(input)
+        if intents is None:
+            intents = await self.chain.ainvoke(self._chain_input(input, memory))
+        return self._remember(input, memory, intents)
@@ -0,0 +1,143 @@
+import json
+import re
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional
+
+from utils.cache import normalize_name
+from utils.metrics import metrics
+
+# The tool each intent is answered with, and keywords in the question that select a
+# different tool. Loaded from TOOL_ROUTES_PATH instead when set, in the same shape.
+DEFAULT_ROUTES: Dict[str, dict] = {
+    "overview": {
+        "tool": "get_destination_info",
+        "keywords": {
+            "get_travel_guide": ["guide", "highlights", "history"],
+            "get_images": ["photo", "photos", "picture", "pictures", "image", "images"],
+        },
+    },
+    "attractions": {
+        "tool": "get_travel_guide",
+        "keywords": {
+            "get_local_events": ["event", "events", "festival", "festivals", "concert", "concerts", "happening"],
+            "get_images": ["photo", "photos", "picture", "pictures", "image", "images"],
+        },
+    },
+    "weather": {
+        "tool": "get_destination_info",
+        "keywords": {},
+    },
+    "activities": {
+        "tool": "get_local_events",
+        "keywords": {
+            "get_restaurant_recommendations": [
+                "restaurant", "restaurants", "food", "eat", "dining", "dinner", "lunch", "breakfast", "cuisine",
+            ],
+            "get_accommodation_options": [
+                "hotel", "hotels", "stay", "accommodation", "accommodations", "hostel", "hostels", "lodging",
+            ],
+        },
+    },
+}
+
+
+@dataclass
+class Route:
+    """
+    How the tool is chosen for one intent.
+
+    Attributes:
+        tool (str): The tool used when no keyword matches.
+        keywords (Dict[str, re.Pattern]): Per alternative tool, a pattern matching its keywords.
+    """
+
+    tool: str
+    keywords: Dict[str, re.Pattern]
+
+
+class ToolRouter:
+    """
+    Chooses the tool for a (destination, intent) pair from a routing table, without a model call.
+
+    A question mentioning the keywords of one alternative tool is routed to it. A question
+    mentioning the keywords of several, or an intent missing from the table, is ambiguous
+    and left to the model.
+
+    Attributes:
+        routes (Dict[str, Route]): The route of each intent.
+    """
+
+    def __init__(self, routes: Mapping[str, dict] = DEFAULT_ROUTES) -> None:
+        """
+        Initializes the router.
+
+        Args:
+            routes (Mapping[str, dict]): Per intent, a "tool" and optional "keywords" mapping
+                alternative tools to lists of words.
+        """
+        self.routes = {
+            intent: Route(
+                tool=route["tool"],
+                keywords={
+                    tool: re.compile(r"\b(" + "|".join(re.escape(normalize_name(word)) for word in words) + r")\b")
+                    for tool, words in route.get("keywords", {}).items()
+                    if words
+                },
+            )
+            for intent, route in routes.items()
+        }
+
+    @classmethod
+    def from_file(cls, path: str) -> "ToolRouter":
+        """
+        Loads the routing table from a JSON file shaped like DEFAULT_ROUTES.
+        """
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def tools(self) -> set:
+        """
+        Returns every tool the table can route to.
+        """
+        return {route.tool for route in self.routes.values()} | {
+            tool for route in self.routes.values() for tool in route.keywords
+        }
+
+    def route(self, intent: str, question: Optional[str] = None) -> Optional[str]:
+        """
+        Returns the tool for the intent, or None if the model has to choose.
+
+        Args:
+            intent (str): The tagged intent.
+            question (str, optional): The user's question, matched against the keywords.
+        """
+        route = self.routes.get(intent)
+        if route is None:
+            return None
+        if question:
+            text = normalize_name(question)
+            matched = [tool for tool, pattern in route.keywords.items() if pattern.search(text)]
+            if len(matched) > 1:
+                return None
+            if matched:
+                return matched[0]
+        return route.tool
+
+
+def routing_summary() -> Dict[str, dict]:
+    """
+    Returns, per intent, how many tool choices the routing table made, how many the Tagger
+    made in fused mode and how many were left to the model, with the fraction of
+    tool-selection calls skipped.
+    """
+    summary: Dict[str, dict] = {}
+    for counter in metrics.snapshot()["counters"]:
+        if counter["name"] != "tool_routing_total":
+            continue
+        labels = counter["labels"]
+        entry = summary.setdefault(labels["intent"], {"table": 0, "fused": 0, "llm": 0})
+        entry[labels["route"]] += int(counter["value"])
+    for entry in summary.values():
+        total = entry["table"] + entry["fused"] + entry["llm"]
+        entry["skip_rate"] = (entry["table"] + entry["fused"]) / total if total else 0.0
+    return summary
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from langchain_core.pydantic_v1 import BaseModel, Field
 from typing import List, Optional
 
 
@@ -17,3 +17,42 @@ class UserIntent(BaseModel):
                          - "weather": The user wants to know about the weather in the destination.
                          - "activities": The user wants to know about activities available in the destination."""
     )
+
+
+class UserIntents(BaseModel):
+    """
+    Represents every (destination, intent) pair a user's question asks about.
+    """
+
+    intents: List[UserIntent] = Field(
+        description="""One entry per destination and topic the user asks about. A question about
+                         two topics in two destinations, such as "Compare weather and food in Lisbon
+                         and Porto", has four entries."""
+    )
+
+
+class RoutedIntent(UserIntent):
+    """
+    Represents user intent together with the tool chosen to retrieve the information.
+    """
+
+    tool: str = Field(
+        description="""The tool that retrieves the information, called with the destination name. Can be one of the following:
+                         - "get_destination_info": General information about the destination, such as its location.
+                         - "get_travel_guide": A travel guide with a description, highlights and practical details.
+                         - "get_local_events": Local events and attractions happening around the destination.
+                         - "get_restaurant_recommendations": Restaurants near the destination.
+                         - "get_accommodation_options": Hotels and other accommodation near the destination.
+                         - "get_images": Photos of the destination."""
+    )
+
+
+class RoutedIntents(BaseModel):
+    """
+    Represents every (destination, intent) pair a user's question asks about, each with its tool.
+    """
+
+    intents: List[RoutedIntent] = Field(
+        description="""One entry per destination and topic the user asks about, with the tool that
+                         answers it. A question about two topics in two destinations has four entries."""
+    )
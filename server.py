@@ -0,0 +1,239 @@
+import contextvars
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from contextlib import closing
+from typing import Callable, Hashable, Optional, Set
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+from chains.pipeline import TravelPipeline
+from utils.config import get_settings
+from utils.llm_usage import usage_summary
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.tools import get_destination_store
+from utils.tracing import RingBufferExporter, get_tracer, span
+
+# Ends the token queue of a streamed answer
+_END = object()
+
+
+class _Slot:
+    """
+    One of the server's concurrency slots, held by a request and by the work it hands to
+    the executor. Work that timed out keeps running, so the slot is only freed when every
+    holder has released it. Releasing a holder twice is harmless.
+    """
+
+    def __init__(self, slots: threading.BoundedSemaphore) -> None:
+        self._slots = slots
+        self._holders: Set[Hashable] = {"request"}
+        self._lock = threading.Lock()
+
+    def hold(self, holder: Hashable) -> bool:
+        """
+        Adds a holder, unless the slot was already freed.
+        """
+        with self._lock:
+            if not self._holders:
+                return False
+            self._holders.add(holder)
+            return True
+
+    def release(self, holder: Hashable = "request") -> None:
+        with self._lock:
+            if holder not in self._holders:
+                return
+            self._holders.discard(holder)
+            freed = not self._holders
+        if freed:
+            self._slots.release()
+
+
+def create_app() -> Flask:
+    """
+    Creates the headless API serving the travel pipeline.
+
+    Endpoints:
+        POST /ask: Answers ``{"question": ..., "session_id": ...}`` with a JSON object listing
+            every (destination, intent) pair the question asked about.
+        POST /ask/stream: Answers the same request as a chunked plain-text token stream.
+        GET /metrics: Returns the metrics in the Prometheus text format, or as JSON with a
+            per-chain token and cost summary when ``format=json`` is given.
+        GET /traces: Returns recent spans, filtered by ``trace_id``, ``name``, ``min_duration``
+            and ``limit``, when the "memory" tracing exporter is enabled.
+        GET /healthz: Reports that the server is up.
+
+    Each request is traced under the ID in its ``X-Request-Id`` header, or a new one,
+    which is returned in the same header.
+
+    The chains are built and the destination cache warmed before the first request.
+    At most ``server_max_concurrency`` questions are processed at once; further requests
+    get a 503. A request must be answered within ``server_request_timeout`` seconds or it
+    gets a 504; a streamed answer that runs out of time is cut short. Either way its slot
+    stays taken until the work really ends.
+    """
+    settings = get_settings()
+    app = Flask(__name__)
+    pipeline = TravelPipeline()
+    get_destination_store()
+    slots = threading.BoundedSemaphore(settings.server_max_concurrency)
+    executor = ThreadPoolExecutor(max_workers=settings.server_max_concurrency)
+
+    def parse_request():
+        body = request.get_json(silent=True) or {}
+        question = str(body.get("question", "")).strip()
+        session_id = str(body.get("session_id") or uuid.uuid4())
+        request_id = request.headers.get("X-Request-Id") or uuid.uuid4().hex
+        return question, session_id, request_id
+
+    def acquire() -> Optional[_Slot]:
+        # Returns None if the server is busy
+        if not slots.acquire(blocking=False):
+            return None
+        return _Slot(slots)
+
+    def submit(slot: _Slot, fn: Callable, *args) -> Optional[Future]:
+        # Runs the work in the executor as a holder of the slot, or returns None if the
+        # slot was already freed. The worker runs in a copy of this context so its spans
+        # join the request's trace.
+        context = contextvars.copy_context()
+        future = executor.submit(context.run, fn, *args)
+        if not slot.hold(future):
+            future.cancel()
+            return None
+        future.add_done_callback(slot.release)
+        return future
+
+    def answer(question: str, session_id: str):
+        user_intents, information = pipeline.retrieve(question, session_id)
+        return user_intents, pipeline.summarize(question, user_intents, information)
+
+    def produce(tokens: queue.Queue, stopped: threading.Event, question: str, user_intents, information: str) -> None:
+        # Streams the answer into the queue until it ends or the response stops reading
+        try:
+            with closing(pipeline.summarize_stream(question, user_intents, information)) as stream:
+                for token in stream:
+                    if stopped.is_set():
+                        return
+                    tokens.put(token)
+        except Exception as e:
+            logger.debug(f"Error: {e}")
+        finally:
+            tokens.put(_END)
+
+    @app.get("/healthz")
+    def healthz():
+        return jsonify({"status": "ok"})
+
+    @app.get("/metrics")
+    def metrics_endpoint():
+        if request.args.get("format") == "json":
+            return jsonify({**metrics.snapshot(), "llm_usage": usage_summary()})
+        return Response(metrics.to_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    @app.get("/traces")
+    def traces():
+        exporter = get_tracer().exporter
+        if not isinstance(exporter, RingBufferExporter):
+            return jsonify({"error": "the memory tracing exporter is not enabled"}), 404
+        spans = exporter.query(
+            trace_id=request.args.get("trace_id"),
+            name=request.args.get("name"),
+            min_duration=request.args.get("min_duration", 0.0, type=float),
+            limit=request.args.get("limit", 100, type=int),
+        )
+        return jsonify([s.as_dict() for s in spans])
+
+    @app.post("/ask")
+    def ask():
+        question, session_id, request_id = parse_request()
+        headers = {"X-Request-Id": request_id}
+        if not question:
+            return jsonify({"error": "question is required"}), 400, headers
+        slot = acquire()
+        if slot is None:
+            return jsonify({"error": "server busy"}), 503, headers
+        try:
+            with span("request", trace_id=request_id, session_id=session_id):
+                future = submit(slot, answer, question, session_id)
+                user_intents, text = future.result(timeout=settings.server_request_timeout)
+            return jsonify({
+                "session_id": session_id,
+                "destination": user_intents[0].name,
+                "intent": user_intents[0].intent,
+                "intents": [
+                    {"destination": user_intent.name, "intent": user_intent.intent}
+                    for user_intent in user_intents
+                ],
+                "answer": text,
+            }), headers
+        except TimeoutError:
+            return jsonify({"error": "request timed out"}), 504, headers
+        except Exception as e:
+            logger.debug(f"Error: {e}")
+            return jsonify({"error": "I was not able to process the request. Please try again."}), 500, headers
+        finally:
+            slot.release()
+
+    @app.post("/ask/stream")
+    def ask_stream():
+        question, session_id, request_id = parse_request()
+        headers = {"X-Request-Id": request_id}
+        if not question:
+            return jsonify({"error": "question is required"}), 400, headers
+        slot = acquire()
+        if slot is None:
+            return jsonify({"error": "server busy"}), 503, headers
+        deadline = time.monotonic() + settings.server_request_timeout
+        try:
+            with span("request", trace_id=request_id, session_id=session_id):
+                future = submit(slot, pipeline.retrieve, question, session_id)
+                user_intents, information = future.result(timeout=settings.server_request_timeout)
+        except TimeoutError:
+            slot.release()
+            return jsonify({"error": "request timed out"}), 504, headers
+        except Exception as e:
+            slot.release()
+            logger.debug(f"Error: {e}")
+            return jsonify({"error": "I was not able to process the request. Please try again."}), 500, headers
+
+        def generate():
+            # The answer is streamed after the view returns, so it is traced separately
+            with span("answer_stream", trace_id=request_id):
+                tokens = queue.Queue()
+                stopped = threading.Event()
+                if submit(slot, produce, tokens, stopped, question, user_intents, information) is None:
+                    return
+                try:
+                    while True:
+                        try:
+                            token = tokens.get(timeout=max(deadline - time.monotonic(), 0.0))
+                        except queue.Empty:
+                            logger.warning(f"Request {request_id} timed out while streaming its answer")
+                            return
+                        if token is _END:
+                            return
+                        yield token
+                finally:
+                    stopped.set()
+
+        response = Response(
+            stream_with_context(generate()),
+            mimetype="text/plain",
+            headers={"X-Session-Id": session_id, **headers},
+        )
+        # Runs even when the response is closed before the answer is streamed
+        response.call_on_close(slot.release)
+        return response
+
+    return app
+
+
+# Example usage (the app is built by the factory, so importing this module needs no API keys):
+#   gunicorn --worker-class gthread --threads 32 'server:create_app()'
+if __name__ == "__main__":
+    create_app().run(threaded=True)
@@ -0,0 +1,72 @@
+import json
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from benchmarks.standin import StandinConfig, standin_settings, start_standin
+from utils.config import reload_settings
+
+
+def location_id(name: str) -> str:
+    return str(zlib.crc32(name.casefold().encode("utf-8")))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+        if parts == ["locations", "search"]:
+            name = query.get("query", "")
+            body = {"data": [{"location_id": location_id(name), "name": name, "address_obj": {"city": name}}]}
+        elif len(parts) == 3 and parts[0] == "locations":
+            body = {"location_id": parts[1], "resource": parts[2], "category": query.get("category")}
+        else:
+            self.send_error(404)
+            return
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture(scope="session")
+def api_url() -> str:
+    """
+    The base URL of a local stand-in for the TripAdvisor location endpoints.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(scope="session")
+def standin_port() -> int:
+    """
+    The port of the benchmark stand-in for the OpenAI and TripAdvisor APIs, answering without delay.
+    """
+    return start_standin(StandinConfig(latency=0.0, api_latency=0.0))
+
+
+@pytest.fixture
+def configure(standin_port):
+    """
+    Reloads the settings against the stand-in with the given overrides, restoring them afterwards.
+    """
+    def configure(**overrides):
+        reload_settings(standin_settings(standin_port, **overrides))
+
+    yield configure
+    reload_settings()
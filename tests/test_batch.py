@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+
+import batch
+
+
+@pytest.fixture
+def paths(configure, tmp_path):
+    configure(destination_cache_path="")
+    return tmp_path / "questions.jsonl", tmp_path / "answers.jsonl"
+
+
+def write_lines(path, records) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def read_lines(path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def run(paths, chunk_size: int = 64) -> batch.Report:
+    return asyncio.run(batch.run(str(paths[0]), str(paths[1]), concurrency=4, chunk_size=chunk_size))
+
+
+def test_lines_without_an_id_are_named_by_their_question(paths):
+    write_lines(paths[0], [{"question": "Museums in Paris"}, {"destination": "Rome", "intent": "weather"}])
+    ids = [id for id, _ in batch.read_questions(str(paths[0]))]
+    assert ids == [
+        batch.question_id("museums in  PARIS"),
+        batch.question_id(batch.QUESTION_TEMPLATE.format(intent="weather", destination="Rome")),
+    ]
+
+
+def test_identical_questions_are_answered_once_with_a_record_each(paths):
+    write_lines(paths[0], [
+        {"id": "a", "question": "Museums in Paris"},
+        {"id": "b", "question": "museums in  PARIS"},
+        {"id": "c", "question": "Restaurants in Rome"},
+    ])
+    report = run(paths)
+
+    assert (report.questions, report.answered, report.duplicates) == (3, 3, 1)
+    records = {record["id"]: record for record in read_lines(paths[1])}
+    assert records["a"]["question"] == "Museums in Paris"
+    assert records["b"]["question"] == "museums in  PARIS"
+    assert records["a"]["answer"] == records["b"]["answer"]
+
+
+def test_a_rerun_skips_answered_questions_and_retries_failed_ones(paths):
+    write_lines(paths[0], [
+        {"id": "done", "question": "Museums in Paris"},
+        {"id": "failed", "question": "Restaurants in Rome"},
+        {"question": "Hotels in Oslo"},
+    ])
+    write_lines(paths[1], [
+        {"id": "done", "question": "Museums in Paris", "answer": "The Louvre."},
+        {"id": "failed", "question": "Restaurants in Rome", "error": "summarizer: timed out"},
+    ])
+    # A line cut short by a crash is answered again
+    with open(paths[1], "a", encoding="utf-8") as f:
+        f.write('{"id": "cut')
+
+    report = run(paths)
+    assert (report.questions, report.skipped, report.answered) == (3, 1, 2)
+    assert batch.read_checkpoint(str(paths[1])) == {"done", "failed", batch.question_id("Hotels in Oslo")}
+
+    # Inserting a line does not change the ids of the others, so nothing is answered twice
+    with open(paths[0], encoding="utf-8") as f:
+        lines = f.readlines()
+    with open(paths[0], "w", encoding="utf-8") as f:
+        f.writelines([json.dumps({"question": "Weather in Lisbon"}) + "\n"] + lines)
+    report = run(paths)
+    assert (report.skipped, report.answered) == (3, 1)
+
+
+def test_stage_latencies_are_per_chunk(paths):
+    write_lines(paths[0], [{"question": f"Museums in {city}"} for city in ["Paris", "Rome", "Oslo"]])
+    stages = run(paths, chunk_size=2).as_dict()["stages"]
+    assert {stage: stats["chunks"] for stage, stats in stages.items()} == {
+        "tagger": 2, "information_extractor": 2, "summarizer": 2,
+    }
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.cache import TTLCache, normalize_name
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_normalize_name_ignores_case_whitespace_and_diacritics():
+    assert normalize_name("  París ") == normalize_name("paris") == "paris"
+
+
+def test_evicts_the_least_recently_used_entry():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats.evictions == 1
+
+
+def test_none_is_kept_for_the_negative_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=100, negative_ttl=10, clock=clock)
+    cache.set("found", {"location_id": "1"})
+    cache.set("missing", None)
+    clock.now = 9
+    assert cache.get("missing", "default") is None
+    assert cache.stats.negative_hits == 1
+    clock.now = 11
+    assert cache.get("missing", "default") == "default"
+    assert cache.get("found") == {"location_id": "1"}
+    clock.now = 101
+    assert cache.get("found") is None
+    assert cache.stats.expirations == 2
+
+
+def test_get_or_load_coalesces_concurrent_threads():
+    cache = TTLCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        leader = executor.submit(cache.get_or_load, "key", loader)
+        started.wait(5)
+        waiters = [executor.submit(cache.get_or_load, "key", loader) for _ in range(4)]
+        while cache.stats.coalesced < 4:
+            time.sleep(0.01)
+        release.set()
+        results = [leader.result()] + [w.result() for w in waiters]
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.stats.misses == 1 and cache.stats.coalesced == 4
+
+
+def test_get_or_load_does_not_cache_errors():
+    cache = TTLCache()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.get_or_load("key", fail)
+    assert cache.get_or_load("key", lambda: "value") == "value"
+    assert len(cache) == 1
+
+
+def test_aget_or_load_coalesces_concurrent_coroutines():
+    cache = TTLCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*(cache.aget_or_load("key", loader) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.stats.coalesced == 4
+
+
+def test_aget_or_load_waiters_retry_when_the_leader_is_cancelled():
+    cache = TTLCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        leader = asyncio.create_task(cache.aget_or_load("key", loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.aget_or_load("key", loader))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(run()) == "value"
+    assert len(calls) == 2
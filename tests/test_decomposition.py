@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from chains.information_extractor import Information_Extractor
+from chains.tagger import Tagger
+from schema.schema import UserIntent, UserIntents
+
+PARIS = UserIntent(name="Paris", intent="attractions")
+ROME = UserIntent(name="Rome", intent="attractions")
+ROME_WEATHER = UserIntent(name="Rome", intent="weather")
+
+
+@pytest.fixture
+def tagger() -> Tagger:
+    return Tagger(api_key="sk-test")
+
+
+def test_tagger_drops_duplicate_pairs_and_caps_their_number(tagger):
+    tagger.max_intents = 2
+    assert tagger._limit(UserIntents(intents=[PARIS, PARIS, ROME, ROME_WEATHER])) == [PARIS, ROME]
+
+
+def test_tagger_keeps_the_order_pairs_were_first_mentioned_in(tagger):
+    assert tagger._limit(UserIntents(intents=[PARIS, ROME, PARIS])) == [PARIS, ROME]
+
+
+def test_tagger_rejects_an_empty_result(tagger):
+    with pytest.raises(ValueError):
+        tagger._limit(UserIntents(intents=[]))
+
+
+def test_extractor_retrieves_each_pair_once():
+    assert Information_Extractor._unique([PARIS, UserIntent(name=" paris", intent="attractions"), ROME]) == [PARIS, ROME]
+
+
+def test_merged_context_reports_failed_pairs():
+    context = Information_Extractor._merge([PARIS, ROME], ["The Louvre.", RuntimeError("API down")])
+    assert context == (
+        "Attractions in Paris: The Louvre.\n\n"
+        "Attractions in Rome: No information is available."
+    )
+
+
+def test_merge_propagates_cancellation():
+    with pytest.raises(asyncio.CancelledError):
+        Information_Extractor._merge([PARIS], [asyncio.CancelledError()])
@@ -0,0 +1,58 @@
+import pytest
+
+from chains.information_extractor import TOOLS
+from chains.pipeline import TravelPipeline
+from chains.tagger import Tagger
+from schema.schema import RoutedIntent, UserIntent
+from utils.memory import new_memory
+from utils.metrics import metrics
+
+
+def counter_total(name: str, **labels: str) -> float:
+    return sum(
+        counter["value"]
+        for counter in metrics.snapshot()["counters"]
+        if counter["name"] == name and all(counter["labels"].get(k) == v for k, v in labels.items())
+    )
+
+
+def test_fused_tagger_chooses_a_tool_for_each_pair(configure):
+    configure(pipeline_mode="fused")
+    intents = Tagger().extract_intents("Museums in Paris and Rome", memory=new_memory())
+    assert [(i.name, i.intent) for i in intents] == [("Paris", "attractions"), ("Rome", "attractions")]
+    assert all(isinstance(i, RoutedIntent) and i.tool in TOOLS for i in intents)
+
+
+def test_staged_tagger_returns_plain_intents(configure):
+    configure(pipeline_mode="staged")
+    intents = Tagger().extract_intents("Museums in Paris", memory=new_memory())
+    assert [type(i) for i in intents] == [UserIntent]
+
+
+def test_fast_path_pairs_get_a_tool_in_fused_mode(configure):
+    configure(pipeline_mode="fused", tagger_fast_path=True)
+    tagger = Tagger()
+    calls = counter_total("llm_requests_total", chain="tagger")
+    intents = tagger.extract_intents("Museums in Rome", memory=new_memory())
+    assert intents == [RoutedIntent(name="Rome", intent="attractions", tool="get_travel_guide")]
+    assert counter_total("llm_requests_total", chain="tagger") == calls
+    # The table cannot choose between hotels and restaurants, so the model tags the question
+    assert tagger._fast_extract("Hotels and restaurants in Paris, things to do") is None
+
+
+def test_fused_pipeline_skips_tool_selection(configure):
+    configure(pipeline_mode="fused", tool_routing="llm")
+    selections = counter_total("llm_requests_total", chain="information_extractor")
+    fused = counter_total("tool_routing_total", route="fused")
+
+    answer = TravelPipeline().run("Museums in Paris", "fused-session")
+
+    assert answer.answer
+    assert counter_total("llm_requests_total", chain="information_extractor") == selections
+    assert counter_total("tool_routing_total", route="fused") == fused + 1
+
+
+def test_rejects_an_unknown_pipeline_mode(configure):
+    configure(pipeline_mode="parallel")
+    with pytest.raises(ValueError):
+        Tagger()
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from utils.cache import TTLCache
+from utils.gazetteer import Gazetteer, Place, build_gazetteer
+from utils.http_client import PooledClient
+from utils.persistent_cache import SQLiteCache
+from utils.tools import TravelInfo
+
+PARIS = Place("Paris", "187147")
+PARIS_TEXAS = Place("Paris, Texas", "56178")
+ROME = Place("Rome", "187791")
+REYKJAVIK = Place("Reykjavík", "189970")
+
+
+@pytest.fixture(scope="module")
+def gazetteer(tmp_path_factory) -> Gazetteer:
+    directory = tmp_path_factory.mktemp("gazetteer")
+    source = directory / "places.csv"
+    source.write_text(
+        "name,location_id,aliases\n"
+        "Paris,187147,City of Light|Lutetia\n"
+        '"Paris, Texas",56178,\n'
+        "Rome,187791,Roma\n"
+        "Reykjavík,189970,\n",
+        encoding="utf-8",
+    )
+    assert build_gazetteer(str(source), str(directory / "index")) == 7
+    return Gazetteer(str(directory / "index"))
+
+
+def test_builds_from_jsonl(tmp_path):
+    source = tmp_path / "places.jsonl"
+    source.write_text(
+        json.dumps({"name": "Kyoto", "location_id": 298564, "aliases": ["Kyōto"]}) + "\n\n"
+        + json.dumps({"name": "Osaka", "location_id": "298566"}) + "\n",
+        encoding="utf-8",
+    )
+    # "Kyōto" normalizes to the same key as "Kyoto"
+    assert build_gazetteer(str(source), str(tmp_path / "index")) == 2
+    gazetteer = Gazetteer(str(tmp_path / "index"))
+    assert gazetteer.exact("kyoto") == Place("Kyoto", "298564")
+    assert gazetteer.exact("OSAKA") == Place("Osaka", "298566")
+
+
+def test_exact_matches_names_and_aliases(gazetteer):
+    assert gazetteer.exact("paris") == PARIS
+    assert gazetteer.exact("  City of   LIGHT ") == PARIS
+    assert gazetteer.exact("Roma") == ROME
+    assert gazetteer.exact("reykjavik") == REYKJAVIK
+    assert gazetteer.exact("Pari") is None
+    assert gazetteer.exact("Zurich") is None
+
+
+def test_prefix_returns_each_place_once(gazetteer):
+    assert gazetteer.prefix("par") == [PARIS, PARIS_TEXAS]
+    assert gazetteer.prefix("r") == [REYKJAVIK, ROME]
+    assert gazetteer.prefix("r", limit=1) == [REYKJAVIK]
+    assert gazetteer.prefix("x") == []
+
+
+def test_fuzzy_returns_the_closest_places_first(gazetteer):
+    assert gazetteer.fuzzy("Pari") == [(PARIS, 1)]
+    assert gazetteer.fuzzy("Rone") == [(ROME, 1)]
+    assert gazetteer.fuzzy("Romaa", max_distance=2) == [(ROME, 1)]
+    assert gazetteer.fuzzy("Lutetia", max_distance=0) == [(PARIS, 0)]
+    assert gazetteer.fuzzy("Berlin", max_distance=2) == []
+
+
+def test_travel_info_resolves_location_ids_offline(gazetteer, api_url, tmp_path):
+    with PooledClient(api_url) as client:
+        info = TravelInfo(
+            api_token="token",
+            client=client,
+            cache=TTLCache(),
+            store=SQLiteCache(str(tmp_path / "destinations.sqlite3")),
+            gazetteer=gazetteer,
+        )
+        details = info.get_location_resource("Roma", "details")
+        assert details["location_id"] == ROME.location_id
+        assert client.stats.requests == 1
+        # The tool still returns the full search result, not the gazetteer's ID and name
+        assert info.get_destination_info("Roma") == client.get(
+            "/locations/search", params={"query": "Roma", "key": "token"}
+        ).json()["data"][0]
@@ -0,0 +1,43 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from utils.http_client import AsyncPooledClient, PoolConfig, PooledClient
+
+
+def test_pooled_client_reuses_the_connection(api_url):
+    with PooledClient(api_url) as client:
+        for _ in range(5):
+            client.get("/locations/search", params={"query": "Paris"}).raise_for_status()
+        assert client.stats.as_dict() == {"requests": 5, "new_connections": 1, "pool_hits": 4, "errors": 0}
+
+
+def test_pooled_client_counts_every_request_once(api_url):
+    with PooledClient(api_url, PoolConfig(max_keepalive_connections=2)) as client:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda _: client.get("/locations/1/details").raise_for_status(), range(2)))
+        stats = client.stats.as_dict()
+        assert stats["requests"] == 2
+        assert stats["new_connections"] + stats["pool_hits"] == 2
+        client.get("/locations/1/details").raise_for_status()
+        assert client.stats.pool_hits == stats["pool_hits"] + 1
+
+
+def test_pooled_client_counts_connection_errors():
+    with PooledClient("http://127.0.0.1:1", PoolConfig(connect_timeout=1.0)) as client:
+        with pytest.raises(httpx.HTTPError):
+            client.get("/locations/search")
+        assert client.stats.errors == 1
+        assert client.stats.pool_hits == 0
+
+
+def test_async_pooled_client_reuses_the_connection(api_url):
+    async def run() -> dict:
+        async with AsyncPooledClient(api_url) as client:
+            for _ in range(3):
+                (await client.get("/locations/search", params={"query": "Rome"})).raise_for_status()
+            return client.stats.as_dict()
+
+    assert asyncio.run(run()) == {"requests": 3, "new_connections": 1, "pool_hits": 2, "errors": 0}
@@ -0,0 +1,89 @@
+import pytest
+
+from chains.intent_rules import RuleBasedTagger
+from schema.schema import UserIntent
+
+
+@pytest.fixture
+def tagger() -> RuleBasedTagger:
+    return RuleBasedTagger(threshold=0.8)
+
+
+def test_finds_known_destinations_preferring_the_longest_name(tagger):
+    assert tagger.find_destinations("Flights from New York to Rio de Janeiro") == ["New York", "Rio de Janeiro"]
+    assert tagger.find_destinations("Is Reykjavík worth it? reykjavik!") == ["Reykjavik"]
+    assert tagger.find_destinations("Somewhere sunny") == []
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("What museums should I visit in Paris?", "attractions"),
+    ("What's the weather like in Lisbon in March?", "weather"),
+    ("Things to do in Tokyo", "activities"),
+    ("Tell me about Kyoto", "overview"),
+])
+def test_classifies_single_intent_questions(tagger, text, intent):
+    result, confidence = tagger.classify(text)
+    assert result is not None
+    assert (result.intent, confidence) == (intent, 0.9)
+    assert tagger.extract(text) == result
+
+
+def test_a_bare_destination_is_a_low_confidence_overview(tagger):
+    result, confidence = tagger.classify("Barcelona?")
+    assert result == UserIntent(name="Barcelona", intent="overview")
+    assert confidence == 0.6
+    assert tagger.extract("Barcelona?") is None
+
+
+def test_prefers_the_specific_intent_over_overview(tagger):
+    result, confidence = tagger.classify("Tell me about the sights in Rome")
+    assert (result.intent, confidence) == ("attractions", 0.85)
+
+
+def test_defers_ambiguous_questions_to_the_model(tagger):
+    assert tagger.classify("Museums and restaurants in Vienna") == (None, 0.3)
+    assert tagger.extract("Museums and restaurants in Vienna") is None
+    assert tagger.extract("Museums in a city I can't remember") is None
+
+
+def test_custom_destinations_and_threshold():
+    tagger = RuleBasedTagger(destinations=["Ljubljana"], threshold=0.5)
+    assert tagger.extract("Ljubljana") == UserIntent(name="Ljubljana", intent="overview")
+    assert tagger.extract("Museums in Paris") is None
+
+
+@pytest.mark.parametrize("text, pairs", [
+    (
+        "Weather and food in Lisbon and Porto",
+        [("Lisbon", "weather"), ("Lisbon", "activities"), ("Porto", "weather"), ("Porto", "activities")],
+    ),
+    ("Museums in Paris or Rome?", [("Paris", "attractions"), ("Rome", "attractions")]),
+    ("Tell me about Paris, Rome and Vienna", [("Paris", "overview"), ("Rome", "overview"), ("Vienna", "overview")]),
+])
+def test_decomposes_compound_questions(tagger, text, pairs):
+    intents, confidence = tagger.classify_all(text)
+    assert [(i.name, i.intent) for i in intents] == pairs
+    assert confidence == 0.85
+    assert tagger.extract_all(text) == intents
+
+
+def test_classify_all_matches_classify_for_simple_questions(tagger):
+    assert tagger.classify_all("Things to do in Tokyo") == ([UserIntent(name="Tokyo", intent="activities")], 0.9)
+    assert tagger.classify_all("Barcelona?") == ([UserIntent(name="Barcelona", intent="overview")], 0.6)
+    assert tagger.classify_all("Somewhere sunny") == ([], 0.0)
+    assert tagger.extract_all("Barcelona?") is None
+
+
+@pytest.mark.parametrize("text", [
+    "I am flying from London to Paris, what is the weather like?",
+    "Restaurants in Rome near the Paris hotel",
+])
+def test_defers_uncoordinated_destinations_to_the_model(tagger, text):
+    assert tagger.classify_all(text)[1] == 0.5
+    assert tagger.extract_all(text) is None
+
+
+def test_comparisons_coordinate_with_to_and_with(tagger):
+    intents, confidence = tagger.classify_all("Compare the weather in Rome to Paris")
+    assert [(i.name, i.intent) for i in intents] == [("Rome", "weather"), ("Paris", "weather")]
+    assert confidence == 0.85
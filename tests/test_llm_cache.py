@@ -0,0 +1,112 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+
+from utils.cache import TTLCache
+from utils.llm_cache import CachedChatModel, LLMCache, cache_key
+
+
+class CountingChatModel(BaseChatModel):
+    """
+    Answers every prompt with its call number.
+    """
+
+    temperature: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"temperature": self.temperature}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"answer {self.calls}"))])
+
+
+PROMPT = ChatPromptTemplate.from_messages([("system", "You are a travel assistant."), ("human", "{question}")])
+FUNCTIONS = [{"name": "get_travel_guide", "parameters": {"type": "object", "properties": {}}}]
+
+
+@pytest.fixture
+def cache() -> LLMCache:
+    return LLMCache(TTLCache())
+
+
+def test_identical_prompts_are_answered_from_the_cache(cache):
+    model = CountingChatModel()
+    cached = CachedChatModel(model, cache, "tagger")
+    first = cached.invoke(PROMPT.invoke({"question": "Things to do in Rome?"}))
+    second = cached.invoke(PROMPT.invoke({"question": "Things to do in Rome?"}))
+    assert first.content == second.content == "answer 1"
+    assert model.calls == 1
+    assert cache.hit_rates() == {"tagger": 0.5}
+
+
+def test_async_calls_share_the_cache(cache):
+    model = CountingChatModel()
+    cached = CachedChatModel(model, cache, "tagger")
+    cached.invoke(PROMPT.invoke({"question": "Things to do in Rome?"}))
+    message = asyncio.run(cached.ainvoke(PROMPT.invoke({"question": "Things to do in Rome?"})))
+    assert message.content == "answer 1"
+    assert model.calls == 1
+
+
+def test_key_depends_on_the_messages():
+    model = CountingChatModel()
+    assert cache_key(model, PROMPT.invoke({"question": "Rome?"})) != cache_key(model, PROMPT.invoke({"question": "Paris?"}))
+
+
+def test_key_depends_on_the_model_parameters():
+    prompt = PROMPT.invoke({"question": "Rome?"})
+    assert cache_key(CountingChatModel(), prompt) != cache_key(CountingChatModel(temperature=0.7), prompt)
+
+
+def test_key_depends_on_the_bound_functions():
+    model = CountingChatModel()
+    prompt = PROMPT.invoke({"question": "Rome?"})
+    unbound = cache_key(model, prompt)
+    bound = cache_key(model.bind(functions=FUNCTIONS), prompt)
+    other = cache_key(model.bind(functions=FUNCTIONS, function_call={"name": "get_travel_guide"}), prompt)
+    assert len({unbound, bound, other}) == 3
+    assert cache_key(model.bind(functions=FUNCTIONS), prompt) == bound
+
+
+def test_bound_and_unbound_models_do_not_share_entries(cache):
+    model = CountingChatModel()
+    prompt = PROMPT.invoke({"question": "Rome?"})
+    CachedChatModel(model, cache, "extractor").invoke(prompt)
+    CachedChatModel(model.bind(functions=FUNCTIONS), cache, "extractor").invoke(prompt)
+    assert model.calls == 2
+
+
+def test_no_cache_always_calls_the_model():
+    model = CountingChatModel()
+    cached = CachedChatModel(model, None, "summarizer")
+    prompt = PROMPT.invoke({"question": "Rome?"})
+    cached.invoke(prompt)
+    cached.invoke(prompt)
+    assert model.calls == 2
+
+
+def test_concurrent_lookups_are_all_counted():
+    cache = LLMCache(TTLCache())
+    cache.update("hit", AIMessage(content="Rome"))
+
+    def lookups(_):
+        for key in ["hit", "miss"] * 500:
+            cache.lookup("summarizer", key)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lookups, range(8)))
+    assert cache.stats["summarizer"].hits == cache.stats["summarizer"].misses == 4000
+    assert cache.hit_rates() == {"summarizer": 0.5}
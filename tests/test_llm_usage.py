@@ -0,0 +1,61 @@
+import asyncio
+import logging
+
+import pytest
+
+from benchmarks.standin import StandinConfig, standin_settings, start_standin
+from chains.summarizer import Summarizer
+from utils.config import reload_settings
+from utils.llm_usage import RetryCounter, cost
+from utils.metrics import metrics
+
+
+@pytest.fixture
+def flaky_port():
+    port = start_standin(StandinConfig(latency=0.0, api_latency=0.0, error_rate=0.5, error_status=500))
+    reload_settings(standin_settings(port))
+    yield port
+    reload_settings()
+
+
+def retries() -> float:
+    return sum(
+        counter["value"]
+        for counter in metrics.snapshot()["counters"]
+        if counter["name"] == "llm_retries_total" and counter["labels"].get("chain") == "summarizer"
+    )
+
+
+def test_cost_uses_the_price_per_thousand_tokens():
+    assert cost("gpt-4", 1000, 500) == pytest.approx(0.06)
+    assert cost("unknown-model", 1000, 500) is None
+
+
+def test_counts_retries_without_changing_the_client_log_level(flaky_port):
+    client_logger = logging.getLogger("openai._base_client")
+    level = client_logger.level
+    before = retries()
+
+    summarizer = Summarizer()
+    for question in ["Where should I eat?", "What should I see?", "Where should I stay?"]:
+        summarizer.summarize("Context", question)
+
+    assert retries() > before
+    assert client_logger.level == level
+
+
+def test_the_first_attempt_is_not_a_retry():
+    counter = RetryCounter()
+    assert counter.count == 0
+    counter.attempts = 3
+    assert counter.count == 2
+
+
+def test_each_event_loop_gets_its_own_connections(configure):
+    configure()
+    summarizer = Summarizer()
+    before = retries()
+    for question in ["Where should I eat?", "What should I see?"]:
+        assert not asyncio.run(summarizer.asummarize("Context", question)).startswith("Error")
+    # Reusing the first loop's connection on the second would fail and be retried
+    assert retries() == before
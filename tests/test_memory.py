@@ -0,0 +1,70 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from utils.memory import TokenBoundedMemory, count_tokens
+from utils.session_store import Session
+
+
+def test_keeps_the_most_recent_messages_within_the_budget():
+    message = "What are the best museums to visit in Paris this spring?"
+    size = count_tokens(message)
+    memory = TokenBoundedMemory(max_tokens=size * 3)
+    for _ in range(10):
+        memory.save_intent(message, "Paris", "attractions")
+        assert memory.tokens <= memory.max_tokens
+    history = memory.load_memory_variables({})["history"]
+    assert [type(m) for m in history] == [SystemMessage, HumanMessage, HumanMessage, HumanMessage]
+    assert memory.tokens == size * 3
+
+
+def test_keeps_the_latest_message_even_over_budget():
+    memory = TokenBoundedMemory(max_tokens=4)
+    memory.save_intent("short", "Rome", "overview")
+    memory.save_intent("a much longer question about restaurants and hotels in Rome", "Rome", "activities")
+    history = memory.load_memory_variables({})["history"]
+    assert history[-1].content == "a much longer question about restaurants and hotels in Rome"
+    assert len(history) == 2
+
+
+def test_summary_keeps_the_most_recent_topics():
+    memory = TokenBoundedMemory(max_topics=2)
+    memory.save_intents("Paris and Rome?", [("Paris", "overview"), ("Rome", "overview")])
+    memory.save_intent("More on Paris", "Paris", "overview")
+    memory.save_intent("Weather in Oslo?", "Oslo", "weather")
+    assert memory.topics == [("Paris", "overview"), ("Oslo", "weather")]
+    summary = memory.load_memory_variables({})["history"][0]
+    assert summary.content == "Topics discussed so far, oldest first: overview in Paris; weather in Oslo."
+
+
+def test_save_context_records_both_sides():
+    memory = TokenBoundedMemory()
+    memory.save_context({"input": "Hi"}, {"output": "Hello! Where would you like to go?"})
+    assert [type(m) for m in memory.load_memory_variables({})["history"]] == [HumanMessage, AIMessage]
+
+
+def test_round_trips_through_a_dict():
+    memory = TokenBoundedMemory(max_tokens=64, max_topics=3)
+    memory.save_intent("Things to do in Kyoto?", "Kyoto", "attractions")
+    memory.save_context({"input": "And in Osaka?"}, {"output": "Osaka is known for its food."})
+    memory.save_intents("Hotels in Kyoto and Osaka", [("Kyoto", "activities"), ("Osaka", "activities")])
+
+    restored = TokenBoundedMemory.from_dict(json.loads(json.dumps(memory.to_dict())))
+
+    assert restored.max_tokens == 64 and restored.max_topics == 3
+    assert restored.tokens == memory.tokens
+    assert restored.topics == memory.topics
+    assert restored.load_memory_variables({}) == memory.load_memory_variables({})
+    restored.save_intent("Weather in Kyoto?", "Kyoto", "weather")
+    assert restored.topics[-1] == ("Kyoto", "weather")
+
+
+def test_session_round_trips_through_bytes():
+    session = Session()
+    session.memory.save_intent("Things to do in Lisbon?", "Lisbon", "attractions")
+    session.messages.append({"role": "user", "content": "Things to do in Lisbon?"})
+
+    restored = Session.from_bytes(session.to_bytes())
+
+    assert restored.messages == session.messages
+    assert restored.memory.load_memory_variables({}) == session.memory.load_memory_variables({})
@@ -0,0 +1,111 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from utils import persistent_cache, tools
+from utils.cache import TTLCache
+from utils.persistent_cache import SQLiteCache
+from utils.tools import TravelInfo, warm_destination_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(persistent_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), ttl=100, negative_ttl=10, max_entries=2, compact_every=1000)
+    yield cache
+    cache.close()
+
+
+def test_values_expire_after_their_ttl(cache, clock):
+    cache.set("paris", {"location_id": "187147"})
+    cache.set("atlantis", None)
+    clock.now += 5
+    assert cache.get("paris") == {"location_id": "187147"}
+    # A cached None is told apart from a miss by the default
+    assert cache.get("atlantis", "missing") is None
+    clock.now += 10
+    assert cache.get("atlantis", "missing") == "missing"
+    clock.now += 100
+    assert cache.get("paris", "missing") == "missing"
+
+
+def test_entries_are_shared_through_the_file(cache):
+    cache.set("rome", {"location_id": "187791"})
+    other = SQLiteCache(cache.path)
+    try:
+        assert other.get("rome") == {"location_id": "187791"}
+    finally:
+        other.close()
+
+
+def test_compact_removes_expired_then_least_recently_written(cache, clock):
+    cache.set("expired", None)
+    clock.now += 20
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+        clock.now += 1
+    assert len(cache) == 4
+    assert cache.compact() == 2
+    assert len(cache) == 2
+    assert cache.get("a", "missing") == "missing"
+    assert cache.get("c") == "c"
+
+
+def test_compacts_every_compact_every_writes(tmp_path, clock):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_entries=1, compact_every=3)
+    try:
+        for key in ("a", "b"):
+            cache.set(key, key)
+            clock.now += 1
+        assert len(cache) == 2
+        cache.set("c", "c")
+        assert len(cache) == 1
+    finally:
+        cache.close()
+
+
+def test_items_yields_fresh_entries_newest_first(cache, clock):
+    cache.set("old", 1)
+    clock.now += 1
+    cache.set("missing", None)
+    clock.now += 1
+    cache.set("new", 2)
+    clock.now += 15
+    assert list(cache.items()) == [("new", 2, 85.0), ("old", 1, 83.0)]
+    assert [key for key, _, _ in cache.items(limit=1)] == ["new"]
+
+
+def test_close_closes_every_threads_connection(cache):
+    cache.set("paris", 1)
+    thread = threading.Thread(target=cache.get, args=("paris",))
+    thread.start()
+    thread.join()
+    cache.close()
+    # SQLite removes the write-ahead log when the last connection closes
+    assert not os.path.exists(cache.path + "-wal")
+    # The closing thread opens a new connection on its next call
+    assert cache.get("paris") == 1
+
+
+def test_warming_keeps_the_newest_entries_longest(cache, clock, monkeypatch):
+    monkeypatch.setattr(tools, "destination_cache", TTLCache(maxsize=2))
+    for key in ["old", "middle", "new"]:
+        cache.set(key, key)
+        clock.now += 1
+    assert warm_destination_cache(cache) == 2
+    tools.destination_cache.set("newer", "newer")
+    assert tools.destination_cache.get("middle") is None
+    assert tools.destination_cache.get("new") == "new"
+
+
+def test_travel_info_keeps_an_empty_store(cache):
+    assert len(cache) == 0
+    assert TravelInfo(api_token="token", store=cache).store is cache
@@ -0,0 +1,38 @@
+import asyncio
+
+from chains.pipeline import TravelPipeline
+from utils.tracing import get_tracer, span
+
+
+def summarizer_spans(request):
+    spans = get_tracer().exporter.query(trace_id=request.trace_id, name="summarizer")
+    stage = [s for s in spans if s.parent_id == request.span_id]
+    return stage, [s for s in spans if stage and s.parent_id == stage[0].span_id]
+
+
+def test_streamed_answers_get_a_summarizer_span(configure):
+    configure(tracing_exporter="memory")
+    pipeline = TravelPipeline()
+    with span("request") as request:
+        user_intents, information = pipeline.retrieve("Museums in Paris", "stream-session")
+        answer = "".join(pipeline.summarize_stream("Museums in Paris", user_intents, information))
+
+    assert answer
+    stage, model = summarizer_spans(request)
+    # The pipeline's stage span encloses the one the summarizer records for the model call
+    assert len(stage) == 1 and len(model) == 1
+
+
+def test_async_streamed_answers_get_a_summarizer_span(configure):
+    configure(tracing_exporter="memory")
+    pipeline = TravelPipeline()
+
+    async def collect():
+        return [token async for token in pipeline.astream("Museums in Rome", "astream-session")]
+
+    with span("request") as request:
+        tokens = asyncio.run(collect())
+
+    assert tokens
+    stage, model = summarizer_spans(request)
+    assert len(stage) == 1 and len(model) == 1
@@ -0,0 +1,87 @@
+import numpy as np
+
+from chains.information_extractor import NO_INFORMATION
+from chains.summarizer import Summarizer
+from schema.schema import UserIntent
+from utils.semantic_cache import HashingEmbedder, SemanticCache
+
+
+def test_hashing_embedder_is_deterministic():
+    embedder = HashingEmbedder(dim=64)
+    assert np.array_equal(embedder.embed("Museums in Paris"), embedder.embed("museums in  PARIS"))
+    assert not np.array_equal(embedder.embed("Museums in Paris"), embedder.embed("Hotels in Paris"))
+
+
+def test_answers_the_same_question_for_the_same_destination():
+    cache = SemanticCache(HashingEmbedder(), capacity=4)
+    cache.insert("Paris", "attractions", "What should I see in Paris?", "The Louvre.")
+    assert cache.lookup("paris", "attractions", "what should I see in Paris") == "The Louvre."
+    assert cache.lookup("Paris", "attractions", "Where can I eat cheaply late at night?") is None
+    assert cache.stats.hits == 1 and cache.stats.misses == 1
+
+
+def test_only_matches_entries_for_the_same_destination():
+    cache = SemanticCache(HashingEmbedder(), capacity=4, threshold=0.0)
+    cache.insert("Paris", "attractions", "What should I see?", "The Louvre.")
+    assert cache.lookup("Rome", "attractions", "What should I see?") is None
+    assert cache.lookup("Paris", "attractions", "What should I see?") == "The Louvre."
+
+
+def test_evicts_the_least_recently_used_entry_when_full():
+    cache = SemanticCache(HashingEmbedder(), capacity=2)
+    cache.insert("Paris", "attractions", "What should I see?", "Paris answer")
+    cache.insert("Rome", "attractions", "What should I see?", "Rome answer")
+    assert cache.lookup("Paris", "attractions", "What should I see?") == "Paris answer"
+    cache.insert("Oslo", "attractions", "What should I see?", "Oslo answer")
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+    assert cache.lookup("Rome", "attractions", "What should I see?") is None
+    assert cache.lookup("Paris", "attractions", "What should I see?") == "Paris answer"
+    assert cache.lookup("Oslo", "attractions", "What should I see?") == "Oslo answer"
+
+
+def test_persists_vectors_and_answers(tmp_path):
+    cache = SemanticCache(HashingEmbedder(), capacity=4, path=str(tmp_path))
+    cache.insert("Kyoto", "weather", "Is it rainy in June?", "Yes, June is the rainy season.")
+    cache.flush()
+
+    reopened = SemanticCache(HashingEmbedder(), capacity=4, path=str(tmp_path))
+    assert len(reopened) == 1
+    assert reopened.lookup("Kyoto", "weather", "Is it rainy in June?") == "Yes, June is the rainy season."
+
+
+def test_drops_slots_overwritten_after_the_last_flush(tmp_path):
+    cache = SemanticCache(HashingEmbedder(), capacity=2, path=str(tmp_path), flush_every=100)
+    cache.insert("Paris", "attractions", "What should I see?", "Paris answer")
+    cache.insert("Rome", "attractions", "What should I see?", "Rome answer")
+    cache.flush()
+    # The new vector reaches disk but entries.json still names the evicted entry
+    cache.insert("Oslo", "attractions", "What should I see?", "Oslo answer")
+    cache._vectors.flush()
+
+    reopened = SemanticCache(HashingEmbedder(), capacity=2, path=str(tmp_path))
+    assert reopened.lookup("Paris", "attractions", "What should I see?") is None
+    assert reopened.lookup("Oslo", "attractions", "What should I see?") is None
+    assert reopened.lookup("Rome", "attractions", "What should I see?") == "Rome answer"
+
+
+def test_discards_an_index_of_another_shape(tmp_path):
+    cache = SemanticCache(HashingEmbedder(), capacity=4, path=str(tmp_path))
+    cache.insert("Kyoto", "weather", "Is it rainy in June?", "Yes.")
+    cache.flush()
+    assert len(SemanticCache(HashingEmbedder(), capacity=8, path=str(tmp_path))) == 0
+
+
+def test_answers_without_retrieved_information_are_not_cached(configure):
+    configure()
+    summarizer = Summarizer()
+    summarizer.semantic_cache = SemanticCache(HashingEmbedder(), capacity=4)
+    rome = UserIntent(name="Rome", intent="attractions")
+
+    summarizer.summarize(f"Attractions in Rome: {NO_INFORMATION}", "What should I see?", rome)
+    assert len(summarizer.semantic_cache) == 0
+    assert "".join(summarizer.stream(f"Attractions in Rome: {NO_INFORMATION}", "What should I see?", rome))
+    assert len(summarizer.semantic_cache) == 0
+
+    summarizer.summarize("Attractions in Rome: The Colosseum.", "What should I see?", rome)
+    assert len(summarizer.semantic_cache) == 1
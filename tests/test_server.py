@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+import server
+from schema.schema import UserIntent
+
+
+class FakePipeline:
+    """
+    Answers every question about Paris, waiting for the gate before the second half of
+    the answer.
+    """
+
+    def __init__(self) -> None:
+        self.gate = threading.Event()
+
+    def retrieve(self, question, session_id):
+        return [UserIntent(name="Paris", intent="overview")], "Paris is in France."
+
+    def summarize(self, question, user_intents, information):
+        self.gate.wait(5)
+        return "Paris is lovely."
+
+    def summarize_stream(self, question, user_intents, information):
+        yield "Paris "
+        self.gate.wait(5)
+        yield "is lovely."
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    pipeline = FakePipeline()
+    monkeypatch.setattr(server, "TravelPipeline", lambda: pipeline)
+    yield pipeline
+    pipeline.gate.set()
+
+
+@pytest.fixture
+def make_client(configure, pipeline):
+    def make_client(**overrides):
+        configure(destination_cache_path="", server_max_concurrency=1, **overrides)
+        return server.create_app().test_client()
+
+    return make_client
+
+
+def ask(client, path="/ask"):
+    return client.post(path, json={"question": "Tell me about Paris", "session_id": "s"})
+
+
+def wait_for_free_slot(client) -> None:
+    # A slot is freed by the worker after the response, so it is polled for
+    for _ in range(100):
+        if server_accepts(client):
+            return
+        time.sleep(0.02)
+    pytest.fail("the slot was never freed")
+
+
+def server_accepts(client) -> bool:
+    response = ask(client, "/ask/stream")
+    accepted = response.status_code == 200
+    response.close()
+    return accepted
+
+
+def test_answers_with_every_intent(make_client, pipeline):
+    client = make_client()
+    pipeline.gate.set()
+    response = ask(client)
+    assert response.status_code == 200
+    assert response.json["answer"] == "Paris is lovely."
+    assert response.json["intents"] == [{"destination": "Paris", "intent": "overview"}]
+    assert response.headers["X-Request-Id"]
+
+
+def test_rejects_requests_beyond_the_concurrency_limit(make_client, pipeline):
+    client = make_client()
+    first = {}
+    thread = threading.Thread(target=lambda: first.update(response=ask(client)))
+    thread.start()
+    time.sleep(0.1)
+    assert ask(client).status_code == 503
+
+    pipeline.gate.set()
+    thread.join()
+    assert first["response"].status_code == 200
+    wait_for_free_slot(client)
+
+
+def test_the_deadline_covers_the_answer(make_client, pipeline):
+    client = make_client(server_request_timeout=0.2)
+    started = time.monotonic()
+    assert ask(client).status_code == 504
+    assert time.monotonic() - started < 2
+    # The summarization is still running, so its slot is still taken
+    assert ask(client).status_code == 503
+
+    pipeline.gate.set()
+    wait_for_free_slot(client)
+
+
+def test_a_stream_closed_before_it_is_read_frees_its_slot(make_client, pipeline):
+    client = make_client()
+    pipeline.gate.set()
+    response = client.post("/ask/stream", json={"question": "Paris?"}, buffered=False)
+    assert response.status_code == 200
+    response.close()
+    wait_for_free_slot(client)
+
+
+def test_a_stream_past_the_deadline_is_cut_short(make_client, pipeline):
+    client = make_client(server_request_timeout=0.3)
+    started = time.monotonic()
+    response = ask(client, "/ask/stream")
+    assert response.get_data(as_text=True) == "Paris "
+    assert time.monotonic() - started < 2
+    response.close()
+
+    pipeline.gate.set()
+    wait_for_free_slot(client)
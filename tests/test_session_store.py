@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from utils import session_store
+from utils.session_store import InMemorySessionStore, SessionStore, SQLiteSessionStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(session_store, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def add_message(store, session_id: str, content: str) -> None:
+    with store.session(session_id) as session:
+        session.messages.append({"role": "user", "content": content})
+        session.memory.save_intent(content, "Paris", "overview")
+
+
+def test_session_changes_are_saved():
+    store = InMemorySessionStore()
+    add_message(store, "a", "Tell me about Paris")
+    add_message(store, "a", "And its museums?")
+    session = store.load("a")
+    assert [m["content"] for m in session.messages] == ["Tell me about Paris", "And its museums?"]
+    assert session.memory.topics == [("Paris", "overview")]
+    assert store.load("unknown").messages == []
+
+
+def test_concurrent_updates_to_one_session_are_not_lost():
+    store = InMemorySessionStore()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: add_message(store, "a", f"message {i}"), range(40)))
+    assert len(store.load("a").messages) == 40
+
+
+def test_evicts_the_least_recently_saved_session():
+    store = InMemorySessionStore(max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        add_message(store, session_id, "hello")
+    assert store.load("a").messages == []
+    assert store.load("c").messages != []
+    assert store.memory_usage()["sessions"] == 2
+    assert store.memory_usage()["evictions"] == 1
+
+
+def test_loading_a_session_makes_it_the_most_recently_used(clock):
+    store = InMemorySessionStore(max_sessions=2, idle_ttl=60)
+    add_message(store, "a", "hello")
+    add_message(store, "b", "hello")
+    clock.now += 50
+    store.load("a")
+    add_message(store, "c", "hello")
+    assert store.load("b").messages == []
+    clock.now += 20
+    # Reading "a" also reset its idle timer
+    assert store.load("a").messages != []
+
+
+def test_keeps_only_the_most_recent_messages():
+    store = InMemorySessionStore(max_messages=3)
+    for i in range(5):
+        add_message(store, "a", f"message {i}")
+    assert [m["content"] for m in store.load("a").messages] == ["message 2", "message 3", "message 4"]
+
+
+def test_the_base_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_idle_sessions_expire(clock):
+    store = InMemorySessionStore(idle_ttl=60)
+    add_message(store, "a", "hello")
+    clock.now += 30
+    add_message(store, "b", "hello")
+    clock.now += 40
+    assert store.load("a").messages == []
+    assert store.expire_idle() == 0
+    assert store.memory_usage()["sessions"] == 1
+    clock.now += 30
+    assert store.expire_idle() == 1
+    assert store.memory_usage() == {"sessions": 0, "bytes": 0, "avg_bytes": 0, "evictions": 0}
+
+
+def test_delete_forgets_the_session():
+    store = InMemorySessionStore()
+    add_message(store, "a", "hello")
+    store.delete("a")
+    store.delete("a")
+    assert store.load("a").messages == []
+
+
+def test_sqlite_store_shares_sessions_between_instances(tmp_path, clock):
+    path = str(tmp_path / "sessions.sqlite3")
+    add_message(SQLiteSessionStore(path), "a", "hello")
+    other = SQLiteSessionStore(path, idle_ttl=60)
+    assert [m["content"] for m in other.load("a").messages] == ["hello"]
+    assert other.memory_usage()["sessions"] == 1
+    clock.now += 61
+    assert other.load("a").messages == []
+    assert other.expire_idle() == 1
+    assert other.memory_usage() == {"sessions": 0, "bytes": 0, "avg_bytes": 0}
+
+
+def test_session_and_asession_share_the_session_lock():
+    store = InMemorySessionStore()
+    held = threading.Event()
+
+    def update_synchronously():
+        with store.session("a") as session:
+            held.set()
+            time.sleep(0.2)
+            session.messages.append({"role": "user", "content": "sync"})
+
+    async def update_asynchronously():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.to_thread(held.wait)
+        async with store.asession("a") as session:
+            session.messages.append({"role": "user", "content": "async"})
+        ticker.cancel()
+        return ticks
+
+    thread = threading.Thread(target=update_synchronously)
+    thread.start()
+    ticks = asyncio.run(update_asynchronously())
+    thread.join()
+    assert [m["content"] for m in store.load("a").messages] == ["sync", "async"]
+    # The event loop kept running while asession waited for the lock
+    assert ticks >= 5
+
+
+def test_a_cancelled_asession_waiter_leaves_the_lock_free():
+    store = InMemorySessionStore()
+
+    async def cancel_waiter():
+        with store.session("a"):
+            waiter = asyncio.create_task(store.asession("a").__aenter__())
+            await asyncio.sleep(0.05)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+
+    asyncio.run(cancel_waiter())
+    add_message(store, "a", "hello")
+    assert len(store.load("a").messages) == 1
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.cache import TTLCache
+from utils.http_client import PooledClient
+from utils.persistent_cache import SQLiteCache
+from utils.metrics import metrics
+from utils.tool_cache import TOOL_TTLS, ToolResultCache, tool_input_key
+from utils.tools import ToolError, TravelInfo
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def requests(tool: str, result: str) -> float:
+    return metrics.counter("tool_cache_requests_total", tool=tool, result=result).value
+
+
+def test_inputs_naming_the_same_destination_share_a_key():
+    assert tool_input_key("Kyoto") == tool_input_key({"name": " kyoto"}) == "kyoto"
+    assert tool_input_key({"name": "Kyoto", "limit": 5}) == tool_input_key({"limit": 5, "name": "KYOTO"})
+
+
+def test_each_tool_has_its_own_ttl():
+    cache = ToolResultCache(ttls={"get_local_events": 900}, default_ttl=3600, negative_ttl=60)
+    assert cache.cache("get_local_events").ttl == 900
+    assert cache.cache("get_images").ttl == 3600
+    assert cache.cache("get_local_events").negative_ttl == 60
+    assert ToolResultCache().cache("get_destination_info").ttl == TOOL_TTLS["get_destination_info"]
+
+
+def test_results_are_reused_until_they_expire():
+    cache = ToolResultCache(ttls={"get_local_events": 900})
+    clock = FakeClock()
+    cache.cache("get_local_events")._clock = clock
+    calls = []
+
+    def call():
+        calls.append(1)
+        return {"data": [len(calls)]}
+
+    assert cache.run("get_local_events", "Kyoto", call) == {"data": [1]}
+    clock.now = 899
+    assert cache.run("get_local_events", {"name": "kyoto"}, call) == {"data": [1]}
+    clock.now = 901
+    assert cache.run("get_local_events", "Kyoto", call) == {"data": [2]}
+    assert cache.stats()["get_local_events"]["expirations"] == 1
+
+
+def test_not_found_is_kept_for_the_negative_ttl():
+    cache = ToolResultCache(negative_ttl=60)
+    clock = FakeClock()
+    cache.cache("get_images")._clock = clock
+    calls = []
+
+    def call():
+        calls.append(1)
+        return None
+
+    cache.run("get_images", "Atlantis", call)
+    clock.now = 59
+    cache.run("get_images", "Atlantis", call)
+    clock.now = 61
+    cache.run("get_images", "Atlantis", call)
+    assert len(calls) == 2
+
+
+def test_errors_are_not_cached():
+    cache = ToolResultCache()
+
+    def fail():
+        raise RuntimeError("API down")
+
+    with pytest.raises(RuntimeError):
+        cache.run("get_travel_guide", "Rome", fail)
+    assert cache.run("get_travel_guide", "Rome", lambda: "guide") == "guide"
+
+
+def test_counts_hits_and_misses_per_tool():
+    cache = ToolResultCache()
+    hits, misses = requests("get_travel_guide", "hit"), requests("get_travel_guide", "miss")
+    for _ in range(3):
+        cache.run("get_travel_guide", "Lisbon", lambda: "guide")
+    assert requests("get_travel_guide", "miss") == misses + 1
+    assert requests("get_travel_guide", "hit") == hits + 2
+
+
+def test_concurrent_identical_calls_share_one_request():
+    cache = ToolResultCache()
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return "events"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(cache.run, "get_local_events", "Oslo", call) for _ in range(4)]
+        while cache.stats()["get_local_events"]["coalesced"] < 3:
+            time.sleep(0.01)
+        release.set()
+        assert [f.result() for f in futures] == ["events"] * 4
+    assert len(calls) == 1
+
+
+def test_arun_shares_one_request_between_coroutines():
+    cache = ToolResultCache()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "guide"
+
+    async def run():
+        return await asyncio.gather(*(cache.arun("get_travel_guide", "Porto", call) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["guide"] * 5
+    assert len(calls) == 1
+
+
+def test_failed_requests_raise_and_are_retried(api_url, tmp_path):
+    cache = ToolResultCache()
+    with PooledClient("http://127.0.0.1:1") as down, PooledClient(api_url) as up:
+        info = TravelInfo(api_token="token", client=down, cache=TTLCache(), store=SQLiteCache(str(tmp_path / "tools.db")))
+
+        def call():
+            return info.get_location_resource("Lisbon", "details")
+
+        with pytest.raises(ToolError):
+            cache.run("get_travel_guide", "Lisbon", call)
+        info.client = up
+        assert cache.run("get_travel_guide", "Lisbon", call)["resource"] == "details"
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from chains.tool_routing import DEFAULT_ROUTES, ToolRouter
+
+
+@pytest.fixture
+def router() -> ToolRouter:
+    return ToolRouter()
+
+
+@pytest.mark.parametrize("intent, question, tool", [
+    ("overview", "Tell me about Lisbon", "get_destination_info"),
+    ("overview", "Show me photos of Lisbon", "get_images"),
+    ("overview", "A short guide to Lisbon's history", "get_travel_guide"),
+    ("attractions", "What should I see in Rome?", "get_travel_guide"),
+    ("attractions", "Any festivals in Rome this summer?", "get_local_events"),
+    ("weather", "Will it rain in Oslo in May?", "get_destination_info"),
+    ("activities", "What is there to do in Kyoto?", "get_local_events"),
+    ("activities", "Where to eat in Kyoto", "get_restaurant_recommendations"),
+    ("activities", "Cheap HOSTELS in Kyoto", "get_accommodation_options"),
+])
+def test_routes_by_intent_and_keywords(router, intent, question, tool):
+    assert router.route(intent, question) == tool
+
+
+def test_without_a_question_uses_the_intent_default(router):
+    assert router.route("activities") == "get_local_events"
+
+
+def test_keywords_match_whole_words(router):
+    # "eaten" and "stayed" are not the keywords "eat" and "stay"
+    assert router.route("activities", "Have you eaten or stayed in Kyoto?") == "get_local_events"
+
+
+def test_ambiguous_questions_are_left_to_the_model(router):
+    assert router.route("activities", "Hotels and restaurants in Kyoto") is None
+    assert router.route("shopping", "Where to shop in Kyoto") is None
+
+
+def test_tools_lists_every_route_target(router):
+    assert router.tools() == {
+        "get_destination_info",
+        "get_travel_guide",
+        "get_images",
+        "get_local_events",
+        "get_restaurant_recommendations",
+        "get_accommodation_options",
+    }
+
+
+def test_loads_a_routing_table_from_file(tmp_path):
+    routes = {**DEFAULT_ROUTES, "shopping": {"tool": "get_local_events", "keywords": {"get_images": ["photos"]}}}
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps(routes), encoding="utf-8")
+    router = ToolRouter.from_file(str(path))
+    assert router.route("shopping", "Markets in Marrakesh") == "get_local_events"
+    assert router.route("shopping", "Photos of the markets") == "get_images"
@@ -0,0 +1,224 @@
+import asyncio
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalizes a destination name for use as a cache key.
+
+    Case, surrounding and repeated whitespace and diacritics are ignored, so
+    "paris", "Paris " and "París" all normalize to "paris".
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters describing cache effectiveness.
+    """
+
+    hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class _InFlight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    A thread-safe in-memory cache with per-entry TTL and LRU eviction.
+
+    ``None`` values are cached as negative results with their own, usually
+    shorter, TTL. Concurrent misses for the same key passed to get_or_load
+    share a single call to the loader.
+
+    Attributes:
+        maxsize (int): The maximum number of entries kept.
+        ttl (float): Seconds a value stays fresh.
+        negative_ttl (float): Seconds a ``None`` value stays fresh.
+        stats (CacheStats): Hit, miss and eviction counters.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 24 * 60 * 60,
+        negative_ttl: float = 10 * 60,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stats = CacheStats()
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, _InFlight] = {}
+        self._ainflight: Dict[tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _lookup(self, key: Hashable) -> Any:
+        # Must be called with the lock held
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.stats.expirations += 1
+            return _MISSING
+        self._data.move_to_end(key)
+        if value is None:
+            self.stats.negative_hits += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float]) -> None:
+        # Must be called with the lock held
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        self._data[key] = (value, self._clock() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the cached value for the key, or ``default`` if it is missing or expired.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.stats.misses += 1
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Stores a value, using the negative TTL for ``None`` unless ``ttl`` is given.
+        """
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value for the key, calling ``loader`` on a miss.
+
+        If another thread is already loading the same key, waits for its result
+        instead of calling the loader again. Exceptions raised by the loader are
+        propagated to every waiter and nothing is cached.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                self.stats.misses += 1
+                inflight = self._inflight[key] = _InFlight()
+                leader = True
+            else:
+                self.stats.coalesced += 1
+                leader = False
+
+        if not leader:
+            inflight.done.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.value
+
+        try:
+            inflight.value = loader()
+        except BaseException as e:
+            inflight.error = e
+            raise
+        else:
+            with self._lock:
+                self._store(key, inflight.value, None)
+            return inflight.value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            inflight.done.set()
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Asynchronous get_or_load: concurrent misses for the same key await one loader call.
+
+        Coalescing applies to coroutines running on the same event loop. If the coroutine
+        running the loader is cancelled, the waiters retry instead of being cancelled too.
+        """
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not _MISSING:
+                    return value
+                future = self._ainflight.get(inflight_key)
+                if future is None:
+                    self.stats.misses += 1
+                    future = self._ainflight[inflight_key] = loop.create_future()
+                    break
+                self.stats.coalesced += 1
+
+            try:
+                # Shielded so a cancelled waiter does not cancel the shared result
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The loading coroutine was cancelled, not this one; load again
+
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else is waiting
+            future.exception()
+            raise
+        else:
+            with self._lock:
+                self._store(key, value, None)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._ainflight[inflight_key]
@@ -0,0 +1,250 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Callable, List, Mapping, Optional
+
+from dotenv import load_dotenv, find_dotenv
+
+DEFAULT_MODEL = "gpt-3.5-turbo-0125"
+
+
+def _flag(value: Optional[str]) -> bool:
+    return (value or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _durations(value: Optional[str]) -> Mapping[str, float]:
+    # "get_local_events=300,get_images=86400" -> {"get_local_events": 300.0, "get_images": 86400.0}
+    durations = {}
+    for pair in (value or "").split(","):
+        if pair.strip():
+            name, _, seconds = pair.partition("=")
+            durations[name.strip()] = float(seconds)
+    return MappingProxyType(durations)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Application settings resolved once from the environment and the local .env file.
+
+    Attributes:
+        openai_api_key (str): The API key used for the OpenAI API.
+        openai_model (str): The chat model used by the chains.
+        openai_base_url (str): Optional override of the OpenAI API base URL.
+        openai_timeout (float): Timeout in seconds for OpenAI requests.
+        tripadvisor_api_token (str): The token used for the TripAdvisor API.
+        tripadvisor_base_url (str): The TripAdvisor API base URL.
+        connect_timeout (float): Connect timeout in seconds for TripAdvisor requests.
+        read_timeout (float): Read timeout in seconds for TripAdvisor requests.
+        destination_cache_size (int): Maximum number of cached destination lookups.
+        destination_cache_ttl (float): Seconds a found destination stays cached.
+        destination_negative_ttl (float): Seconds a "not found" result stays cached.
+        destination_cache_path (str): Optional SQLite file persisting destination lookups across
+            restarts and worker processes.
+        destination_cache_max_entries (int): Maximum number of destination lookups kept on disk.
+        llm_cache_backend (str): Where model responses are cached: "memory", "sqlite" or "none".
+        llm_cache_path (str): The SQLite file used by the "sqlite" LLM cache backend.
+        llm_cache_ttl (float): Seconds a cached model response stays fresh.
+        llm_cache_size (int): Maximum number of cached model responses.
+        semantic_cache_enabled (bool): Whether similar questions are answered from the semantic cache.
+        semantic_cache_embedder (str): The embedder used by the semantic cache: "openai" or "hashing".
+        semantic_cache_threshold (float): Minimum cosine similarity for a semantic cache hit.
+        semantic_cache_capacity (int): Maximum number of answers in the semantic cache.
+        semantic_cache_path (str): Optional directory persisting the semantic cache.
+        gazetteer_path (str): Optional directory of a packed destination gazetteer index.
+        tagger_fast_path (bool): Whether the Tagger tries rule-based extraction before the model.
+        tagger_fast_path_threshold (float): Minimum confidence for the rule-based result to be used.
+        tagger_memory_max_tokens (int): Token budget for the recent messages in the Tagger history.
+        tagger_memory_max_topics (int): Number of (destination, intent) pairs summarized in the Tagger history.
+        max_intents (int): Maximum number of (destination, intent) pairs answered for one question.
+        retrieval_max_concurrency (int): Maximum number of pairs of one question retrieved at once.
+        pipeline_mode (str): "staged" to tag the question and select each tool in separate model calls,
+            or "fused" to do both in the Tagger's call.
+        tool_routing (str): How the tool for a (destination, intent) pair is chosen: "table" to use the
+            routing table and ask the model only when it is ambiguous, or "llm" to always ask the model.
+        tool_routes_path (str): Optional JSON file replacing the default routing table.
+        tool_binding (str): Which tool schemas are sent with a tool-selection call: "intent" for
+            those relevant to the tagged intent, or "all".
+        tool_cache_enabled (bool): Whether tool results are cached and identical concurrent calls shared.
+        tool_cache_size (int): Maximum number of cached results per tool.
+        tool_cache_ttl (float): Seconds a result stays cached, for tools without a TTL of their own.
+        tool_cache_negative_ttl (float): Seconds an empty result stays cached.
+        tool_cache_ttls (Mapping[str, float]): Per-tool TTL overrides, read from TOOL_CACHE_TTLS
+            as "tool=seconds" pairs separated by commas.
+        session_store (str): Where conversation state is kept: "memory" or "sqlite".
+        session_store_path (str): The SQLite file used by the "sqlite" session store.
+        session_max_sessions (int): Maximum number of sessions kept by the "memory" session store.
+        session_idle_ttl (float): Seconds after which an idle session expires.
+        session_max_messages (int): Number of most recent chat transcript messages kept per session.
+        server_max_concurrency (int): Maximum number of questions the API server processes at once.
+        server_request_timeout (float): Seconds the API server allows for a whole request, answer included.
+        tracing_exporter (str): Where request spans go: "none", "memory" or "jsonl".
+        tracing_path (str): The JSON Lines file used by the "jsonl" tracing exporter.
+        tracing_buffer_size (int): The number of spans kept by the "memory" tracing exporter.
+        tripadvisor_headers (Mapping[str, str]): Precomputed TripAdvisor request headers.
+    """
+
+    openai_api_key: Optional[str] = None
+    openai_model: str = DEFAULT_MODEL
+    openai_base_url: Optional[str] = None
+    openai_timeout: float = 30.0
+    tripadvisor_api_token: str = ""
+    tripadvisor_base_url: str = "https://api.tripadvisor.com"
+    connect_timeout: float = 3.0
+    read_timeout: float = 10.0
+    destination_cache_size: int = 4096
+    destination_cache_ttl: float = 7 * 24 * 60 * 60
+    destination_negative_ttl: float = 10 * 60
+    destination_cache_path: Optional[str] = None
+    destination_cache_max_entries: int = 100_000
+    llm_cache_backend: str = "memory"
+    llm_cache_path: str = ".cache/llm_cache.sqlite3"
+    llm_cache_ttl: float = 24 * 60 * 60
+    llm_cache_size: int = 2048
+    semantic_cache_enabled: bool = False
+    semantic_cache_embedder: str = "openai"
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_capacity: int = 10_000
+    semantic_cache_path: Optional[str] = None
+    gazetteer_path: Optional[str] = None
+    tagger_fast_path: bool = True
+    tagger_fast_path_threshold: float = 0.8
+    tagger_memory_max_tokens: int = 512
+    tagger_memory_max_topics: int = 8
+    max_intents: int = 6
+    retrieval_max_concurrency: int = 4
+    pipeline_mode: str = "staged"
+    tool_routing: str = "table"
+    tool_routes_path: Optional[str] = None
+    tool_binding: str = "intent"
+    tool_cache_enabled: bool = True
+    tool_cache_size: int = 1024
+    tool_cache_ttl: float = 60 * 60
+    tool_cache_negative_ttl: float = 60.0
+    tool_cache_ttls: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))
+    session_store: str = "memory"
+    session_store_path: str = ".cache/sessions.sqlite3"
+    session_max_sessions: int = 10_000
+    session_idle_ttl: float = 60 * 60
+    session_max_messages: int = 100
+    server_max_concurrency: int = 32
+    server_request_timeout: float = 60.0
+    tracing_exporter: str = "none"
+    tracing_path: str = ".cache/traces.jsonl"
+    tracing_buffer_size: int = 10_000
+    tripadvisor_headers: Mapping[str, str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        headers = {'accept': 'application/json'}
+        if self.tripadvisor_api_token:
+            headers['Authorization'] = 'Bearer ' + self.tripadvisor_api_token
+        headers = MappingProxyType(headers)
+        object.__setattr__(self, "tripadvisor_headers", headers)
+
+    @classmethod
+    def from_env(cls, override: bool = False) -> "Settings":
+        """
+        Builds the settings from environment variables, after loading the local .env file.
+
+        Args:
+            override (bool): Whether values in the .env file replace variables already set.
+        """
+        load_dotenv(find_dotenv(), override=override)  # read local .env file
+        env = os.environ
+        return cls(
+            openai_api_key=env.get("OPENAI_API_KEY"),
+            openai_model=env.get("OPENAI_MODEL", DEFAULT_MODEL),
+            openai_base_url=env.get("OPENAI_BASE_URL") or None,
+            openai_timeout=float(env.get("OPENAI_TIMEOUT", 30.0)),
+            tripadvisor_api_token=env.get("TRIPADVISOR_API_TOKEN", ""),
+            tripadvisor_base_url=env.get("TRIPADVISOR_BASE_URL", "https://api.tripadvisor.com"),
+            connect_timeout=float(env.get("HTTP_CONNECT_TIMEOUT", 3.0)),
+            read_timeout=float(env.get("HTTP_READ_TIMEOUT", 10.0)),
+            destination_cache_size=int(env.get("DESTINATION_CACHE_SIZE", 4096)),
+            destination_cache_ttl=float(env.get("DESTINATION_CACHE_TTL", 7 * 24 * 60 * 60)),
+            destination_negative_ttl=float(env.get("DESTINATION_NEGATIVE_TTL", 10 * 60)),
+            destination_cache_path=env.get("DESTINATION_CACHE_PATH") or None,
+            destination_cache_max_entries=int(env.get("DESTINATION_CACHE_MAX_ENTRIES", 100_000)),
+            llm_cache_backend=env.get("LLM_CACHE_BACKEND", "memory"),
+            llm_cache_path=env.get("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3"),
+            llm_cache_ttl=float(env.get("LLM_CACHE_TTL", 24 * 60 * 60)),
+            llm_cache_size=int(env.get("LLM_CACHE_SIZE", 2048)),
+            semantic_cache_enabled=_flag(env.get("SEMANTIC_CACHE_ENABLED")),
+            semantic_cache_embedder=env.get("SEMANTIC_CACHE_EMBEDDER", "openai"),
+            semantic_cache_threshold=float(env.get("SEMANTIC_CACHE_THRESHOLD", 0.92)),
+            semantic_cache_capacity=int(env.get("SEMANTIC_CACHE_CAPACITY", 10_000)),
+            semantic_cache_path=env.get("SEMANTIC_CACHE_PATH") or None,
+            gazetteer_path=env.get("GAZETTEER_PATH") or None,
+            tagger_fast_path=_flag(env.get("TAGGER_FAST_PATH", "true")),
+            tagger_fast_path_threshold=float(env.get("TAGGER_FAST_PATH_THRESHOLD", 0.8)),
+            tagger_memory_max_tokens=int(env.get("TAGGER_MEMORY_MAX_TOKENS", 512)),
+            tagger_memory_max_topics=int(env.get("TAGGER_MEMORY_MAX_TOPICS", 8)),
+            max_intents=int(env.get("MAX_INTENTS", 6)),
+            retrieval_max_concurrency=int(env.get("RETRIEVAL_MAX_CONCURRENCY", 4)),
+            pipeline_mode=env.get("PIPELINE_MODE", "staged"),
+            tool_routing=env.get("TOOL_ROUTING", "table"),
+            tool_routes_path=env.get("TOOL_ROUTES_PATH") or None,
+            tool_binding=env.get("TOOL_BINDING", "intent"),
+            tool_cache_enabled=_flag(env.get("TOOL_CACHE_ENABLED", "true")),
+            tool_cache_size=int(env.get("TOOL_CACHE_SIZE", 1024)),
+            tool_cache_ttl=float(env.get("TOOL_CACHE_TTL", 60 * 60)),
+            tool_cache_negative_ttl=float(env.get("TOOL_CACHE_NEGATIVE_TTL", 60.0)),
+            tool_cache_ttls=_durations(env.get("TOOL_CACHE_TTLS")),
+            session_store=env.get("SESSION_STORE", "memory"),
+            session_store_path=env.get("SESSION_STORE_PATH", ".cache/sessions.sqlite3"),
+            session_max_sessions=int(env.get("SESSION_MAX_SESSIONS", 10_000)),
+            session_idle_ttl=float(env.get("SESSION_IDLE_TTL", 60 * 60)),
+            session_max_messages=int(env.get("SESSION_MAX_MESSAGES", 100)),
+            server_max_concurrency=int(env.get("SERVER_MAX_CONCURRENCY", 32)),
+            server_request_timeout=float(env.get("SERVER_REQUEST_TIMEOUT", 60.0)),
+            tracing_exporter=env.get("TRACING_EXPORTER", "none"),
+            tracing_path=env.get("TRACING_PATH", ".cache/traces.jsonl"),
+            tracing_buffer_size=int(env.get("TRACING_BUFFER_SIZE", 10_000)),
+        )
+
+
+_settings: Optional[Settings] = None
+_lock = threading.Lock()
+_reload_hooks: List[Callable[[Settings], None]] = []
+
+
+def get_settings() -> Settings:
+    """
+    Returns the process-wide settings, resolving them on first use.
+    """
+    global _settings
+    if _settings is None:
+        with _lock:
+            if _settings is None:
+                _settings = Settings.from_env()
+    return _settings
+
+
+def reload_settings(settings: Optional[Settings] = None) -> Settings:
+    """
+    Replaces the process-wide settings and notifies the registered reload hooks.
+
+    Args:
+        settings (Settings, optional): The new settings. Re-read from the environment when omitted.
+
+    Returns:
+        Settings: The settings now in effect.
+    """
+    global _settings
+    new_settings = settings or Settings.from_env(override=True)
+    with _lock:
+        _settings = new_settings
+        hooks = list(_reload_hooks)
+    for hook in hooks:
+        hook(new_settings)
+    return new_settings
+
+
+def on_reload(hook: Callable[[Settings], None]) -> Callable[[Settings], None]:
+    """
+    Registers a callback invoked with the new settings after each reload.
+    """
+    with _lock:
+        _reload_hooks.append(hook)
+    return hook
@@ -0,0 +1,251 @@
+import csv
+import json
+import os
+import sys
+import threading
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from utils.cache import normalize_name
+from utils.config import Settings, get_settings, on_reload
+
+
+class Place(NamedTuple):
+    """
+    A destination known to the gazetteer.
+    """
+
+    name: str
+    location_id: str
+
+
+def _read_source(path: str) -> Iterator[Tuple[str, str, List[str]]]:
+    # Yields (name, location_id, aliases) from a CSV or JSONL dump
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record["name"], str(record["location_id"]), list(record.get("aliases") or [])
+        else:
+            for row in csv.DictReader(f):
+                aliases = [a for a in (row.get("aliases") or "").split("|") if a.strip()]
+                yield row["name"], str(row["location_id"]), aliases
+
+
+def _pack(strings: List[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) for s in strings], dtype=np.int64)
+    blob = np.frombuffer(b"".join(strings), dtype=np.uint8) if strings else np.zeros(0, dtype=np.uint8)
+    return blob, offsets
+
+
+def build_gazetteer(source: str, directory: str) -> int:
+    """
+    Builds the packed index files for a CSV or JSONL dump of destinations.
+
+    CSV files need ``name`` and ``location_id`` columns and may have an ``aliases``
+    column separated by ``|``. JSONL records have the same fields, with ``aliases`` as a list.
+
+    Args:
+        source (str): The path of the dump.
+        directory (str): The directory the index files are written to.
+
+    Returns:
+        int: The number of names (including aliases) indexed.
+    """
+    names, ids, keys = [], [], []
+    for name, location_id, aliases in _read_source(source):
+        entry = len(names)
+        names.append(name.encode("utf-8"))
+        ids.append(location_id.encode("utf-8"))
+        for alias in [name] + aliases:
+            key = normalize_name(alias).encode("utf-8")
+            if key:
+                keys.append((key, entry))
+    keys = sorted(set(keys))
+
+    os.makedirs(directory, exist_ok=True)
+    key_blob, key_offsets = _pack([k for k, _ in keys])
+    name_blob, name_offsets = _pack(names)
+    id_blob, id_offsets = _pack(ids)
+    arrays = {
+        "keys": key_blob,
+        "key_offsets": key_offsets,
+        "key_entries": np.array([e for _, e in keys], dtype=np.int64),
+        "names": name_blob,
+        "name_offsets": name_offsets,
+        "ids": id_blob,
+        "id_offsets": id_offsets,
+    }
+    for filename, array in arrays.items():
+        np.save(os.path.join(directory, filename + ".npy"), array)
+    return len(keys)
+
+
+class Gazetteer:
+    """
+    An offline index of destination names and aliases resolving to TripAdvisor location IDs.
+
+    Normalized names are stored sorted in a single byte array with an offsets array, and
+    the files are memory-mapped, so opening an index of millions of names is immediate
+    and lookups are binary searches. Fuzzy lookup walks the sorted keys as an implicit
+    trie, pruning prefixes whose edit distance already exceeds the bound.
+
+    Attributes:
+        directory (str): The directory holding the index files.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+        def load(filename: str) -> np.ndarray:
+            return np.load(os.path.join(directory, filename + ".npy"), mmap_mode="r")
+
+        self._keys = load("keys")
+        self._key_offsets = load("key_offsets")
+        self._key_entries = load("key_entries")
+        self._names = load("names")
+        self._name_offsets = load("name_offsets")
+        self._ids = load("ids")
+        self._id_offsets = load("id_offsets")
+
+    def __len__(self) -> int:
+        return len(self._key_entries)
+
+    def _key(self, i: int) -> bytes:
+        return self._keys[self._key_offsets[i]:self._key_offsets[i + 1]].tobytes()
+
+    def _place(self, i: int) -> Place:
+        entry = int(self._key_entries[i])
+        name = self._names[self._name_offsets[entry]:self._name_offsets[entry + 1]].tobytes()
+        location_id = self._ids[self._id_offsets[entry]:self._id_offsets[entry + 1]].tobytes()
+        return Place(name.decode("utf-8"), location_id.decode("utf-8"))
+
+    def _lower_bound(self, key: bytes, lo: int = 0, hi: Optional[int] = None) -> int:
+        # First index whose key is >= key
+        hi = len(self) if hi is None else hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _prefix_end(self, prefix: bytes, lo: int, hi: int) -> int:
+        # First index in [lo, hi) whose key does not start with prefix, given keys in
+        # [lo, hi) are all >= prefix
+        size = len(prefix)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[:size] <= prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def exact(self, name: str) -> Optional[Place]:
+        """
+        Returns the place whose name or alias matches, ignoring case, spacing and diacritics.
+        """
+        key = normalize_name(name).encode("utf-8")
+        i = self._lower_bound(key)
+        if i < len(self) and self._key(i) == key:
+            return self._place(i)
+        return None
+
+    def prefix(self, prefix: str, limit: int = 10) -> List[Place]:
+        """
+        Returns up to ``limit`` places with a name or alias starting with the prefix.
+        """
+        key = normalize_name(prefix).encode("utf-8")
+        start = self._lower_bound(key)
+        end = self._prefix_end(key, start, len(self))
+        places = []
+        for i in range(start, end):
+            place = self._place(i)
+            if place not in places:
+                places.append(place)
+                if len(places) == limit:
+                    break
+        return places
+
+    def fuzzy(self, name: str, max_distance: int = 1, limit: int = 10) -> List[Tuple[Place, int]]:
+        """
+        Returns places within ``max_distance`` edits of the name, closest first.
+
+        Distances are counted on the UTF-8 bytes of the normalized names; diacritics are
+        removed by normalization, so this matches character edits for most names.
+        """
+        query = normalize_name(name).encode("utf-8")
+        matches: List[Tuple[int, int]] = []
+        stack = [(0, len(self), b"", list(range(len(query) + 1)))]
+        while stack:
+            lo, hi, prefix, row = stack.pop()
+            depth = len(prefix)
+            i = lo
+            # Keys equal to the prefix sort first within the range
+            while i < hi and len(self._key(i)) == depth:
+                if row[-1] <= max_distance:
+                    matches.append((row[-1], i))
+                i += 1
+            while i < hi:
+                child = prefix + self._key(i)[depth:depth + 1]
+                end = self._prefix_end(child, i, hi)
+                c = child[-1]
+                new_row = [row[0] + 1]
+                for x in range(1, len(query) + 1):
+                    new_row.append(min(
+                        new_row[x - 1] + 1,
+                        row[x] + 1,
+                        row[x - 1] + (query[x - 1] != c),
+                    ))
+                if min(new_row) <= max_distance:
+                    stack.append((i, end, child, new_row))
+                i = end
+        matches.sort()
+        results, seen = [], set()
+        for distance, i in matches:
+            place = self._place(i)
+            if place not in seen:
+                seen.add(place)
+                results.append((place, distance))
+                if len(results) == limit:
+                    break
+        return results
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """
+    Returns the process-wide gazetteer, or None if no index is configured.
+    """
+    global _gazetteer
+    settings = get_settings()
+    if not settings.gazetteer_path:
+        return None
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = Gazetteer(settings.gazetteer_path)
+        return _gazetteer
+
+
+@on_reload
+def _reset_gazetteer(settings: Settings) -> None:
+    global _gazetteer
+    with _gazetteer_lock:
+        _gazetteer = None
+
+
+# Example usage:
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m utils.gazetteer <destinations.csv|destinations.jsonl> <index directory>")
+        sys.exit(1)
+    count = build_gazetteer(sys.argv[1], sys.argv[2])
+    print(f"Indexed {count} names into {sys.argv[2]}")
@@ -0,0 +1,204 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+# httpcore emits this trace event only when it opens a new connection, so a
+# request without it was served by a pooled keep-alive connection.
+_CONNECT_EVENT = "connection.connect_tcp.started"
+
+
+@dataclass
+class PoolStats:
+    """
+    Counters describing how requests were served by a pooled client.
+    """
+
+    requests: int = 0
+    new_connections: int = 0
+    pool_hits: int = 0
+    errors: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, new_connection: bool, error: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            if error:
+                self.errors += 1
+            if new_connection:
+                self.new_connections += 1
+            elif not error:
+                self.pool_hits += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "pool_hits": self.pool_hits,
+                "errors": self.errors,
+            }
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """
+    Connection pool and timeout settings shared by the sync and async clients.
+    """
+
+    max_connections: int = 20
+    max_connections_per_host: int = 10
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 3.0
+    read_timeout: float = 10.0
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.read_timeout,
+            pool=self.connect_timeout,
+        )
+
+
+def _host(url: str, base_url: str) -> str:
+    parts = urlsplit(url if "://" in url else base_url)
+    return parts.netloc
+
+
+class PooledClient:
+    """
+    A thread-safe HTTP client that reuses keep-alive connections between requests.
+
+    Attributes:
+        config (PoolConfig): The pool size, per-host limit and timeout settings.
+        stats (PoolStats): Counters of pool hits vs. new connections.
+    """
+
+    def __init__(self, base_url: str = "", config: Optional[PoolConfig] = None) -> None:
+        self.base_url = base_url
+        self.config = config or PoolConfig()
+        self.stats = PoolStats()
+        self._client = httpx.Client(
+            base_url=base_url,
+            limits=self.config.limits(),
+            timeout=self.config.timeout(),
+        )
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = _host(url, self.base_url)
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.config.max_connections_per_host)
+            return self._hosts[host]
+
+    @contextmanager
+    def _tracked(self, url: str):
+        events = []
+
+        def trace(event_name: str, info: dict) -> None:
+            if event_name == _CONNECT_EVENT:
+                events.append(event_name)
+
+        with self._host_slot(url):
+            try:
+                yield trace
+            except httpx.HTTPError:
+                self.stats.record(bool(events), error=True)
+                raise
+            self.stats.record(bool(events))
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends a request through the pool and records whether a connection was reused.
+        """
+        with self._tracked(url) as trace:
+            return self._client.request(method, url, extensions={"trace": trace}, **kwargs)
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def close(self) -> None:
+        self._client.close()
+
+    def __enter__(self) -> "PooledClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class AsyncPooledClient:
+    """
+    The asyncio counterpart of PooledClient.
+
+    Attributes:
+        config (PoolConfig): The pool size, per-host limit and timeout settings.
+        stats (PoolStats): Counters of pool hits vs. new connections.
+    """
+
+    def __init__(self, base_url: str = "", config: Optional[PoolConfig] = None) -> None:
+        self.base_url = base_url
+        self.config = config or PoolConfig()
+        self.stats = PoolStats()
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            limits=self.config.limits(),
+            timeout=self.config.timeout(),
+        )
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = _host(url, self.base_url)
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.config.max_connections_per_host)
+        return self._hosts[host]
+
+    @asynccontextmanager
+    async def _tracked(self, url: str):
+        events = []
+
+        async def trace(event_name: str, info: dict) -> None:
+            if event_name == _CONNECT_EVENT:
+                events.append(event_name)
+
+        async with self._host_slot(url):
+            try:
+                yield trace
+            except httpx.HTTPError:
+                self.stats.record(bool(events), error=True)
+                raise
+            self.stats.record(bool(events))
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends a request through the pool and records whether a connection was reused.
+        """
+        async with self._tracked(url) as trace:
+            return await self._client.request(method, url, extensions={"trace": trace}, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncPooledClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
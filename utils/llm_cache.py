@@ -0,0 +1,319 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import LLMResult
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableBinding, RunnableConfig
+from langchain_core.runnables.config import ensure_config
+
+from utils.cache import CacheStats, TTLCache
+from utils.config import Settings, get_settings, on_reload
+from utils.llm_usage import RetryCounter, record_llm_call, record_llm_error
+from utils.memory import count_tokens
+from utils.persistent_cache import SQLiteCache
+from utils.tracing import get_tracer, span
+
+_MISSING = object()
+
+
+class LLMCache:
+    """
+    An exact-match cache of chat model responses with per-chain hit-rate metrics.
+
+    Attributes:
+        backend (TTLCache or SQLiteCache): Where responses are stored.
+        stats (Dict[str, CacheStats]): Hit and miss counters per chain name.
+    """
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self.stats: Dict[str, CacheStats] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, hit: bool) -> None:
+        # Lookups from several threads update the same counters
+        with self._lock:
+            stats = self.stats.setdefault(name, CacheStats())
+            if hit:
+                stats.hits += 1
+            else:
+                stats.misses += 1
+
+    def lookup(self, name: str, key: str) -> Optional[BaseMessage]:
+        data = self.backend.get(key, _MISSING)
+        self._count(name, data is not _MISSING)
+        if data is _MISSING:
+            return None
+        return messages_from_dict([data])[0]
+
+    def update(self, key: str, message: BaseMessage) -> None:
+        self.backend.set(key, message_to_dict(message))
+
+    def hit_rates(self) -> Dict[str, float]:
+        """
+        Returns the fraction of lookups served from the cache, per chain.
+        """
+        rates = {}
+        with self._lock:
+            counts = [(name, stats.hits, stats.misses) for name, stats in self.stats.items()]
+        for name, hits, misses in counts:
+            total = hits + misses
+            rates[name] = hits / total if total else 0.0
+        return rates
+
+
+def cache_key(model: Runnable, prompt: PromptValue) -> str:
+    """
+    Returns a stable hash of the model configuration, bound functions and rendered messages.
+    """
+    bound_kwargs: Dict[str, Any] = {}
+    if isinstance(model, RunnableBinding):
+        bound_kwargs = model.kwargs
+        model = model.bound
+    payload = {
+        "model": getattr(model, "_identifying_params", {}),
+        "kwargs": bound_kwargs,
+        "messages": [message_to_dict(m) for m in prompt.to_messages()],
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _unbind(model: Runnable, config: Optional[RunnableConfig], kwargs: Dict[str, Any]) -> Tuple[Runnable, RunnableConfig, Dict[str, Any]]:
+    # Splits a model with bound functions into the chat model and its call arguments
+    if isinstance(model, RunnableBinding):
+        return model.bound, model._merge_configs(config), {**model.kwargs, **kwargs}
+    return model, ensure_config(config), kwargs
+
+
+def _estimated_usage(prompt: PromptValue, completion: Optional[BaseMessage]) -> Dict[str, int]:
+    # Streamed responses carry no usage, so the tokens are counted locally
+    return {
+        "prompt_tokens": count_tokens(prompt.to_string()),
+        "completion_tokens": count_tokens(str(completion.content)) if completion is not None else 0,
+    }
+
+
+def _usage(prompt: PromptValue, result: LLMResult) -> Dict[str, int]:
+    token_usage = (result.llm_output or {}).get("token_usage")
+    if not token_usage:
+        return _estimated_usage(prompt, result.generations[0][0].message)
+    return {
+        "prompt_tokens": token_usage.get("prompt_tokens", 0),
+        "completion_tokens": token_usage.get("completion_tokens", 0),
+    }
+
+
+class CachedChatModel(Runnable[PromptValue, BaseMessage]):
+    """
+    Wraps the model step of a chain so repeated prompts are answered from an LLMCache.
+
+    The chains run at temperature 0, so an identical prompt yields an identical response.
+    Every call is recorded in the ``llm_*`` metrics (see record_llm_call) and as an "llm"
+    span with the chain name, whether it was a cache hit, the token counts and retries.
+
+    Attributes:
+        model (Runnable): The chat model, optionally with bound functions.
+        cache (LLMCache): Where responses are cached, or None if caching is disabled.
+        name (str): The chain name used for metrics and spans.
+        model_name (str): The name of the underlying model, used for metrics.
+    """
+
+    def __init__(self, model: Runnable, cache: Optional[LLMCache], name: str) -> None:
+        self.model = model
+        self.cache = cache
+        self.name = name
+        bound = model.bound if isinstance(model, RunnableBinding) else model
+        self.model_name = getattr(bound, "model_name", type(bound).__name__)
+
+    def _lookup(self, input: PromptValue) -> Tuple[Optional[str], Optional[BaseMessage]]:
+        if self.cache is None:
+            return None, None
+        key = cache_key(self.model, input)
+        return key, self.cache.lookup(self.name, key)
+
+    def _update(self, key: Optional[str], message: BaseMessage) -> None:
+        if key is not None:
+            self.cache.update(key, message)
+
+    def _record(self, current, start: float, cache_hit: bool, usage: Optional[Dict[str, int]] = None, retries: int = 0) -> None:
+        usage = usage or {}
+        current.set(cache_hit=cache_hit, retries=retries, **usage)
+        record_llm_call(self.name, self.model_name, time.perf_counter() - start, cache_hit, retries=retries, **usage)
+
+    def _record_stream(self, input: PromptValue, start: float, first_chunk: Optional[float], full: Optional[BaseMessage], cache_hit: bool, retries: int = 0) -> None:
+        end = time.perf_counter()
+        ttft = (first_chunk or end) - start
+        usage = {} if cache_hit else _estimated_usage(input, full)
+        record_llm_call(self.name, self.model_name, end - start, cache_hit, retries=retries, ttft=ttft, **usage)
+        get_tracer().record(
+            "llm", end - start, chain=self.name, cache_hit=cache_hit, streamed=True, ttft=ttft, retries=retries, **usage
+        )
+
+    def invoke(self, input: PromptValue, config: Optional[RunnableConfig] = None, **kwargs: Any) -> BaseMessage:
+        start = time.perf_counter()
+        with span("llm", chain=self.name) as current:
+            key, message = self._lookup(input)
+            if message is not None:
+                self._record(current, start, True)
+                return message
+            model, config, kwargs = _unbind(self.model, config, kwargs)
+            try:
+                with RetryCounter() as retries:
+                    if isinstance(model, BaseChatModel):
+                        # Called through generate_prompt so the token usage is not discarded
+                        result = model.generate_prompt(
+                            [input],
+                            callbacks=config.get("callbacks"),
+                            tags=config.get("tags"),
+                            metadata=config.get("metadata"),
+                            run_name=config.get("run_name"),
+                            **kwargs,
+                        )
+                        message = result.generations[0][0].message
+                        usage = _usage(input, result)
+                    else:
+                        message = model.invoke(input, config, **kwargs)
+                        usage = _estimated_usage(input, message)
+            except Exception:
+                record_llm_error(self.name, self.model_name)
+                raise
+            self._update(key, message)
+            self._record(current, start, False, usage, retries.count)
+            return message
+
+    async def ainvoke(self, input: PromptValue, config: Optional[RunnableConfig] = None, **kwargs: Any) -> BaseMessage:
+        start = time.perf_counter()
+        with span("llm", chain=self.name) as current:
+            key, message = self._lookup(input)
+            if message is not None:
+                self._record(current, start, True)
+                return message
+            model, config, kwargs = _unbind(self.model, config, kwargs)
+            try:
+                with RetryCounter() as retries:
+                    if isinstance(model, BaseChatModel):
+                        result = await model.agenerate_prompt(
+                            [input],
+                            callbacks=config.get("callbacks"),
+                            tags=config.get("tags"),
+                            metadata=config.get("metadata"),
+                            run_name=config.get("run_name"),
+                            **kwargs,
+                        )
+                        message = result.generations[0][0].message
+                        usage = _usage(input, result)
+                    else:
+                        message = await model.ainvoke(input, config, **kwargs)
+                        usage = _estimated_usage(input, message)
+            except Exception:
+                record_llm_error(self.name, self.model_name)
+                raise
+            self._update(key, message)
+            self._record(current, start, False, usage, retries.count)
+            return message
+
+    def stream(self, input: PromptValue, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[BaseMessage]:
+        start = time.perf_counter()
+        key, message = self._lookup(input)
+        if message is not None:
+            self._record_stream(input, start, start, message, True)
+            yield AIMessageChunk(content=message.content, additional_kwargs=message.additional_kwargs)
+            return
+        chunks = iter(self.model.stream(input, config, **kwargs))
+        try:
+            # Retries happen before the first chunk, so only that wait is counted
+            with RetryCounter() as retries:
+                first = next(chunks, None)
+        except Exception:
+            record_llm_error(self.name, self.model_name)
+            raise
+        first_chunk = time.perf_counter()
+        full = first
+        if first is not None:
+            yield first
+            for chunk in chunks:
+                full = full + chunk
+                yield chunk
+        self._record_stream(input, start, first_chunk, full, False, retries.count)
+        if full is not None:
+            self._update(key, full)
+
+    async def astream(self, input: PromptValue, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[BaseMessage]:
+        start = time.perf_counter()
+        key, message = self._lookup(input)
+        if message is not None:
+            self._record_stream(input, start, start, message, True)
+            yield AIMessageChunk(content=message.content, additional_kwargs=message.additional_kwargs)
+            return
+        chunks = self.model.astream(input, config, **kwargs).__aiter__()
+        try:
+            with RetryCounter() as retries:
+                first = await chunks.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except Exception:
+            record_llm_error(self.name, self.model_name)
+            raise
+        first_chunk = time.perf_counter()
+        full = first
+        if first is not None:
+            yield first
+            async for chunk in chunks:
+                full = full + chunk
+                yield chunk
+        self._record_stream(input, start, first_chunk, full, False, retries.count)
+        if full is not None:
+            self._update(key, full)
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Returns the process-wide LLM response cache, or None if caching is disabled.
+    """
+    global _cache
+    settings = get_settings()
+    if settings.llm_cache_backend == "none":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            if settings.llm_cache_backend == "sqlite":
+                backend = SQLiteCache(
+                    settings.llm_cache_path,
+                    ttl=settings.llm_cache_ttl,
+                    max_entries=settings.llm_cache_size,
+                )
+            elif settings.llm_cache_backend == "memory":
+                backend = TTLCache(maxsize=settings.llm_cache_size, ttl=settings.llm_cache_ttl)
+            else:
+                raise ValueError(f"Unknown LLM cache backend: {settings.llm_cache_backend}")
+            _cache = LLMCache(backend)
+        return _cache
+
+
+@on_reload
+def _reset_cache(settings: Settings) -> None:
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def with_cache(model: Runnable, name: str) -> Runnable:
+    """
+    Wraps a chain's model step with the process-wide response cache, if enabled, and
+    records each call in the metrics and as a span.
+
+    Args:
+        model (Runnable): The chat model, optionally with bound functions.
+        name (str): The chain name used for hit-rate metrics and spans.
+    """
+    return CachedChatModel(model, get_llm_cache(), name)
@@ -0,0 +1,200 @@
+import asyncio
+import contextvars
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+import openai
+from openai._constants import DEFAULT_LIMITS, DEFAULT_TIMEOUT
+
+from utils.metrics import metrics
+
+# USD per 1K prompt and completion tokens
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-3.5-turbo-0125": (0.0005, 0.0015),
+    "gpt-3.5-turbo-1106": (0.001, 0.002),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-32k": (0.06, 0.12),
+    "gpt-4-turbo-preview": (0.01, 0.03),
+    "gpt-4-0125-preview": (0.01, 0.03),
+    "gpt-4-1106-preview": (0.01, 0.03),
+}
+
+# Upper bounds in tokens, so a growing prompt shows up as a shift between buckets
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+_retries: contextvars.ContextVar[Optional["RetryCounter"]] = contextvars.ContextVar("llm_retries", default=None)
+
+
+def cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """
+    Returns the price of a call in USD, or None for a model without a known price.
+    """
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1000
+
+
+class RetryCounter:
+    """
+    Counts the retries the OpenAI client makes while it is the active counter.
+
+    The client retries failed requests internally without reporting it, so every
+    HTTP attempt made by the clients from ``openai_clients`` is counted by a request
+    hook, and each attempt after the first is a retry.
+    """
+
+    def __init__(self) -> None:
+        self.attempts = 0
+
+    @property
+    def count(self) -> int:
+        return max(self.attempts - 1, 0)
+
+    def __enter__(self) -> "RetryCounter":
+        self._token = _retries.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        _retries.reset(self._token)
+        return False
+
+
+def _count_attempt(request: httpx.Request) -> None:
+    counter = _retries.get()
+    if counter is not None:
+        counter.attempts += 1
+
+
+async def _acount_attempt(request: httpx.Request) -> None:
+    _count_attempt(request)
+
+
+class _PerLoopTransport(httpx.AsyncBaseTransport):
+    # A connection pool is bound to the event loop that opened it, but a chain's OpenAI
+    # client is shared by every loop, so each loop gets its own pool
+    def __init__(self) -> None:
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(limits=DEFAULT_LIMITS)
+        return await transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+def openai_clients(api_key: Optional[str], base_url: Optional[str], timeout: Optional[float]) -> Dict[str, Any]:
+    """
+    Returns OpenAI chat completion clients whose attempts RetryCounter counts.
+
+    Passed to ChatOpenAI as its ``client`` and ``async_client``.
+
+    Args:
+        api_key (str, optional): The OpenAI API key.
+        base_url (str, optional): The API base URL, or None for OpenAI's.
+        timeout (float, optional): Seconds before a request times out, or None for the client's default.
+    """
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    hooks = {"request": [_count_attempt]}
+    ahooks = {"request": [_acount_attempt]}
+    # The same defaults the OpenAI client gives the httpx clients it creates itself
+    options = dict(timeout=timeout, limits=DEFAULT_LIMITS, follow_redirects=True)
+    client = openai.OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=timeout,
+        http_client=httpx.Client(event_hooks=hooks, **options),
+    )
+    async_client = openai.AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=timeout,
+        http_client=httpx.AsyncClient(event_hooks=ahooks, transport=_PerLoopTransport(), **options),
+    )
+    return {"client": client.chat.completions, "async_client": async_client.chat.completions}
+
+
+def record_llm_call(
+    chain: str,
+    model: str,
+    latency: float,
+    cache_hit: bool,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    retries: int = 0,
+    ttft: Optional[float] = None,
+) -> None:
+    """
+    Records one model call in the process-wide metrics, labelled by chain and model.
+
+    Metrics:
+        llm_requests_total{cache}: Calls, split into cache hits and misses.
+        llm_latency_seconds{cache}: Call latency.
+        llm_ttft_seconds: Time to the first streamed chunk.
+        llm_prompt_tokens_total, llm_completion_tokens_total: Tokens sent to and generated by the model.
+        llm_prompt_tokens: The distribution of prompt sizes.
+        llm_retries_total: Requests the OpenAI client retried.
+        llm_cost_usd_total: The price of the calls, for models in MODEL_PRICES.
+    """
+    cache = "hit" if cache_hit else "miss"
+    metrics.counter("llm_requests_total", chain=chain, model=model, cache=cache).inc()
+    metrics.histogram("llm_latency_seconds", chain=chain, model=model, cache=cache).observe(latency)
+    if ttft is not None:
+        metrics.histogram("llm_ttft_seconds", chain=chain, model=model, cache=cache).observe(ttft)
+    if cache_hit:
+        return
+    metrics.counter("llm_prompt_tokens_total", chain=chain, model=model).inc(prompt_tokens)
+    metrics.counter("llm_completion_tokens_total", chain=chain, model=model).inc(completion_tokens)
+    metrics.histogram("llm_prompt_tokens", TOKEN_BUCKETS, chain=chain, model=model).observe(prompt_tokens)
+    if retries:
+        metrics.counter("llm_retries_total", chain=chain, model=model).inc(retries)
+    price = cost(model, prompt_tokens, completion_tokens)
+    if price is not None:
+        metrics.counter("llm_cost_usd_total", chain=chain, model=model).inc(price)
+
+
+def record_llm_error(chain: str, model: str) -> None:
+    metrics.counter("llm_errors_total", chain=chain, model=model).inc()
+
+
+def usage_summary() -> Dict[str, dict]:
+    """
+    Returns the recorded calls, tokens, retries, errors and cost per ``chain/model``.
+    """
+    summary: Dict[str, dict] = {}
+    for counter in metrics.snapshot()["counters"]:
+        name, labels = counter["name"], counter["labels"]
+        if not name.startswith("llm_") or "chain" not in labels:
+            continue
+        entry = summary.setdefault(f"{labels['chain']}/{labels['model']}", {
+            "requests": 0, "cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "retries": 0, "errors": 0, "cost_usd": 0.0,
+        })
+        value = counter["value"]
+        if name == "llm_requests_total":
+            entry["requests"] += int(value)
+            if labels.get("cache") == "hit":
+                entry["cache_hits"] += int(value)
+        elif name == "llm_prompt_tokens_total":
+            entry["prompt_tokens"] += int(value)
+        elif name == "llm_completion_tokens_total":
+            entry["completion_tokens"] += int(value)
+        elif name == "llm_retries_total":
+            entry["retries"] += int(value)
+        elif name == "llm_errors_total":
+            entry["errors"] += int(value)
+        elif name == "llm_cost_usd_total":
+            entry["cost_usd"] += value
+    return summary
@@ -0,0 +1,164 @@
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import tiktoken
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from utils.config import get_settings
+from utils.logger import logger
+
+
+@lru_cache(maxsize=None)
+def _encoding(name: str) -> Optional[tiktoken.Encoding]:
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # The encoding is downloaded on first use, which fails on offline machines
+        logger.warning(f"Could not load tiktoken encoding {name}, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, encoding: str = "cl100k_base") -> int:
+    """
+    Returns the number of tokens in the text for the given tiktoken encoding.
+
+    Falls back to an estimate of four characters per token if the encoding is unavailable.
+    """
+    enc = _encoding(encoding)
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text))
+
+
+class TokenBoundedMemory:
+    """
+    Conversation memory for the Tagger with a fixed token budget.
+
+    Instead of the raw transcript, it keeps the most recent user messages that fit in
+    ``max_tokens`` plus a compact summary of the (destination, intent) pairs discussed
+    so far, so prompt size stays flat over long sessions. Token counts are computed
+    once per message and the rendered history is cached between saves.
+
+    Attributes:
+        max_tokens (int): The token budget for the recent user messages.
+        max_topics (int): The number of (destination, intent) pairs kept in the summary.
+        encoding (str): The tiktoken encoding used to count tokens.
+    """
+
+    memory_key = "history"
+
+    def __init__(self, max_tokens: int = 512, max_topics: int = 8, encoding: str = "cl100k_base") -> None:
+        self.max_tokens = max_tokens
+        self.max_topics = max_topics
+        self.encoding = encoding
+        self._messages: Deque[Tuple[BaseMessage, int]] = deque()
+        self._tokens = 0
+        self._topics: Dict[Tuple[str, str], None] = {}
+        self._history: List[BaseMessage] = []
+
+    @property
+    def tokens(self) -> int:
+        """
+        The number of tokens in the retained user messages.
+        """
+        return self._tokens
+
+    @property
+    def topics(self) -> List[Tuple[str, str]]:
+        """
+        The (destination, intent) pairs in the summary, oldest first.
+        """
+        return list(self._topics)
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, List[BaseMessage]]:
+        return {self.memory_key: self._history}
+
+    def save_intent(self, input: str, destination: str, intent: str) -> None:
+        """
+        Records a user message and the (destination, intent) pair extracted from it.
+        """
+        self.save_intents(input, [(destination, intent)])
+
+    def save_intents(self, input: str, pairs: List[Tuple[str, str]]) -> None:
+        """
+        Records a user message and every (destination, intent) pair extracted from it.
+        """
+        self._add(HumanMessage(content=input))
+        for key in pairs:
+            # Re-inserting moves the pair to the most recent position
+            self._topics.pop(key, None)
+            self._topics[key] = None
+        while len(self._topics) > self.max_topics:
+            del self._topics[next(iter(self._topics))]
+        self._render()
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """
+        Records an exchange in the ConversationBufferMemory format.
+        """
+        self._add(HumanMessage(content=str(inputs.get("input", ""))))
+        if outputs.get("output"):
+            self._add(AIMessage(content=outputs["output"]))
+        self._render()
+
+    def clear(self) -> None:
+        self._messages.clear()
+        self._tokens = 0
+        self._topics.clear()
+        self._history = []
+
+    def _add(self, message: BaseMessage) -> None:
+        tokens = count_tokens(message.content, self.encoding)
+        self._messages.append((message, tokens))
+        self._tokens += tokens
+        # Always keep the latest message, even if it alone exceeds the budget
+        while self._tokens > self.max_tokens and len(self._messages) > 1:
+            _, dropped = self._messages.popleft()
+            self._tokens -= dropped
+
+    def _render(self) -> None:
+        history: List[BaseMessage] = []
+        if self._topics:
+            summary = "; ".join(f"{intent} in {destination}" for destination, intent in self._topics)
+            history.append(SystemMessage(content=f"Topics discussed so far, oldest first: {summary}."))
+        history.extend(message for message, _ in self._messages)
+        self._history = history
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns a compact JSON-serializable form, keeping the cached token counts.
+        """
+        return {
+            "max_tokens": self.max_tokens,
+            "max_topics": self.max_topics,
+            "encoding": self.encoding,
+            "messages": [[message.type, message.content, tokens] for message, tokens in self._messages],
+            "topics": [list(topic) for topic in self._topics],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TokenBoundedMemory":
+        """
+        Restores a memory serialized with to_dict().
+        """
+        memory = cls(data["max_tokens"], data["max_topics"], data["encoding"])
+        for kind, content, tokens in data["messages"]:
+            message = HumanMessage(content=content) if kind == "human" else AIMessage(content=content)
+            memory._messages.append((message, tokens))
+            memory._tokens += tokens
+        for destination, intent in data["topics"]:
+            memory._topics[(destination, intent)] = None
+        memory._render()
+        return memory
+
+
+def new_memory() -> TokenBoundedMemory:
+    """
+    Creates an empty conversation memory for one session, sized from the settings.
+    """
+    settings = get_settings()
+    return TokenBoundedMemory(
+        max_tokens=settings.tagger_memory_max_tokens,
+        max_topics=settings.tagger_memory_max_topics,
+    )
@@ -0,0 +1,142 @@
+import bisect
+import json
+import threading
+from typing import Dict, Sequence, Tuple
+
+# Upper bounds in seconds, suited to HTTP and model latencies
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """
+    A monotonically increasing count.
+    """
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> dict:
+        return {"value": self.value}
+
+
+class Histogram:
+    """
+    Counts observations into cumulative buckets, keeping their count and sum.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class MetricsRegistry:
+    """
+    A process-wide collection of named, labelled counters and histograms.
+    """
+
+    def __init__(self) -> None:
+        self._counters: Dict[Tuple[str, LabelKey], Counter] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> Tuple[str, LabelKey]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def counter(self, name: str, **labels: str) -> Counter:
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._counters:
+                self._counters[key] = Counter()
+            return self._counters[key]
+
+    def histogram(self, name: str, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels: str) -> Histogram:
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(buckets)
+            return self._histograms[key]
+
+    def snapshot(self) -> dict:
+        """
+        Returns all metrics as a JSON-serializable dict.
+        """
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = list(self._histograms.items())
+        return {
+            "counters": [
+                {"name": name, "labels": dict(labels), **metric.snapshot()}
+                for (name, labels), metric in counters
+            ],
+            "histograms": [
+                {"name": name, "labels": dict(labels), **metric.snapshot()}
+                for (name, labels), metric in histograms
+            ],
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for counter in sorted(snapshot["counters"], key=lambda m: m["name"]):
+            lines.append(f"{counter['name']}{_labels(counter['labels'])} {counter['value']}")
+        for histogram in sorted(snapshot["histograms"], key=lambda m: m["name"]):
+            name, labels = histogram["name"], histogram["labels"]
+            for bound, count in histogram["buckets"].items():
+                le = "+Inf" if bound == "inf" else bound
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {count}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram['count']}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram['sum']}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        """
+        Writes the snapshot to a JSON file.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+metrics = MetricsRegistry()
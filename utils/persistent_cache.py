@@ -0,0 +1,148 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterator, Optional, Set, Tuple
+
+_MISSING = object()
+
+
+class SQLiteCache:
+    """
+    A persistent key/value cache with per-entry TTL, shared between processes.
+
+    Values are stored as JSON in a SQLite database in WAL mode, so any number of
+    worker processes can read concurrently while one writes. ``None`` values are
+    cached as negative results with their own TTL. The table is compacted back to
+    ``max_entries`` every ``compact_every`` writes.
+
+    Attributes:
+        path (str): The path of the SQLite database file.
+        ttl (float): Seconds a value stays fresh.
+        negative_ttl (float): Seconds a ``None`` value stays fresh.
+        max_entries (int): The number of entries kept after compaction.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 7 * 24 * 60 * 60,
+        negative_ttl: float = 10 * 60,
+        max_entries: int = 100_000,
+        compact_every: int = 1000,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.compact_every = compact_every
+        self._local = threading.local()
+        # Every thread's connection, so close can reach them all
+        self._connections: Set[sqlite3.Connection] = set()
+        self._connections_lock = threading.Lock()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads, but close may run
+        # on any thread, so connections left over from before it are not reused
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn not in self._connections:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._connections_lock:
+                self._connections.add(conn)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, default: Any = _MISSING) -> Any:
+        """
+        Returns the value for the key, or ``default`` if it is missing or expired.
+
+        The default sentinel lets callers tell a cached ``None`` apart from a miss.
+        """
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Stores a JSON-serializable value, using the negative TTL for ``None`` unless ``ttl`` is given.
+        """
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now),
+            )
+        with self._writes_lock:
+            self._writes += 1
+            compact = self._writes % self.compact_every == 0
+        if compact:
+            self.compact()
+
+    def delete(self, key: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def compact(self) -> int:
+        """
+        Removes expired entries, then the least recently written ones above ``max_entries``.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        with self._connection() as conn:
+            removed = conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            removed += conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                " SELECT key FROM cache ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        return removed
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def items(self, limit: Optional[int] = None) -> Iterator[Tuple[str, Any, float]]:
+        """
+        Yields fresh entries as (key, value, remaining TTL), most recently written first.
+
+        Used to warm an in-memory cache when a worker starts.
+        """
+        now = time.time()
+        rows = self._connection().execute(
+            "SELECT key, value, expires_at FROM cache WHERE expires_at > ?"
+            " ORDER BY updated_at DESC LIMIT ?",
+            (now, -1 if limit is None else limit),
+        )
+        for key, value, expires_at in rows:
+            yield key, json.loads(value), expires_at - now
+
+    def close(self) -> None:
+        """
+        Closes the connections opened by every thread. Later calls open new ones.
+        """
+        with self._connections_lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            conn.close()
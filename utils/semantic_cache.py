@@ -0,0 +1,274 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Protocol
+
+import numpy as np
+
+from utils.cache import CacheStats, normalize_name
+from utils.config import Settings, get_settings, on_reload
+from utils.logger import logger
+
+
+class Embedder(Protocol):
+    """
+    Turns text into a fixed-size vector.
+    """
+
+    dim: int
+
+    def embed(self, text: str) -> np.ndarray:
+        ...
+
+
+class HashingEmbedder:
+    """
+    A deterministic local embedder hashing word unigrams and bigrams into a fixed-size vector.
+
+    It needs no network access, which makes it suitable for tests and offline runs.
+    """
+
+    def __init__(self, dim: int = 256) -> None:
+        self.dim = dim
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = re.findall(r"\w+", normalize_name(text))
+        for gram in words + [" ".join(pair) for pair in zip(words, words[1:])]:
+            digest = hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[index] += sign
+        return vector
+
+
+class OpenAIEmbedder:
+    """
+    Embeds text with the OpenAI embeddings API.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: str = "text-embedding-3-small", dim: int = 1536) -> None:
+        from langchain_community.embeddings import OpenAIEmbeddings
+
+        settings = get_settings()
+        self.dim = dim
+        self.embeddings = OpenAIEmbeddings(
+            api_key=api_key or settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            model=model,
+        )
+
+    def embed(self, text: str) -> np.ndarray:
+        return np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+
+
+class SemanticCache:
+    """
+    Caches answers by embedding similarity of the (destination, intent, question) triple.
+
+    Vectors are kept L2-normalized in a NumPy array, so a lookup is one matrix-vector
+    product. Entries are only matched against entries for the same destination. When
+    ``path`` is given, the vectors live in a memory-mapped ``vectors.npy`` file and the
+    answers in ``entries.json`` next to it, so the index survives restarts. The memory map
+    reaches disk independently of ``entries.json``, so each entry records a checksum of its
+    vector and slots whose vector does not match after a crash are dropped on load.
+
+    Attributes:
+        embedder (Embedder): Produces the vectors.
+        capacity (int): The maximum number of entries; the least recently used is evicted.
+        threshold (float): The minimum cosine similarity for a hit.
+        stats (CacheStats): Hit, miss and eviction counters.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        capacity: int = 10_000,
+        threshold: float = 0.92,
+        path: Optional[str] = None,
+        flush_every: int = 32,
+    ) -> None:
+        self.embedder = embedder
+        self.capacity = capacity
+        self.threshold = threshold
+        self.path = path
+        self.flush_every = flush_every
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._destinations: List[Optional[str]] = [None] * capacity
+        # Destinations as small ints, so a lookup's mask is one vectorized comparison
+        self._destination_ids = np.full(capacity, -1, dtype=np.int64)
+        self._ids: Dict[str, int] = {}
+        self._answers: List[Optional[str]] = [None] * capacity
+        self._checksums: List[Optional[int]] = [None] * capacity
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._size = 0
+        if path:
+            self._open(path)
+        else:
+            self._vectors = np.zeros((capacity, embedder.dim), dtype=np.float32)
+
+    def _open(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        vectors_path = os.path.join(path, "vectors.npy")
+        entries_path = os.path.join(path, "entries.json")
+        shape = (self.capacity, self.embedder.dim)
+        if os.path.exists(vectors_path) and os.path.exists(entries_path):
+            vectors = np.load(vectors_path, mmap_mode="r+")
+            with open(entries_path, encoding="utf-8") as f:
+                entries = json.load(f)
+            if vectors.shape == shape and "checksums" in entries:
+                self._vectors = vectors
+                self._size = entries["size"]
+                self._answers[:self._size] = entries["answers"]
+                self._last_used[:self._size] = entries["last_used"]
+                self._checksums[:self._size] = entries["checksums"]
+                dropped = 0
+                for slot, destination in enumerate(entries["destinations"]):
+                    if self._checksums[slot] != self._checksum(slot):
+                        # Overwritten after the last flush: the answer belongs to the old vector
+                        self._drop(slot)
+                        dropped += 1
+                    else:
+                        self._set_destination(slot, destination)
+                if dropped:
+                    logger.debug(f"Dropped {dropped} unflushed semantic cache entries at {path}")
+                return
+            logger.debug(f"Discarding semantic cache at {path} with shape {vectors.shape}")
+        self._vectors = np.lib.format.open_memmap(vectors_path, mode="w+", dtype=np.float32, shape=shape)
+
+    def _checksum(self, slot: int) -> int:
+        return zlib.crc32(self._vectors[slot].tobytes())
+
+    def _set_destination(self, slot: int, destination: Optional[str]) -> None:
+        self._destinations[slot] = destination
+        if destination is None:
+            self._destination_ids[slot] = -1
+        else:
+            self._destination_ids[slot] = self._ids.setdefault(destination, len(self._ids))
+
+    def _drop(self, slot: int) -> None:
+        # The slot never matches and is the first reused
+        self._set_destination(slot, None)
+        self._answers[slot] = None
+        self._checksums[slot] = None
+        self._last_used[slot] = 0.0
+
+    @staticmethod
+    def _text(destination: str, intent: str, question: str) -> str:
+        return f"{destination} | {intent} | {question}"
+
+    def _embed(self, destination: str, intent: str, question: str) -> np.ndarray:
+        vector = self.embedder.embed(self._text(destination, intent, question))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, destination: str, intent: str, question: str) -> Optional[str]:
+        """
+        Returns the cached answer most similar to the question, if above the threshold.
+        """
+        query = self._embed(destination, intent, question)
+        destination = normalize_name(destination)
+        with self._lock:
+            destination_id = self._ids.get(destination)
+            if self._size and destination_id is not None:
+                scores = self._vectors[:self._size] @ query
+                scores = np.where(self._destination_ids[:self._size] == destination_id, scores, -1.0)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._last_used[best] = time.time()
+                    self.stats.hits += 1
+                    return self._answers[best]
+            self.stats.misses += 1
+            return None
+
+    def insert(self, destination: str, intent: str, question: str, answer: str) -> None:
+        """
+        Adds an answer, evicting the least recently used entry when full.
+        """
+        vector = self._embed(destination, intent, question)
+        with self._lock:
+            if self._size < self.capacity:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.stats.evictions += 1
+            self._vectors[slot] = vector
+            self._set_destination(slot, normalize_name(destination))
+            self._answers[slot] = answer
+            self._checksums[slot] = self._checksum(slot)
+            self._last_used[slot] = time.time()
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._flush()
+
+    def flush(self) -> None:
+        """
+        Writes the vectors and answers to disk, if the cache is persistent.
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        # Must be called with the lock held
+        self._pending = 0
+        if not self.path:
+            return
+        self._vectors.flush()
+        entries_path = os.path.join(self.path, "entries.json")
+        with open(entries_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "size": self._size,
+                "destinations": self._destinations[:self._size],
+                "answers": self._answers[:self._size],
+                "last_used": self._last_used[:self._size].tolist(),
+                "checksums": self._checksums[:self._size],
+            }, f)
+        os.replace(entries_path + ".tmp", entries_path)
+
+    def __len__(self) -> int:
+        return self._size
+
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Returns the process-wide semantic answer cache, or None if it is disabled.
+    """
+    global _cache
+    settings = get_settings()
+    if not settings.semantic_cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            if settings.semantic_cache_embedder == "hashing":
+                embedder = HashingEmbedder()
+            else:
+                embedder = OpenAIEmbedder()
+            _cache = SemanticCache(
+                embedder,
+                capacity=settings.semantic_cache_capacity,
+                threshold=settings.semantic_cache_threshold,
+                path=settings.semantic_cache_path,
+            )
+            atexit.register(_cache.flush)
+        return _cache
+
+
+@on_reload
+def _reset_cache(settings: Settings) -> None:
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.flush()
+        _cache = None
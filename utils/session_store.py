@@ -0,0 +1,351 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from utils.config import Settings, get_settings, on_reload
+from utils.memory import TokenBoundedMemory, new_memory
+
+
+@dataclass
+class Session:
+    """
+    The state of one conversation: the Tagger memory and the chat transcript.
+    """
+
+    memory: TokenBoundedMemory = field(default_factory=new_memory)
+    messages: List[Dict[str, str]] = field(default_factory=list)
+
+    def to_bytes(self) -> bytes:
+        data = {"memory": self.memory.to_dict(), "messages": self.messages}
+        return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Session":
+        decoded = json.loads(zlib.decompress(data))
+        return cls(TokenBoundedMemory.from_dict(decoded["memory"]), decoded["messages"])
+
+
+class _SessionLock:
+    # threading.Lock cannot be weakly referenced, so it is wrapped
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+
+
+async def _acquire(lock: threading.Lock) -> None:
+    if lock.acquire(blocking=False):
+        return
+    acquired = asyncio.get_running_loop().run_in_executor(None, lock.acquire)
+    try:
+        await asyncio.shield(acquired)
+    except asyncio.CancelledError:
+        # The worker thread still takes the lock; give it back once it has
+        acquired.add_done_callback(lambda _: lock.release())
+        raise
+
+
+class SessionStore(ABC):
+    """
+    Stores conversation state by session ID, outside of the shared chain objects.
+
+    Subclasses implement _load, _save and the maintenance methods. session() and
+    asession() hold a per-session lock in this process while the state is modified,
+    so concurrent requests for the same session do not overwrite each other.
+
+    Attributes:
+        max_messages (int): The number of most recent transcript messages kept per session.
+    """
+
+    def __init__(self, max_messages: int = 100) -> None:
+        self.max_messages = max_messages
+        self._locks: "weakref.WeakValueDictionary[str, _SessionLock]" = weakref.WeakValueDictionary()
+        self._alocks: "weakref.WeakValueDictionary[tuple, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, session_id: str) -> _SessionLock:
+        with self._locks_lock:
+            lock = self._locks.get(session_id)
+            if lock is None:
+                lock = self._locks[session_id] = _SessionLock()
+            return lock
+
+    def load(self, session_id: str) -> Session:
+        """
+        Returns the state of the session, or a new empty one.
+        """
+        data = self._load(session_id)
+        return Session() if data is None else Session.from_bytes(data)
+
+    def save(self, session_id: str, session: Session) -> None:
+        """
+        Saves the state of the session, dropping transcript messages beyond max_messages.
+        """
+        if len(session.messages) > self.max_messages:
+            del session.messages[:-self.max_messages]
+        self._save(session_id, session.to_bytes())
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[Session]:
+        """
+        Loads the session, yields it for modification and saves it afterwards.
+        """
+        lock = self._lock(session_id)
+        with lock.lock:
+            session = self.load(session_id)
+            yield session
+            self.save(session_id, session)
+
+    @asynccontextmanager
+    async def asession(self, session_id: str) -> AsyncIterator[Session]:
+        """
+        The asyncio counterpart of session(), holding the same per-session lock, so
+        session() and asession() on any event loop never interleave. The lock is
+        waited for, and the state loaded and saved, off the event loop.
+        """
+        # Tasks on one loop queue on an asyncio.Lock first, so each loop has at most
+        # one worker thread waiting for the shared lock of a session
+        key = (id(asyncio.get_running_loop()), session_id)
+        with self._locks_lock:
+            alock = self._alocks.get(key)
+            if alock is None:
+                alock = self._alocks[key] = asyncio.Lock()
+        lock = self._lock(session_id)
+        async with alock:
+            await _acquire(lock.lock)
+            try:
+                session = await asyncio.to_thread(self.load, session_id)
+                yield session
+                await asyncio.to_thread(self.save, session_id, session)
+            finally:
+                lock.lock.release()
+
+    @abstractmethod
+    def _load(self, session_id: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def _save(self, session_id: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def expire_idle(self) -> int:
+        """
+        Removes sessions idle for longer than the idle TTL and returns how many were removed.
+        """
+
+    @abstractmethod
+    def memory_usage(self) -> dict:
+        """
+        Reports the number of sessions and the bytes their serialized state takes.
+        """
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Keeps serialized sessions in process memory, evicting the least recently used.
+
+    Attributes:
+        max_sessions (int): The maximum number of sessions kept.
+        idle_ttl (float): Seconds after which an untouched session expires.
+    """
+
+    def __init__(self, max_sessions: int = 10_000, idle_ttl: float = 60 * 60, max_messages: int = 100) -> None:
+        super().__init__(max_messages)
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.evictions = 0
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock_data = threading.Lock()
+
+    def _load(self, session_id: str) -> Optional[bytes]:
+        with self._lock_data:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            data, last_access = entry
+            now = time.time()
+            if now - last_access > self.idle_ttl:
+                self._remove(session_id)
+                return None
+            # Reading a session makes it the most recently used
+            self._sessions[session_id] = (data, now)
+            self._sessions.move_to_end(session_id)
+            return data
+
+    def _save(self, session_id: str, data: bytes) -> None:
+        with self._lock_data:
+            if session_id in self._sessions:
+                self._remove(session_id)
+            self._sessions[session_id] = (data, time.time())
+            self._bytes += len(data)
+            while len(self._sessions) > self.max_sessions:
+                self._remove(next(iter(self._sessions)))
+                self.evictions += 1
+            self._expire()
+
+    def _remove(self, session_id: str) -> None:
+        # Must be called with the data lock held
+        data, _ = self._sessions.pop(session_id)
+        self._bytes -= len(data)
+
+    def _expire(self) -> int:
+        # Sessions are ordered by last access, so expired ones are at the front
+        cutoff = time.time() - self.idle_ttl
+        removed = 0
+        while self._sessions:
+            session_id, (_, last_access) = next(iter(self._sessions.items()))
+            if last_access > cutoff:
+                break
+            self._remove(session_id)
+            removed += 1
+        return removed
+
+    def delete(self, session_id: str) -> None:
+        with self._lock_data:
+            if session_id in self._sessions:
+                self._remove(session_id)
+
+    def expire_idle(self) -> int:
+        with self._lock_data:
+            return self._expire()
+
+    def memory_usage(self) -> dict:
+        with self._lock_data:
+            count = len(self._sessions)
+            return {
+                "sessions": count,
+                "bytes": self._bytes,
+                "avg_bytes": self._bytes / count if count else 0,
+                "evictions": self.evictions,
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Keeps serialized sessions in a SQLite database shared by worker processes.
+
+    Attributes:
+        path (str): The path of the SQLite database file.
+        idle_ttl (float): Seconds after which an untouched session expires.
+    """
+
+    def __init__(
+        self, path: str, idle_ttl: float = 60 * 60, expire_every: int = 500, max_messages: int = 100
+    ) -> None:
+        super().__init__(max_messages)
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.expire_every = expire_every
+        self._local = threading.local()
+        self._saves = 0
+        self._saves_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id TEXT PRIMARY KEY,"
+                " data BLOB NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, session_id: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT data FROM sessions WHERE id = ? AND updated_at > ?",
+            (session_id, time.time() - self.idle_ttl),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _save(self, session_id: str, data: bytes) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, updated_at) VALUES (?, ?, ?)",
+                (session_id, data, time.time()),
+            )
+        with self._saves_lock:
+            self._saves += 1
+            expire = self._saves % self.expire_every == 0
+        if expire:
+            self.expire_idle()
+
+    def delete(self, session_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def expire_idle(self) -> int:
+        with self._connection() as conn:
+            return conn.execute(
+                "DELETE FROM sessions WHERE updated_at <= ?", (time.time() - self.idle_ttl,)
+            ).rowcount
+
+    def memory_usage(self) -> dict:
+        count, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions"
+        ).fetchone()
+        return {"sessions": count, "bytes": size, "avg_bytes": size / count if count else 0}
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """
+    Returns the process-wide session store selected by the settings.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            settings = get_settings()
+            if settings.session_store == "sqlite":
+                _store = SQLiteSessionStore(
+                    settings.session_store_path,
+                    idle_ttl=settings.session_idle_ttl,
+                    max_messages=settings.session_max_messages,
+                )
+            elif settings.session_store == "memory":
+                _store = InMemorySessionStore(
+                    max_sessions=settings.session_max_sessions,
+                    idle_ttl=settings.session_idle_ttl,
+                    max_messages=settings.session_max_messages,
+                )
+            else:
+                raise ValueError(f"Unknown session store: {settings.session_store}")
+        return _store
+
+
+@on_reload
+def _reset_store(settings: Settings) -> None:
+    global _store
+    with _store_lock:
+        if settings.session_store == "memory" and isinstance(_store, InMemorySessionStore):
+            # Keep the live sessions, which exist nowhere else
+            _store.max_sessions = settings.session_max_sessions
+            _store.idle_ttl = settings.session_idle_ttl
+            _store.max_messages = settings.session_max_messages
+        else:
+            _store = None
@@ -0,0 +1,166 @@
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional
+
+from utils.cache import TTLCache, normalize_name
+from utils.config import Settings, get_settings, on_reload
+from utils.metrics import metrics
+from utils.tracing import current_span
+
+# Seconds each tool's results stay fresh. Location IDs and guides rarely change, nearby
+# listings change over hours and events over minutes.
+TOOL_TTLS: Dict[str, float] = {
+    "get_destination_info": 7 * 24 * 60 * 60,
+    "get_travel_guide": 24 * 60 * 60,
+    "get_images": 24 * 60 * 60,
+    "get_accommodation_options": 6 * 60 * 60,
+    "get_restaurant_recommendations": 6 * 60 * 60,
+    "get_local_events": 15 * 60,
+}
+
+
+def tool_input_key(tool_input: Any) -> Hashable:
+    """
+    Normalizes a tool input for use as a cache key.
+
+    A single-argument input is keyed by its value, so ``"Kyoto"`` and ``{"name": "kyoto "}``
+    share an entry.
+    """
+    if isinstance(tool_input, dict):
+        if len(tool_input) == 1:
+            tool_input = next(iter(tool_input.values()))
+        else:
+            return tuple(sorted(
+                (name, normalize_name(value) if isinstance(value, str) else repr(value))
+                for name, value in tool_input.items()
+            ))
+    return normalize_name(str(tool_input))
+
+
+class ToolResultCache:
+    """
+    Caches tool results per tool, keyed by the normalized tool input.
+
+    Each tool has its own TTL and LRU bound, and concurrent identical calls share one
+    upstream request. The tools raise ``ToolError`` on API errors, which is never cached,
+    and return ``None`` for "not found", which is only kept for the negative TTL.
+
+    Attributes:
+        ttls (Dict[str, float]): Seconds each tool's results stay fresh.
+        default_ttl (float): The TTL of tools missing from ``ttls``.
+        negative_ttl (float): Seconds a ``None`` result stays fresh.
+        maxsize (int): The maximum number of results kept per tool.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Mapping[str, float]] = None,
+        default_ttl: float = 60 * 60,
+        negative_ttl: float = 60.0,
+        maxsize: int = 1024,
+    ) -> None:
+        self.ttls = dict(TOOL_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self._caches: Dict[str, TTLCache] = {}
+        self._lock = threading.Lock()
+
+    def cache(self, tool: str) -> TTLCache:
+        """
+        Returns the cache holding the results of one tool.
+        """
+        with self._lock:
+            cache = self._caches.get(tool)
+            if cache is None:
+                ttl = self.ttls.get(tool, self.default_ttl)
+                cache = self._caches[tool] = TTLCache(
+                    maxsize=self.maxsize, ttl=ttl, negative_ttl=min(ttl, self.negative_ttl)
+                )
+            return cache
+
+    def run(self, tool: str, tool_input: Any, call: Callable[[], Any]) -> Any:
+        """
+        Returns the cached result of the tool for the input, calling ``call`` on a miss.
+
+        Args:
+            tool (str): The tool name.
+            tool_input: The input the tool is called with.
+            call (Callable): Runs the tool. Exceptions it raises are not cached.
+        """
+        called = False
+
+        def load() -> Any:
+            nonlocal called
+            called = True
+            return call()
+
+        try:
+            return self.cache(tool).get_or_load(tool_input_key(tool_input), load)
+        finally:
+            self._record(tool, called)
+
+    async def arun(self, tool: str, tool_input: Any, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Asynchronous run: ``call`` returns an awaitable running the tool.
+        """
+        called = False
+
+        def load() -> Awaitable[Any]:
+            nonlocal called
+            called = True
+            return call()
+
+        try:
+            return await self.cache(tool).aget_or_load(tool_input_key(tool_input), load)
+        finally:
+            self._record(tool, called)
+
+    @staticmethod
+    def _record(tool: str, called: bool) -> None:
+        # Waiting on an identical call in flight counts as a hit: no request was sent for it
+        metrics.counter("tool_cache_requests_total", tool=tool, result="miss" if called else "hit").inc()
+        current_span().set(cache_hit=not called)
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Returns the hit, miss, coalescing and eviction counters of each tool.
+        """
+        with self._lock:
+            caches = dict(self._caches)
+        return {tool: cache.stats.as_dict() for tool, cache in caches.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            caches = list(self._caches.values())
+        for cache in caches:
+            cache.clear()
+
+
+_cache: Optional[ToolResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_tool_cache() -> Optional[ToolResultCache]:
+    """
+    Returns the process-wide tool result cache, or None if tool caching is disabled.
+    """
+    global _cache
+    settings = get_settings()
+    if not settings.tool_cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ToolResultCache(
+                ttls={**TOOL_TTLS, **settings.tool_cache_ttls},
+                default_ttl=settings.tool_cache_ttl,
+                negative_ttl=settings.tool_cache_negative_ttl,
+                maxsize=settings.tool_cache_size,
+            )
+        return _cache
+
+
+@on_reload
+def _reset_cache(settings: Settings) -> None:
+    global _cache
+    with _cache_lock:
+        _cache = None
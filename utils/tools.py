@@ -1,45 +1,380 @@
-import requests
-from pydantic import BaseModel, Field
-from dotenv import load_dotenv, find_dotenv
-import os
+import asyncio
+import httpx
+import weakref
+from langchain.tools import StructuredTool
+from langchain_core.pydantic_v1 import BaseModel, Field
+import threading
 from utils.logger import logger
+from utils.config import Settings, get_settings, on_reload
+from utils.http_client import AsyncPooledClient, PoolConfig, PooledClient
+from utils.cache import TTLCache, normalize_name
+from utils.persistent_cache import SQLiteCache
+from utils.gazetteer import Gazetteer, get_gazetteer
+from utils.tracing import current_span
 
 class GetInfo(BaseModel):
     name: str = Field(..., title="Name", description="Name of the travel destination or landmark")
 
+class ToolError(Exception):
+    """
+    Raised when a TripAdvisor request fails, as opposed to a lookup finding nothing.
+
+    Tools return None only when the destination is not found, so failures are never
+    cached as negative results.
+    """
+
+
 def get_headers():
-    load_dotenv(find_dotenv())  # read local .env file
-    return {
-        'accept': 'application/json',
-        'Authorization': 'Bearer ' +  os.getenv('TRIPADVISOR_API_TOKEN')
-    }
+    return get_settings().tripadvisor_headers
+
+# Shared across TravelInfo instances so lookups reuse keep-alive connections
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> PooledClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            settings = get_settings()
+            _client = PooledClient(
+                settings.tripadvisor_base_url,
+                PoolConfig(
+                    connect_timeout=settings.connect_timeout,
+                    read_timeout=settings.read_timeout,
+                ),
+            )
+        return _client
+
+
+# Location IDs essentially never change, so search results are cached for long
+# periods; "not found" results are cached briefly to absorb repeated typos.
+destination_cache = TTLCache(
+    maxsize=get_settings().destination_cache_size,
+    ttl=get_settings().destination_cache_ttl,
+    negative_ttl=get_settings().destination_negative_ttl,
+)
+
+
+_store = None
+_store_lock = threading.Lock()
+_NOT_STORED = object()
+
+
+def get_destination_store() -> SQLiteCache:
+    """
+    Returns the on-disk destination cache shared by worker processes, or None if not configured.
+
+    The first call warms the in-memory cache from the most recent entries on disk.
+    """
+    global _store
+    settings = get_settings()
+    if not settings.destination_cache_path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteCache(
+                settings.destination_cache_path,
+                ttl=settings.destination_cache_ttl,
+                negative_ttl=settings.destination_negative_ttl,
+                max_entries=settings.destination_cache_max_entries,
+            )
+            warm_destination_cache(_store)
+        return _store
+
+
+def warm_destination_cache(store: SQLiteCache) -> int:
+    """
+    Loads fresh entries from the on-disk cache into the in-memory cache.
+
+    Returns:
+        int: The number of entries loaded.
+    """
+    loaded = 0
+    # Oldest first, so the newest entries end up the most recently used
+    entries = list(store.items(limit=destination_cache.maxsize))
+    for key, value, ttl in reversed(entries):
+        destination_cache.set(key, value, ttl=ttl)
+        loaded += 1
+    logger.debug(f"Warmed destination cache with {loaded} entries")
+    return loaded
+
+
+# Async clients are bound to the event loop that created them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncPooledClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> AsyncPooledClient:
+    """
+    Returns the pooled async client for the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            settings = get_settings()
+            client = _async_clients[loop] = AsyncPooledClient(
+                settings.tripadvisor_base_url,
+                PoolConfig(
+                    connect_timeout=settings.connect_timeout,
+                    read_timeout=settings.read_timeout,
+                ),
+            )
+        return client
+
+
+def _close_async_client(loop: asyncio.AbstractEventLoop, client: AsyncPooledClient) -> None:
+    # The client can only be closed on its own loop; a closed loop has released its sockets
+    if loop.is_closed():
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if loop is running:
+        loop.create_task(client.aclose())
+    else:
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+
+@on_reload
+def _reset_client(settings: Settings) -> None:
+    # The next lookup builds a client with the new base URL and timeouts
+    global _client, _travel_info
+    with _client_lock:
+        old_client, _client = _client, None
+        old_async_clients = list(_async_clients.items())
+        _async_clients.clear()
+    with _travel_info_lock:
+        _travel_info = None
+    if old_client is not None:
+        old_client.close()
+    for loop, client in old_async_clients:
+        _close_async_client(loop, client)
+    destination_cache.maxsize = settings.destination_cache_size
+    destination_cache.ttl = settings.destination_cache_ttl
+    destination_cache.negative_ttl = settings.destination_negative_ttl
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = None
+
 
 class TravelInfo:
-    def __init__(self, api_token: str) -> None:
-        self.api_token = api_token
+    def __init__(self, api_token: str = None, client: PooledClient = None, cache: TTLCache = None, store: SQLiteCache = None, gazetteer: Gazetteer = None, async_client: AsyncPooledClient = None) -> None:
+        self.api_token = api_token or get_settings().tripadvisor_api_token
+        self.client = client or get_client()
+        # Resolved per event loop when not given
+        self.async_client = async_client
+        self.cache = destination_cache if cache is None else cache
+        self.store = store if store is not None else get_destination_store()
+        self.gazetteer = gazetteer if gazetteer is not None else get_gazetteer()
+
+    def _known_location_id(self, name: str) -> str:
+        # The gazetteer only holds IDs and names, so it resolves the ID for resource
+        # requests; get_destination_info still returns the full search result
+        if self.gazetteer is not None:
+            place = self.gazetteer.exact(name)
+            if place is not None:
+                current_span().set(destination_source="gazetteer")
+                return place.location_id
+        return None
+
+    def _location_id(self, name: str) -> str:
+        location_id = self._known_location_id(name)
+        if location_id is not None:
+            return location_id
+        destination = self.get_destination_info(name)
+        return None if destination is None else destination['location_id']
+
+    async def _alocation_id(self, name: str) -> str:
+        location_id = self._known_location_id(name)
+        if location_id is not None:
+            return location_id
+        destination = await self.aget_destination_info(name)
+        return None if destination is None else destination['location_id']
 
     def get_destination_info(self, name: str) -> dict:
-        url = "https://api.tripadvisor.com/locations/search"
+        key = normalize_name(name)
+        # Replaced by the loader when the in-memory cache misses
+        current_span().set(destination_source="cache")
+        try:
+            # Errors are not cached, only successful lookups and "not found"
+            return self.cache.get_or_load(key, lambda: self._load(key, name))
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error fetching destination info: {e}")
+            raise ToolError(f"Error fetching destination info for {name}: {e}") from e
+
+    def _load(self, key: str, name: str) -> dict:
+        if self.store is None:
+            current_span().set(destination_source="api")
+            return self._search(name)
+        # Another worker process may already have looked this destination up
+        info = self.store.get(key, _NOT_STORED)
+        if info is _NOT_STORED:
+            current_span().set(destination_source="api")
+            info = self._search(name)
+            self.store.set(key, info)
+        else:
+            current_span().set(destination_source="store")
+        return info
+
+    def _search(self, name: str) -> dict:
+        url = "/locations/search"
         headers = get_headers()
         params = {
             'query': name,
             'key': self.api_token,
         }
+        response = self.client.get(url, headers=headers, params=params)
+        response.raise_for_status()
+        data = response.json()
+        if 'data' in data and data['data']:
+            return data['data'][0]  # Assuming first result is the best match
+        else:
+            return None
+
+    async def aget_destination_info(self, name: str) -> dict:
+        key = normalize_name(name)
+        current_span().set(destination_source="cache")
         try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            if 'data' in data and data['data']:
-                return data['data'][0]  # Assuming first result is the best match
-            else:
-                return None
-        except requests.exceptions.RequestException as e:
+            return await self.cache.aget_or_load(key, lambda: self._aload(key, name))
+        except (httpx.HTTPError, ValueError) as e:
             logger.error(f"Error fetching destination info: {e}")
+            raise ToolError(f"Error fetching destination info for {name}: {e}") from e
+
+    async def _aload(self, key: str, name: str) -> dict:
+        if self.store is None:
+            current_span().set(destination_source="api")
+            return await self._asearch(name)
+        # SQLite calls block, so they run off the event loop
+        info = await asyncio.to_thread(self.store.get, key, _NOT_STORED)
+        if info is _NOT_STORED:
+            current_span().set(destination_source="api")
+            info = await self._asearch(name)
+            await asyncio.to_thread(self.store.set, key, info)
+        else:
+            current_span().set(destination_source="store")
+        return info
+
+    async def _asearch(self, name: str) -> dict:
+        client = self.async_client or get_async_client()
+        params = {
+            'query': name,
+            'key': self.api_token,
+        }
+        response = await client.get("/locations/search", headers=get_headers(), params=params)
+        response.raise_for_status()
+        data = response.json()
+        if 'data' in data and data['data']:
+            return data['data'][0]  # Assuming first result is the best match
+        else:
             return None
 
+    def get_location_resource(self, name: str, resource: str, params: dict = None):
+        """
+        Fetches a resource (details, photos, nearby places) of the destination with the given name.
+
+        Returns None if the destination is not found and raises ToolError if a request fails.
+        """
+        location_id = self._location_id(name)
+        if location_id is None:
+            return None
+        try:
+            response = self.client.get(
+                f"/locations/{location_id}/{resource}",
+                headers=get_headers(),
+                params={**(params or {}), 'key': self.api_token},
+            )
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error fetching {resource} for {name}: {e}")
+            raise ToolError(f"Error fetching {resource} for {name}: {e}") from e
+
+    async def aget_location_resource(self, name: str, resource: str, params: dict = None):
+        location_id = await self._alocation_id(name)
+        if location_id is None:
+            return None
+        client = self.async_client or get_async_client()
+        try:
+            response = await client.get(
+                f"/locations/{location_id}/{resource}",
+                headers=get_headers(),
+                params={**(params or {}), 'key': self.api_token},
+            )
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error fetching {resource} for {name}: {e}")
+            raise ToolError(f"Error fetching {resource} for {name}: {e}") from e
+
+
+_travel_info = None
+_travel_info_lock = threading.Lock()
+
+
+def get_travel_info() -> TravelInfo:
+    """Returns the TravelInfo shared by the tools."""
+    global _travel_info
+    with _travel_info_lock:
+        if _travel_info is None:
+            _travel_info = TravelInfo()
+        return _travel_info
+
+
+def _location_tool(tool_name: str, description: str, resource: str, params: dict = None) -> StructuredTool:
+    return StructuredTool.from_function(
+        func=lambda name: get_travel_info().get_location_resource(name, resource, params),
+        coroutine=lambda name: get_travel_info().aget_location_resource(name, resource, params),
+        name=tool_name,
+        description=description,
+        args_schema=GetInfo,
+    )
+
+
+# Tools offered to the model by Information_Extractor. Each has a blocking and an
+# async implementation, so the async pipeline never blocks the event loop.
+get_destination_info = StructuredTool.from_function(
+    func=lambda name: get_travel_info().get_destination_info(name),
+    coroutine=lambda name: get_travel_info().aget_destination_info(name),
+    name="get_destination_info",
+    description="Get general information about a travel destination, such as its location ID and address.",
+    args_schema=GetInfo,
+)
+get_travel_guide = _location_tool(
+    "get_travel_guide",
+    "Get a travel guide for a destination: description, highlights and practical details.",
+    "details",
+)
+get_local_events = _location_tool(
+    "get_local_events",
+    "Get local events and attractions happening around a destination.",
+    "nearby_search",
+    {'category': 'attractions'},
+)
+get_restaurant_recommendations = _location_tool(
+    "get_restaurant_recommendations",
+    "Get restaurant recommendations near a destination.",
+    "nearby_search",
+    {'category': 'restaurants'},
+)
+get_accommodation_options = _location_tool(
+    "get_accommodation_options",
+    "Get hotels and other accommodation options near a destination.",
+    "nearby_search",
+    {'category': 'hotels'},
+)
+get_images = _location_tool(
+    "get_images",
+    "Get photos of a destination.",
+    "photos",
+)
+
 # Example usage:
 if __name__ == "__main__":
-    api_token = os.getenv('TRIPADVISOR_API_TOKEN')
+    api_token = get_settings().tripadvisor_api_token
     if api_token:
         info_fetcher = TravelInfo(api_token)
         destination_name = "Paris"  # Example destination name
@@ -0,0 +1,280 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from utils.config import Settings, get_settings, on_reload
+from utils.logger import logger
+
+
+@dataclass
+class Span:
+    """
+    One timed step of a request.
+
+    Attributes:
+        name (str): What the step does, e.g. "tagger" or "tool".
+        trace_id (str): The request ID shared by all spans of one request.
+        span_id (str): The ID of this span.
+        parent_id (str): The ID of the enclosing span, or None for the request span.
+        start (float): The wall-clock start time, in seconds since the epoch.
+        duration (float): Seconds the step took.
+        attributes (Dict[str, Any]): Details such as token counts and cache-hit flags.
+        error (str): The type of the exception the step raised, if any.
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start: float = 0.0
+    duration: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class _NoopSpan:
+    # Stands in for both the span and its context manager while tracing is disabled
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class _SpanContext:
+    def __init__(self, tracer: "Tracer", name: str, trace_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        parent = _current.get()
+        self.span = Span(
+            name=self.name,
+            trace_id=self.trace_id or (parent.trace_id if parent else uuid.uuid4().hex),
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            start=time.time(),
+            attributes=self.attributes,
+        )
+        self._token = _current.set(self.span)
+        self._started = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.span.duration = time.perf_counter() - self._started
+        if exc_type is not None:
+            self.span.error = exc_type.__name__
+        _current.reset(self._token)
+        self.tracer.export(self.span)
+        return False
+
+
+class RingBufferExporter:
+    """
+    Keeps the most recent spans in memory so they can be queried.
+
+    Attributes:
+        capacity (int): The number of spans kept.
+    """
+
+    def __init__(self, capacity: int = 10_000) -> None:
+        self.capacity = capacity
+        self._spans: Deque[Span] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def query(
+        self,
+        trace_id: Optional[str] = None,
+        name: Optional[str] = None,
+        min_duration: float = 0.0,
+        limit: Optional[int] = None,
+    ) -> List[Span]:
+        """
+        Returns the matching spans, most recent first.
+
+        Args:
+            trace_id (str, optional): Only spans of this request.
+            name (str, optional): Only spans with this name.
+            min_duration (float): Only spans that took at least this many seconds.
+            limit (int, optional): The maximum number of spans returned.
+        """
+        with self._lock:
+            spans = list(self._spans)
+        matches = []
+        for span in reversed(spans):
+            if trace_id is not None and span.trace_id != trace_id:
+                continue
+            if name is not None and span.name != name:
+                continue
+            if span.duration < min_duration:
+                continue
+            matches.append(span)
+            if limit is not None and len(matches) >= limit:
+                break
+        return matches
+
+    def trace(self, trace_id: str) -> List[Span]:
+        """
+        Returns every span of one request in start order.
+        """
+        return sorted(self.query(trace_id=trace_id), key=lambda span: span.start)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class JSONLExporter:
+    """
+    Appends each finished span to a JSON Lines file.
+
+    Attributes:
+        path (str): The path of the file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.as_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """
+    Creates spans and hands finished ones to an exporter.
+
+    Without an exporter every span is a shared no-op object, so instrumented code pays
+    one attribute check per span.
+
+    Attributes:
+        exporter (RingBufferExporter or JSONLExporter): Receives finished spans, or None when disabled.
+    """
+
+    def __init__(self, exporter=None) -> None:
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def span(self, name: str, trace_id: Optional[str] = None, **attributes: Any):
+        """
+        Returns a context manager timing a step as a child of the current span.
+
+        Args:
+            name (str): What the step does.
+            trace_id (str, optional): The request ID, for a span starting a new request.
+                Defaults to the current request's, or a new ID.
+            **attributes: Details recorded on the span.
+        """
+        if self.exporter is None:
+            return _NOOP
+        return _SpanContext(self, name, trace_id, attributes)
+
+    def record(self, name: str, duration: float, **attributes: Any) -> None:
+        """
+        Exports an already finished step as a child of the current span.
+
+        Used where a ``with`` block cannot enclose the step, such as a streamed response.
+        """
+        if self.exporter is None:
+            return
+        parent = _current.get()
+        self.export(Span(
+            name=name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            start=time.time() - duration,
+            duration=duration,
+            attributes=attributes,
+        ))
+
+    def export(self, span: Span) -> None:
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            # Tracing must never fail the request
+            logger.warning(f"Could not export span {span.name}: {e}")
+
+
+def current_span():
+    """
+    Returns the innermost active span, or a no-op span outside of any.
+    """
+    return _current.get() or _NOOP
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """
+    Returns the process-wide tracer with the exporter selected by the settings.
+    """
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                settings = get_settings()
+                if settings.tracing_exporter == "memory":
+                    exporter = RingBufferExporter(settings.tracing_buffer_size)
+                elif settings.tracing_exporter == "jsonl":
+                    exporter = JSONLExporter(settings.tracing_path)
+                elif settings.tracing_exporter == "none":
+                    exporter = None
+                else:
+                    raise ValueError(f"Unknown tracing exporter: {settings.tracing_exporter}")
+                _tracer = Tracer(exporter)
+    return _tracer
+
+
+def span(name: str, trace_id: Optional[str] = None, **attributes: Any):
+    """
+    Times a step with the process-wide tracer. See Tracer.span.
+    """
+    return get_tracer().span(name, trace_id, **attributes)
+
+
+@on_reload
+def _reset_tracer(settings: Settings) -> None:
+    global _tracer
+    with _tracer_lock:
+        if _tracer is not None and isinstance(_tracer.exporter, JSONLExporter):
+            _tracer.exporter.close()
+        _tracer = None